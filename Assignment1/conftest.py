@@ -14,6 +14,11 @@ SUBMISSION_DIR = Path('/app/submission')
 if SUBMISSION_DIR.exists():
     sys.path.insert(0, str(SUBMISSION_DIR))
 
+# The judge runtime is baked into the base image; outside it, use the repository's judge/ folder
+JUDGE_DIR = Path(__file__).resolve().parent.parent / 'judge'
+if JUDGE_DIR.is_dir() and str(JUDGE_DIR) not in sys.path:
+    sys.path.append(str(JUDGE_DIR))
+
 # Test markers
 def pytest_configure(config):
     config.addinivalue_line(
@@ -7,42 +7,51 @@ displaying "Hi Android" text centered on the screen.
 """
 
 import pytest
-from pathlib import Path
-from lxml import etree
 import os
-import sys
 
-SUBMISSION_DIR = '/app/submission'
+from submission_cache import load_submission
 
-@pytest.fixture
-def xml_tree():
+SUBMISSION_DIR = os.environ.get('SUBMISSION_DIR', '/app/submission')
+# MainActivity.java is checked too (java_checks.py), reported apart from these tests
+CHECK_JAVA = True
+
+@pytest.fixture(scope='session')
+def submission():
+    """Read and parse activity_main.xml once for the whole session."""
+    return load_submission(SUBMISSION_DIR)
+
+@pytest.fixture(scope='session')
+def xml_tree(submission):
     """Load and parse the activity_main.xml file."""
-    xml_file = os.path.join(SUBMISSION_DIR, 'activity_main.xml')
-    print(f"\n[DEBUG] Looking for XML file at: {xml_file}")
-    print(f"[DEBUG] File exists: {os.path.exists(xml_file)}")
+    print(f"\n[DEBUG] Looking for XML file at: {submission.path}")
+    print(f"[DEBUG] File exists: {submission.exists}")
     
-    if not os.path.exists(xml_file):
+    if not submission.exists:
         print(f"[DEBUG] Contents of {SUBMISSION_DIR}:")
-        if os.path.exists(SUBMISSION_DIR):
+        if os.path.isdir(SUBMISSION_DIR):
             for item in os.listdir(SUBMISSION_DIR):
                 print(f"  - {item}")
         else:
-            print(f"  Directory does not exist!")
-        pytest.skip(f"XML file not found at {xml_file}")
+            print("  Directory does not exist!")
+        pytest.skip(f"XML file not found at {submission.path}")
+    
+    if submission.error is not None:
+        print(f"[DEBUG] XML parsing error: {submission.error}")
+        raise submission.error
     
-    try:
-        tree = etree.parse(xml_file)
-        print(f"[DEBUG] XML parsed successfully")
-        return tree
-    except Exception as e:
-        print(f"[DEBUG] XML parsing error: {e}")
-        raise
-
-@pytest.fixture
+    print("[DEBUG] XML parsed successfully")
+    return submission.tree
+
+@pytest.fixture(scope='session')
 def root_element(xml_tree):
     """Get the root element of the XML tree."""
     return xml_tree.getroot()
 
+@pytest.fixture(scope='session')
+def layout_index(submission, xml_tree):
+    """Get the single-pass tag/attribute index of the layout."""
+    return submission.index
+
 
 class TestLayoutStructure:
     """Test the overall layout structure."""
@@ -59,10 +68,10 @@ class TestLayoutStructure:
             f"Root element should be a layout, got {root_element.tag}"
     
     @pytest.mark.layout
-    def test_layout_has_match_parent_dimensions(self, root_element):
+    def test_layout_has_match_parent_dimensions(self, layout_index):
         """Test that the root layout has match_parent dimensions."""
-        width = root_element.get('{http://schemas.android.com/apk/res/android}layout_width')
-        height = root_element.get('{http://schemas.android.com/apk/res/android}layout_height')
+        width = layout_index.root.get('layout_width')
+        height = layout_index.root.get('layout_height')
         
         assert width == 'match_parent', f"Layout width should be match_parent, got {width}"
         assert height == 'match_parent', f"Layout height should be match_parent, got {height}"
@@ -72,25 +81,19 @@ class TestTextView:
     """Test the TextView implementation."""
     
     @pytest.mark.textview
-    def test_has_textview(self, root_element):
+    def test_has_textview(self, layout_index):
         """Test that the layout contains a TextView element."""
-        textviews = root_element.findall('.//{http://schemas.android.com/apk/res/android}TextView')
-        if not textviews:
-            textviews = root_element.findall('.//TextView')
+        textviews = layout_index.findall('TextView')
         assert len(textviews) > 0, "No TextView found in the layout"
     
     @pytest.mark.textview
-    def test_textview_displays_hi_android(self, root_element):
+    def test_textview_displays_hi_android(self, layout_index):
         """Test that the TextView displays 'Hi Android' text."""
-        textviews = root_element.findall('.//{http://schemas.android.com/apk/res/android}TextView')
-        if not textviews:
-            textviews = root_element.findall('.//TextView')
+        textviews = layout_index.findall('TextView')
         
         text_found = False
         for textview in textviews:
-            text = textview.get('{http://schemas.android.com/apk/res/android}text')
-            if not text:
-                text = textview.get('text')
+            text = textview.get('text', bare=True)
             if text and 'Hi Android' in text:
                 text_found = True
                 break
@@ -98,38 +101,26 @@ class TestTextView:
         assert text_found, "No TextView with 'Hi Android' text found"
     
     @pytest.mark.textview
-    def test_textview_has_wrap_content_dimensions(self, root_element):
+    def test_textview_has_wrap_content_dimensions(self, layout_index):
         """Test that the TextView uses wrap_content for dimensions."""
-        textviews = root_element.findall('.//{http://schemas.android.com/apk/res/android}TextView')
-        if not textviews:
-            textviews = root_element.findall('.//TextView')
+        first_textview = layout_index.find('TextView')
         
-        assert len(textviews) > 0, "No TextView found"
+        assert first_textview is not None, "No TextView found"
         
-        first_textview = textviews[0]
-        width = first_textview.get('{http://schemas.android.com/apk/res/android}layout_width')
-        if not width:
-            width = first_textview.get('layout_width')
-        height = first_textview.get('{http://schemas.android.com/apk/res/android}layout_height')
-        if not height:
-            height = first_textview.get('layout_height')
+        width = first_textview.get('layout_width', bare=True)
+        height = first_textview.get('layout_height', bare=True)
         
         assert width == 'wrap_content', f"TextView width should be wrap_content, got {width}"
         assert height == 'wrap_content', f"TextView height should be wrap_content, got {height}"
     
     @pytest.mark.textview
-    def test_textview_has_adequate_text_size(self, root_element):
+    def test_textview_has_adequate_text_size(self, layout_index):
         """Test that the TextView has a reasonable text size (at least 24sp)."""
-        textviews = root_element.findall('.//{http://schemas.android.com/apk/res/android}TextView')
-        if not textviews:
-            textviews = root_element.findall('.//TextView')
+        first_textview = layout_index.find('TextView')
         
-        assert len(textviews) > 0, "No TextView found"
+        assert first_textview is not None, "No TextView found"
         
-        first_textview = textviews[0]
-        text_size = first_textview.get('{http://schemas.android.com/apk/res/android}textSize')
-        if not text_size:
-            text_size = first_textview.get('textSize')
+        text_size = first_textview.get('textSize', bare=True)
         
         if text_size:
             # Extract numeric value
@@ -142,9 +133,9 @@ class TestCentering:
     """Test that content is properly centered."""
     
     @pytest.mark.layout
-    def test_layout_is_centered(self, root_element):
+    def test_layout_is_centered(self, layout_index):
         """Test that the root layout is configured for centering content."""
-        gravity = root_element.get('{http://schemas.android.com/apk/res/android}gravity')
+        gravity = layout_index.root.get('gravity')
         
         assert gravity is not None, "Root layout should have gravity attribute"
         assert 'center' in gravity.lower(), \
@@ -155,17 +146,12 @@ class TestSmokeTests:
     """Basic smoke tests to verify functionality."""
     
     @pytest.mark.smoke
-    def test_file_exists(self):
+    def test_file_exists(self, submission):
         """Test that activity_main.xml file exists."""
-        xml_file = os.path.join(SUBMISSION_DIR, 'activity_main.xml')
-        assert os.path.exists(xml_file), f"File {xml_file} does not exist"
+        assert submission.exists, f"File {submission.path} does not exist"
     
     @pytest.mark.smoke
-    def test_file_is_valid_xml(self):
+    def test_file_is_valid_xml(self, submission):
         """Test that the file is valid XML."""
-        xml_file = os.path.join(SUBMISSION_DIR, 'activity_main.xml')
-        try:
-            etree.parse(xml_file)
-            assert True
-        except Exception as e:
-            pytest.fail(f"XML parsing failed: {str(e)}")
+        if not submission.parsed:
+            pytest.fail(f"XML parsing failed: {str(submission.error)}")
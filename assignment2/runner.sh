@@ -1,10 +1,45 @@
 #!/bin/bash
 set +e
 
+# Process start for the 'startup' phase of the report timings
+export JUDGE_START="${JUDGE_START:-$(date +%s.%N)}"
+
 export PYTHONPATH=/app/submission:/app:$PYTHONPATH
 
-pytest /app/test_assignment.py --json-report --json-report-file=/tmp/report.json -v > /dev/null 2>&1
+# A submission mounted as a zip is graded straight from the archive
+if [ -z "$SUBMISSION_DIR" ] && [ -f /app/submission.zip ]; then
+    export SUBMISSION_DIR=/app/submission.zip
+fi
+
+# The multi-assignment image bundles suites under /app/suites/<assignment_id>
+if [ -n "$1" ]; then
+    export ASSIGNMENT_ID="$1"
+fi
+TEST_FILE=/app/test_assignment.py
+if [ -n "$ASSIGNMENT_ID" ] && [ -f "/app/suites/$ASSIGNMENT_ID/test_assignment.py" ]; then
+    TEST_FILE="/app/suites/$ASSIGNMENT_ID/test_assignment.py"
+fi
+
+if [ "$JUDGE_MODE" = "daemon" ]; then
+    exec python3 /app/judge_daemon.py ${JUDGE_SOCKET:+--socket "$JUDGE_SOCKET"}
+fi
+
+if [ -n "$BATCH_DIR" ]; then
+    python3 /app/batch_runner.py "$BATCH_DIR" "${BATCH_OUTPUT_DIR:-/app/reports}"
+    exit 0
+fi
+
+if [ "$JUDGE_ENGINE" = "fast" ] || [ "$JUDGE_ENGINE" = "parity" ]; then
+    python3 /app/fast_eval.py "${SUBMISSION_DIR:-/app/submission}"
+    exit 0
+fi
+
+# One interpreter: report_stream enhances the in-memory report and prints it when the session ends
+pytest "$TEST_FILE" -p judge_timings -p tiers -p solution_diff -p java_checks -p report_stream --json-report --json-report-file=none -v 2> /dev/null
 
-python3 /app/enhance_json.py /tmp/report.json
+# Usage errors stop pytest before any plugin runs
+if [ $? -eq 4 ]; then
+    python3 -c "from enhance_json import error_data, write_report; write_report(error_data('pytest could not start'))"
+fi
 
 exit 0
@@ -3,3 +3,7 @@ from pathlib import Path
 submission_path = Path("/app/submission").resolve()
 if submission_path not in [Path(p).resolve() for p in sys.path]:
     sys.path.insert(0, str(submission_path))
+# The judge runtime is baked into the base image; outside it, use the repository's judge/ folder
+judge_path = Path(__file__).resolve().parent.parent / "judge"
+if judge_path.is_dir() and str(judge_path) not in sys.path:
+    sys.path.append(str(judge_path))
@@ -3,58 +3,85 @@
 import json
 import sys
 import os
+import time
 
 os.environ['PYTHONUNBUFFERED'] = '1'
 
+def build_stats(data):
+    summary = data.get('summary', {})
+    passed = summary.get('passed', 0)
+    failed = summary.get('failed', 0)
+    total = summary.get('total', 0)
+    if total > 0:
+        marks = passed / total
+    else:
+        marks = 0
+    stats = {
+        'total_tests': total,
+        'passed': passed,
+        'failed': failed,
+        'marks': round(marks, 2),
+        'percentage': round(marks * 100, 2)
+    }
+    if summary.get('blocked'):
+        stats['blocked'] = summary['blocked']
+    # Java checks of MainActivity.java (java_checks.py) are reported next to the marks, not in them
+    java = (data.get('java') or {}).get('summary')
+    if java:
+        stats['java'] = dict(java, percentage=round(java['passed'] / java['total'] * 100, 2) if java['total'] else 0.0)
+    return stats
+
+def enhance_data(data):
+    data['stats'] = build_stats(data)
+    return data
+
+def error_data(message):
+    return {
+        'error': message,
+        'stats': {
+            'total_tests': 0,
+            'passed': 0,
+            'failed': 1,
+            'marks': 0.0,
+            'percentage': 0.0
+        }
+    }
+
+def add_report_timing(data, start_wall, start_cpu):
+    if isinstance(data.get('timings'), dict):
+        data['timings']['report'] = {
+            'wall_ms': round((time.perf_counter() - start_wall) * 1000, 3),
+            'cpu_ms': round((time.process_time() - start_cpu) * 1000, 3)
+        }
+    return data
+
+def write_report(data, stream=None, report_format=None):
+    stream = stream or sys.stdout
+    report_format = report_format or os.environ.get('REPORT_FORMAT', 'compact')
+    if report_format == 'pretty':
+        output = json.dumps(data, indent=2)
+    else:
+        output = json.dumps(data, separators=(',', ':'))
+    stream.write(output)
+    stream.write('\n')
+    stream.flush()
+
 def enhance_report(report_file):
     try:
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
         if not os.path.exists(report_file):
             raise FileNotFoundError(f"Report file {report_file} not found")
         with open(report_file, 'r') as f:
             content = f.read()
-        data = json.loads(content)
-        summary = data.get('summary', {})
-        passed = summary.get('passed', 0)
-        failed = summary.get('failed', 0)
-        total = summary.get('total', 0)
-        if total > 0:
-            marks = passed / total
-        else:
-            marks = 0
-        data['stats'] = {
-            'total_tests': total,
-            'passed': passed,
-            'failed': failed,
-            'marks': round(marks, 2),
-            'percentage': round(marks * 100, 2)
-        }
-        output = json.dumps(data, indent=2)
-        sys.stdout.write(output)
-        sys.stdout.write('\n')
-        sys.stdout.flush()
+        data = add_report_timing(enhance_data(json.loads(content)), start_wall, start_cpu)
+        write_report(data)
     except Exception as e:
-        error_data = {
-            'error': str(e),
-            'stats': {
-                'total_tests': 0,
-                'passed': 0,
-                'failed': 1,
-                'marks': 0.0,
-                'percentage': 0.0
-            }
-        }
-        output = json.dumps(error_data, indent=2)
-        sys.stdout.write(output)
-        sys.stdout.write('\n')
-        sys.stdout.flush()
+        write_report(error_data(str(e)))
     return 0
 
 if __name__ == '__main__':
     if len(sys.argv) < 2:
-        error_output = json.dumps({'error': 'Missing report file argument', 'stats': {'total_tests': 0, 'passed': 0, 'failed': 1, 'marks': 0.0, 'percentage': 0.0}})
-        sys.stdout.write(error_output)
-        sys.stdout.write('\n')
-        sys.stdout.flush()
+        write_report(error_data('Missing report file argument'), report_format='compact')
         sys.exit(0)
     enhance_report(sys.argv[1])
     sys.exit(0)
@@ -0,0 +1,337 @@
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Usage:
+# python3 benchmark_judge.py [--suites Assignment1 assignment2 assignment3] [--engines runner warm fast]
+#                            [--sizes tiny small medium large] [--repeat 5] [--output bench.json]
+#                            [--compare previous.json [--threshold 1.25]]
+# Generates synthetic activity_main.xml layouts of growing size and depth, grades each one with every
+# suite and engine, and writes machine-readable metrics as JSON: parse and index time, per-test time,
+# latency percentiles, throughput and peak RSS. Each (suite, engine) pair runs in its own worker
+# process, so peak RSS is per engine. --compare exits 1 when a p50 latency or the parse time regressed
+# by more than --threshold against an earlier output.
+#   runner - the pytest command runner.sh runs (report enhanced in-session) in a fresh process per submission;
+#            inside a judge image (/app) runner.sh itself is run
+#   warm   - in-process warm pytest session (warm_session.py)
+#   fast   - in-process FastEvaluator (fast_eval.py)
+
+ROOT_DIR = Path(__file__).parent.resolve()
+# Judge runtime modules, baked into the base image next to the suite; here they come from the repository
+RUNTIME_DIR = ROOT_DIR / "judge"
+DEFAULT_SUITES = ["Assignment1", "assignment2", "assignment3"]
+ENGINES = ["runner", "warm", "fast"]
+
+# name -> (views, max depth)
+SIZES = {
+    "tiny": (5, 2),
+    "small": (100, 4),
+    "medium": (1000, 8),
+    "large": (5000, 16),
+    "huge": (20000, 32),
+}
+DEFAULT_SIZES = ["tiny", "small", "medium", "large"]
+
+NAMESPACES = {
+    "android": "http://schemas.android.com/apk/res/android",
+    "app": "http://schemas.android.com/apk/res-auto",
+    "tools": "http://schemas.android.com/tools",
+    "custom": "http://schemas.example.com/custom",
+}
+CONTAINERS = ["LinearLayout", "RelativeLayout", "FrameLayout"]
+LEAVES = ["TextView"] * 6 + ["ImageView", "Button", "View"]
+
+
+def _attributes(rng, tag, index):
+    attrs = [
+        ("android:layout_width", rng.choice(["wrap_content", "match_parent", "0dp", "120dp"])),
+        ("android:layout_height", rng.choice(["wrap_content", "match_parent", "48dp"])),
+        ("android:id", f"@+id/view{index}"),
+    ]
+    if tag == "TextView":
+        attrs += [
+            ("android:text", f"Item {index}"),
+            ("android:textSize", f"{rng.randint(10, 40)}sp"),
+            ("tools:text", f"Preview {index}"),
+        ]
+        if rng.random() < 0.3:
+            attrs.append(("android:textStyle", rng.choice(["bold", "italic", "bold|italic"])))
+    if tag == "LinearLayout":
+        attrs.append(("android:orientation", rng.choice(["vertical", "horizontal"])))
+    if rng.random() < 0.4:
+        attrs.append(("app:layout_constraintTop_toTopOf", "parent"))
+    if rng.random() < 0.2:
+        attrs.append(("custom:weight", str(rng.randint(1, 5))))
+    if rng.random() < 0.1:
+        # Un-namespaced attribute, as hand-written layouts sometimes have
+        attrs.append(("style", "@style/Body"))
+    return attrs
+
+
+def generate_layout(views, depth, seed=0):
+    """Return activity_main.xml text with about `views` elements nested up to `depth` levels.
+
+    The root and the first TextView follow the assignments' solution, so every suite
+    runs all of its checks to completion rather than stopping at the first failure.
+    """
+    rng = random.Random(seed)
+    # children[i] lists the child node ids of node i; node 0 is the root LinearLayout
+    tags = ["LinearLayout", "TextView"]
+    children = [[1], []]
+    depths = [0, 1]
+    containers = [0]
+    # A spine of nested containers guarantees the requested depth
+    parent = 0
+    for _ in range(1, depth):
+        tags.append(rng.choice(CONTAINERS))
+        children.append([])
+        depths.append(depths[parent] + 1)
+        children[parent].append(len(tags) - 1)
+        parent = len(tags) - 1
+        containers.append(parent)
+    while len(tags) < views:
+        parent = rng.choice(containers)
+        is_container = depths[parent] + 1 < depth and rng.random() < 0.2
+        tags.append(rng.choice(CONTAINERS) if is_container else rng.choice(LEAVES))
+        children.append([])
+        depths.append(depths[parent] + 1)
+        children[parent].append(len(tags) - 1)
+        if is_container:
+            containers.append(len(tags) - 1)
+
+    xmlns = " ".join(f'xmlns:{prefix}="{uri}"' for prefix, uri in NAMESPACES.items())
+    lines = ['<?xml version="1.0" encoding="utf-8"?>']
+
+    def emit(node):
+        indent = "    " * depths[node]
+        tag = tags[node]
+        if node == 0:
+            attrs = [("android:layout_width", "match_parent"), ("android:layout_height", "match_parent"),
+                     ("android:orientation", "vertical"), ("android:gravity", "center"),
+                     ("tools:context", ".MainActivity")]
+        elif node == 1:
+            attrs = [("android:layout_width", "wrap_content"), ("android:layout_height", "wrap_content"),
+                     ("android:text", "Hi Android"), ("android:textSize", "32sp"),
+                     ("android:textStyle", "bold")]
+        else:
+            attrs = _attributes(rng, tag, node)
+        rendered = " ".join(f'{name}="{value}"' for name, value in attrs)
+        if node == 0:
+            rendered = f"{xmlns} {rendered}"
+        if not children[node]:
+            lines.append(f"{indent}<{tag} {rendered} />")
+            return
+        lines.append(f"{indent}<{tag} {rendered}>")
+        if node % 7 == 0:
+            lines.append(f"{indent}    <!-- section {node} -->")
+        for child in children[node]:
+            emit(child)
+        lines.append(f"{indent}</{tag}>")
+
+    emit(0)
+    return "\n".join(lines) + "\n"
+
+
+def write_layouts(work_dir, sizes, seed):
+    """Write one submission folder per size; returns name -> (folder, description)."""
+    layouts = {}
+    for name in sizes:
+        views, depth = SIZES[name]
+        folder = Path(work_dir) / name
+        folder.mkdir(parents=True, exist_ok=True)
+        text = generate_layout(views, depth, seed)
+        (folder / "activity_main.xml").write_text(text, encoding="utf-8")
+        layouts[name] = (folder, {"views": views, "depth": depth, "bytes": len(text.encode("utf-8"))})
+    return layouts
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+    return {
+        "mean": round(statistics.fmean(ordered), 3),
+        "p50": round(pick(0.50), 3),
+        "p90": round(pick(0.90), 3),
+        "p99": round(pick(0.99), 3),
+        "max": round(ordered[-1], 3),
+    }
+
+
+def test_times(reports):
+    """Mean setup+call+teardown time in ms of each test across reports."""
+    totals = {}
+    for report in reports:
+        for test in report.get("tests", []):
+            duration = sum(test.get(stage, {}).get("duration", 0.0) for stage in ("setup", "call", "teardown"))
+            totals.setdefault(test["nodeid"], []).append(duration * 1000)
+    return {nodeid: round(statistics.fmean(values), 3) for nodeid, values in totals.items()}
+
+
+def parse_times(suite_dir, layouts, repeat):
+    """Median ms to parse each layout and to build its LayoutIndex."""
+    from lxml import etree
+    from layout_index import LayoutIndex
+
+    times = {}
+    for name, folder in layouts.items():
+        data = (Path(folder) / "activity_main.xml").read_bytes()
+        parse, index = [], []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            root = etree.fromstring(data)
+            parse.append((time.perf_counter() - start) * 1000)
+            start = time.perf_counter()
+            LayoutIndex(root)
+            index.append((time.perf_counter() - start) * 1000)
+        times[name] = {"parse_ms": round(statistics.median(parse), 3), "index_ms": round(statistics.median(index), 3)}
+    return times
+
+
+def runner_grade(suite_dir, submission_dir):
+    """Grade once the way runner.sh does, in a fresh process; returns the enhanced report."""
+    env = {**os.environ, "SUBMISSION_DIR": str(submission_dir), "REPORT_FORMAT": "compact",
+           "PYTHONPATH": os.pathsep.join([str(submission_dir), str(suite_dir), str(RUNTIME_DIR), os.environ.get("PYTHONPATH", "")])}
+    if suite_dir == Path("/app") and (suite_dir / "runner.sh").exists():
+        command = ["/app/runner.sh"]
+    else:
+        command = [sys.executable, "-m", "pytest", str(suite_dir / "test_assignment.py"), "-p", "judge_timings",
+                   "-p", "tiers", "-p", "solution_diff", "-p", "java_checks", "-p", "report_stream", "--json-report", "--json-report-file=none", "-v", "-p", "no:cacheprovider"]
+    output = subprocess.run(command, cwd=suite_dir, env=env, capture_output=True, text=True).stdout
+    return json.loads(output)
+
+
+def run_worker(suite_dir, engine, layouts, repeat):
+    """Measure one engine of one suite against every layout; runs in its own process."""
+    suite_dir = Path(suite_dir).resolve()
+    sys.path[:0] = [str(suite_dir), str(RUNTIME_DIR)]
+    os.chdir(suite_dir)
+    from enhance_json import enhance_data
+
+    def measure(grade):
+        results = {}
+        for name, folder in layouts.items():
+            grade(folder)  # warm-up, not counted
+            latencies, reports = [], []
+            start_all = time.perf_counter()
+            for _ in range(repeat):
+                start = time.perf_counter()
+                report = grade(folder)
+                latencies.append((time.perf_counter() - start) * 1000)
+                reports.append(report)
+            elapsed = time.perf_counter() - start_all
+            enhanced = reports[-1] if "stats" in reports[-1] else enhance_data(reports[-1])
+            results[name] = {
+                "latency_ms": percentiles(latencies),
+                "throughput_per_s": round(repeat / elapsed, 3) if elapsed else None,
+                "percentage": enhanced["stats"]["percentage"],
+                "tests_ms": test_times(reports),
+            }
+        return results
+
+    if engine == "runner":
+        results = measure(lambda folder: runner_grade(suite_dir, folder))
+        peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    elif engine == "warm":
+        from warm_session import run_warm
+        results = run_warm(measure, suite_dir / "test_assignment.py")
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    else:
+        from fast_eval import FastEvaluator
+        results = measure(FastEvaluator(suite_dir / "test_assignment.py").grade)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    for name, times in parse_times(suite_dir, layouts, repeat).items():
+        results[name].update(times)
+    return {"results": results, "peak_rss_kb": peak}
+
+
+def compare(current, previous, threshold):
+    """Regressions of p50 latency and parse time beyond threshold x the previous run."""
+    def keyed(data):
+        return {(r["suite"], r["engine"], r["layout"]): r for r in data.get("results", []) if "layout" in r}
+
+    regressions = []
+    old = keyed(previous)
+    for key, result in keyed(current).items():
+        before = old.get(key)
+        if before is None:
+            continue
+        for metric, now, then in [("latency_ms.p50", result["latency_ms"]["p50"], before["latency_ms"]["p50"]),
+                                  ("parse_ms", result["parse_ms"], before["parse_ms"])]:
+            if then and now > then * threshold:
+                regressions.append({"suite": key[0], "engine": key[1], "layout": key[2], "metric": metric,
+                                    "previous": then, "current": now, "ratio": round(now / then, 3)})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the judge against synthetic layouts")
+    parser.add_argument("--suites", nargs="+", default=DEFAULT_SUITES, help="assignment folders to benchmark")
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=ENGINES)
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON metrics here instead of stdout")
+    parser.add_argument("--compare", help="earlier JSON output to check for regressions")
+    parser.add_argument("--threshold", type=float, default=1.25)
+    parser.add_argument("--worker", nargs=3, metavar=("SUITE_DIR", "ENGINE", "LAYOUTS_JSON"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        suite_dir, engine, layouts = args.worker
+        result = run_worker(suite_dir, engine, json.loads(layouts), args.repeat)
+        # Warm sessions and fast runs print nothing else, but keep the result on its own last line
+        sys.stdout.write("\n" + json.dumps(result) + "\n")
+        return 0
+
+    with tempfile.TemporaryDirectory(prefix="bench-layouts-") as work_dir:
+        layouts = write_layouts(work_dir, args.sizes, args.seed)
+        folders = {name: str(folder) for name, (folder, _) in layouts.items()}
+        output = {
+            "created": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "seed": args.seed,
+            "layouts": {name: info for name, (_, info) in layouts.items()},
+            "results": [],
+        }
+        for suite in args.suites:
+            suite_dir = (ROOT_DIR / suite).resolve()
+            for engine in args.engines:
+                proc = subprocess.run([sys.executable, __file__, "--repeat", str(args.repeat),
+                                       "--worker", str(suite_dir), engine, json.dumps(folders)],
+                                      capture_output=True, text=True)
+                if proc.returncode != 0:
+                    output["results"].append({"suite": suite, "engine": engine,
+                                              "error": proc.stderr.strip().splitlines()[-1:]})
+                    continue
+                worker = json.loads(proc.stdout.strip().splitlines()[-1])
+                for name in args.sizes:
+                    output["results"].append({"suite": suite, "engine": engine, "layout": name,
+                                              "peak_rss_kb": worker["peak_rss_kb"], **worker["results"][name]})
+
+    status = 0
+    if args.compare:
+        output["regressions"] = compare(output, json.loads(Path(args.compare).read_text()), args.threshold)
+        status = 1 if output["regressions"] else 0
+    text = json.dumps(output, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+    else:
+        sys.stdout.write(text + "\n")
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,31 +1,423 @@
 import sys
-import os
+import hashlib
+import json
+import shutil
+import tarfile
 from pathlib import Path
 
 # Usage:
 # python3 generic_assignment_generator.py "starter.xml" "solution.xml" "assignment_name" "assignment_id" "description"
 # The script will read the two XML files and generate all assignment files, build the Docker image, and create the x86 tar file in a new folder.
+# The Docker image is a thin layer over the shared android-judge-base image (judge/Dockerfile.base), which is
+# built and saved to judge-base.tar once. x86.tar only carries the assignment layers; load judge-base.tar first,
+# or pass --full-tar for a standalone tar. Rebuilds are skipped when .build_manifest.json shows no input changed;
+# pass --force to rebuild anyway.
+# python3 generic_assignment_generator.py --bundle [assignment_folder ...]
+# builds one android-judge-x86 image carrying every assignment's suite under /app/suites/<assignment_id>
+# (all folders with a test_assignment.py by default) and saves it to judge_bundle/judge.tar. The id is the one
+# recorded in the folder's assignment.json when it was generated.
+# --spec=assignment_spec.json (or .yaml) generates test_assignment.py from a declarative rule spec (judge/rule_spec.py)
+# instead of the fixed template suite; --derive-spec derives a starting spec from the starter and solution XML.
+# The spec used is saved as assignment_spec.json in the assignment folder.
+# --fast-start[=budget_ms] builds a cold-start image for one-shot `docker run` grading (judge/fast_start.py): bytecode
+# compiled at build time, no pytest plugin autoload, no shell between CMD and the grader. The build fails when the
+# time from interpreter start to the first test is over budget_ms (default 1500).
 
 from zipfile import ZipFile
 import subprocess
+import re
+import xml.etree.ElementTree as ET
 
 TEMPLATE_FILES = [
-    ("Dockerfile", '''FROM python:3.11-slim\n\nUSER root\n\nWORKDIR /app\n\nRUN pip install pytest pytest-json-report lxml\n\nCOPY conftest.py /app/conftest.py\nCOPY pytest.ini /app/pytest.ini\nCOPY test_assignment.py /app/test_assignment.py\nCOPY runner.sh /app/runner.sh\nCOPY enhance_json.py /app/enhance_json.py\n\nRUN chmod +x /app/runner.sh /app/enhance_json.py\n\nCMD [\"/bin/sh\", \"-c\", \"export PYTHONPATH=/app/submission:/app:$PYTHONPATH && /app/runner.sh\"]\n'''),
-    ("runner.sh", '''#!/bin/bash\nset +e\n\nexport PYTHONPATH=/app/submission:/app:$PYTHONPATH\n\npytest /app/test_assignment.py --json-report --json-report-file=/tmp/report.json -v > /dev/null 2>&1\n\npython3 /app/enhance_json.py /tmp/report.json\n\nexit 0\n'''),
-    ("enhance_json.py", '''#!/usr/bin/env python3\n\nimport json\nimport sys\nimport os\n\nos.environ['PYTHONUNBUFFERED'] = '1'\n\ndef enhance_report(report_file):\n    try:\n        if not os.path.exists(report_file):\n            raise FileNotFoundError(f\"Report file {report_file} not found\")\n        with open(report_file, 'r') as f:\n            content = f.read()\n        data = json.loads(content)\n        summary = data.get('summary', {})\n        passed = summary.get('passed', 0)\n        failed = summary.get('failed', 0)\n        total = summary.get('total', 0)\n        if total > 0:\n            marks = passed / total\n        else:\n            marks = 0\n        data['stats'] = {\n            'total_tests': total,\n            'passed': passed,\n            'failed': failed,\n            'marks': round(marks, 2),\n            'percentage': round(marks * 100, 2)\n        }\n        output = json.dumps(data, indent=2)\n        sys.stdout.write(output)\n        sys.stdout.write('\\n')\n        sys.stdout.flush()\n    except Exception as e:\n        error_data = {\n            'error': str(e),\n            'stats': {\n                'total_tests': 0,\n                'passed': 0,\n                'failed': 1,\n                'marks': 0.0,\n                'percentage': 0.0\n            }\n        }\n        output = json.dumps(error_data, indent=2)\n        sys.stdout.write(output)\n        sys.stdout.write('\\n')\n        sys.stdout.flush()\n    return 0\n\nif __name__ == '__main__':\n    if len(sys.argv) < 2:\n        error_output = json.dumps({'error': 'Missing report file argument', 'stats': {'total_tests': 0, 'passed': 0, 'failed': 1, 'marks': 0.0, 'percentage': 0.0}})\n        sys.stdout.write(error_output)\n        sys.stdout.write('\\n')\n        sys.stdout.flush()\n        sys.exit(0)\n    enhance_report(sys.argv[1])\n    sys.exit(0)\n'''),
-    ("conftest.py", '''import sys\nfrom pathlib import Path\nsubmission_path = Path("/app/submission").resolve()\nif submission_path not in [Path(p).resolve() for p in sys.path]:\n    sys.path.insert(0, str(submission_path))\n'''),
+    ("Dockerfile", '''ARG BASE_IMAGE=android-judge-base:latest\nFROM ${BASE_IMAGE}\n\nUSER root\n\nWORKDIR /app\n\nCOPY conftest.py /app/conftest.py\nCOPY pytest.ini /app/pytest.ini\nCOPY test_assignment.py /app/test_assignment.py\nCOPY solution.zip /app/solution.zip\nCOPY runner.sh /app/runner.sh\nCOPY enhance_json.py /app/enhance_json.py\n\nRUN chmod +x /app/runner.sh /app/enhance_json.py\n\nCMD [\"/bin/sh\", \"-c\", \"export PYTHONPATH=/app/submission:/app:$PYTHONPATH && /app/runner.sh\"]\n'''),
+    ("runner.sh", '''#!/bin/bash\nset +e\n\n# Process start for the 'startup' phase of the report timings\nexport JUDGE_START=\"${JUDGE_START:-$(date +%s.%N)}\"\n\nexport PYTHONPATH=/app/submission:/app:$PYTHONPATH\n\n# A submission mounted as a zip is graded straight from the archive\nif [ -z \"$SUBMISSION_DIR\" ] && [ -f /app/submission.zip ]; then\n    export SUBMISSION_DIR=/app/submission.zip\nfi\n\n# The multi-assignment image bundles suites under /app/suites/<assignment_id>\nif [ -n \"$1\" ]; then\n    export ASSIGNMENT_ID=\"$1\"\nfi\nTEST_FILE=/app/test_assignment.py\nif [ -n \"$ASSIGNMENT_ID\" ] && [ -f \"/app/suites/$ASSIGNMENT_ID/test_assignment.py\" ]; then\n    TEST_FILE=\"/app/suites/$ASSIGNMENT_ID/test_assignment.py\"\nfi\n\nif [ \"$JUDGE_MODE\" = \"daemon\" ]; then\n    exec python3 /app/judge_daemon.py ${JUDGE_SOCKET:+--socket \"$JUDGE_SOCKET\"}\nfi\n\nif [ -n \"$BATCH_DIR\" ]; then\n    python3 /app/batch_runner.py \"$BATCH_DIR\" \"${BATCH_OUTPUT_DIR:-/app/reports}\"\n    exit 0\nfi\n\nif [ \"$JUDGE_ENGINE\" = \"fast\" ] || [ \"$JUDGE_ENGINE\" = \"parity\" ]; then\n    python3 /app/fast_eval.py \"${SUBMISSION_DIR:-/app/submission}\"\n    exit 0\nfi\n\n# One interpreter: report_stream enhances the in-memory report and prints it when the session ends\npytest \"$TEST_FILE\" -p judge_timings -p tiers -p solution_diff -p java_checks -p report_stream --json-report --json-report-file=none -v 2> /dev/null\n\n# Usage errors stop pytest before any plugin runs\nif [ $? -eq 4 ]; then\n    python3 -c \"from enhance_json import error_data, write_report; write_report(error_data('pytest could not start'))\"\nfi\n\nexit 0\n'''),
+    ("enhance_json.py", '''#!/usr/bin/env python3\n\nimport json\nimport sys\nimport os\nimport time\n\nos.environ['PYTHONUNBUFFERED'] = '1'\n\ndef build_stats(data):\n    summary = data.get('summary', {})\n    passed = summary.get('passed', 0)\n    failed = summary.get('failed', 0)\n    total = summary.get('total', 0)\n    if total > 0:\n        marks = passed / total\n    else:\n        marks = 0\n    stats = {\n        'total_tests': total,\n        'passed': passed,\n        'failed': failed,\n        'marks': round(marks, 2),\n        'percentage': round(marks * 100, 2)\n    }\n    if summary.get('blocked'):\n        stats['blocked'] = summary['blocked']\n    # Java checks of MainActivity.java (java_checks.py) are reported next to the marks, not in them\n    java = (data.get('java') or {}).get('summary')\n    if java:\n        stats['java'] = dict(java, percentage=round(java['passed'] / java['total'] * 100, 2) if java['total'] else 0.0)\n    return stats\n\ndef enhance_data(data):\n    data['stats'] = build_stats(data)\n    return data\n\ndef error_data(message):\n    return {\n        'error': message,\n        'stats': {\n            'total_tests': 0,\n            'passed': 0,\n            'failed': 1,\n            'marks': 0.0,\n            'percentage': 0.0\n        }\n    }\n\ndef add_report_timing(data, start_wall, start_cpu):\n    if isinstance(data.get('timings'), dict):\n        data['timings']['report'] = {\n            'wall_ms': round((time.perf_counter() - start_wall) * 1000, 3),\n            'cpu_ms': round((time.process_time() - start_cpu) * 1000, 3)\n        }\n    return data\n\ndef write_report(data, stream=None, report_format=None):\n    stream = stream or sys.stdout\n    report_format = report_format or os.environ.get('REPORT_FORMAT', 'compact')\n    if report_format == 'pretty':\n        output = json.dumps(data, indent=2)\n    else:\n        output = json.dumps(data, separators=(',', ':'))\n    stream.write(output)\n    stream.write('\\n')\n    stream.flush()\n\ndef enhance_report(report_file):\n    try:\n        start_wall, start_cpu = time.perf_counter(), time.process_time()\n        if not os.path.exists(report_file):\n            raise FileNotFoundError(f\"Report file {report_file} not found\")\n        with open(report_file, 'r') as f:\n            content = f.read()\n        data = add_report_timing(enhance_data(json.loads(content)), start_wall, start_cpu)\n        write_report(data)\n    except Exception as e:\n        write_report(error_data(str(e)))\n    return 0\n\nif __name__ == '__main__':\n    if len(sys.argv) < 2:\n        write_report(error_data('Missing report file argument'), report_format='compact')\n        sys.exit(0)\n    enhance_report(sys.argv[1])\n    sys.exit(0)\n'''),
+    ("conftest.py", '''import sys\nfrom pathlib import Path\nsubmission_path = Path("/app/submission").resolve()\nif submission_path not in [Path(p).resolve() for p in sys.path]:\n    sys.path.insert(0, str(submission_path))\n# The judge runtime is baked into the base image; outside it, use the repository's judge/ folder\njudge_path = Path(__file__).resolve().parent.parent / "judge"\nif judge_path.is_dir() and str(judge_path) not in sys.path:\n    sys.path.append(str(judge_path))\n'''),
     ("pytest.ini", '''[pytest]\npython_files = test_*.py\npython_classes = Test*\npython_functions = test_*\nmarkers =\n    layout: Layout related tests\n    textview: TextView related tests\n    smoke: Smoke tests\n'''),
     ("docker-compose.yml", '''version: '3.8'\nservices:\n  judge:\n    image: {image_name}:latest\n    platform: linux/amd64\n    working_dir: /app\n    volumes:\n      - ./src:/app/submission:ro\n    networks:\n      - judge-network\n    security_opt:\n      - no-new-privileges:true\n    cap_drop:\n      - ALL\n    deploy:\n      resources:\n        limits:\n          cpus: '1'\n          memory: 512M\n        reservations:\n          cpus: '0.5'\n          memory: 256M\n    tmpfs:\n      - /tmp:rw,noexec,nosuid,size=50m\n    stdin_open: true\n    tty: true\n    command: /bin/sh -c \"export PYTHONPATH=/app/submission:/app:$PYTHONPATH && /app/runner.sh\"\nnetworks:\n  judge-network:\n    driver: bridge\n'''),
-    ("test_assignment.py", '''import pytest\nfrom lxml import etree\nimport os\n\nSUBMISSION_DIR = '/app/submission'\n\n@pytest.fixture\ndef xml_tree():\n    xml_file = os.path.join(SUBMISSION_DIR, 'activity_main.xml')\n    if not os.path.exists(xml_file):\n        pytest.skip(f\"XML file not found at {xml_file}\")\n    try:\n        tree = etree.parse(xml_file)\n        return tree\n    except Exception as e:\n        pytest.fail(f\"XML parsing failed: {e}\")\n\n@pytest.fixture\ndef root_element(xml_tree):\n    return xml_tree.getroot()\n\nclass TestLayout:\n    def test_xml_is_wellformed(self, xml_tree):\n        assert xml_tree is not None, \"XML file could not be parsed\"\n\n    def test_root_is_linear_layout(self, root_element):\n        assert root_element.tag.endswith('LinearLayout'), f\"Root element should be LinearLayout, got {root_element.tag}\"\n\n    def test_layout_dimensions(self, root_element):\n        width = root_element.get('{http://schemas.android.com/apk/res/android}layout_width')\n        height = root_element.get('{http://schemas.android.com/apk/res/android}layout_height')\n        assert width == 'match_parent', f\"Layout width should be match_parent, got {width}\"\n        assert height == 'match_parent', f\"Layout height should be match_parent, got {height}\"\n\n    def test_layout_gravity_center(self, root_element):\n        gravity = root_element.get('{http://schemas.android.com/apk/res/android}gravity')\n        assert gravity is not None and 'center' in gravity.lower(), f\"Layout gravity should be center, got {gravity}\"\n\nclass TestTextView:\n    def test_textview_exists(self, root_element):\n        textviews = root_element.findall('.//TextView')\n        assert len(textviews) > 0, \"No TextView found in the layout\"\n\n    def test_textview_text(self, root_element):\n        textviews = root_element.findall('.//TextView')\n        found = any(tv.get('{http://schemas.android.com/apk/res/android}text') == 'Hi Android' or tv.get('android:text') == 'Hi Android' for tv in textviews)\n        assert found, \"TextView with text 'Hi Android' not found\"\n\n    def test_textview_dimensions(self, root_element):\n        textviews = root_element.findall('.//TextView')\n        assert any(tv.get('{http://schemas.android.com/apk/res/android}layout_width') in ['wrap_content', '400dp'] for tv in textviews), \"TextView width should be wrap_content or 400dp\"\n        assert any(tv.get('{http://schemas.android.com/apk/res/android}layout_height') in ['wrap_content', '70dp'] for tv in textviews), \"TextView height should be wrap_content or 70dp\"\n\n    def test_textview_textsize(self, root_element):\n        textviews = root_element.findall('.//TextView')\n        found = False\n        for tv in textviews:\n            size = tv.get('{http://schemas.android.com/apk/res/android}textSize')\n            if size:\n                try:\n                    value = int(''.join(filter(str.isdigit, size)))\n                    if value >= 24:\n                        found = True\n                        break\n                except Exception:\n                    continue\n        assert found, \"TextView textSize should be at least 24sp\"\n\n    def test_textview_textstyle_bold(self, root_element):\n        textviews = root_element.findall('.//TextView')\n        found = any('bold' in (tv.get('{http://schemas.android.com/apk/res/android}textStyle') or '') for tv in textviews)\n        assert found, \"TextView should have textStyle bold\"\n'''),
+    ("test_assignment.py", '''import pytest\nimport os\nfrom submission_cache import load_submission\n\nSUBMISSION_DIR = os.environ.get('SUBMISSION_DIR', '/app/submission')\n\n@pytest.fixture(scope='session')\ndef submission():\n    return load_submission(SUBMISSION_DIR)\n\n@pytest.fixture(scope='session')\ndef xml_tree(submission):\n    if not submission.exists:\n        pytest.skip(f\"XML file not found at {submission.path}\")\n    if submission.error is not None:\n        pytest.fail(f\"XML parsing failed: {submission.error}\")\n    return submission.tree\n\n@pytest.fixture(scope='session')\ndef root_element(xml_tree):\n    return xml_tree.getroot()\n\n@pytest.fixture(scope='session')\ndef layout_index(submission, xml_tree):\n    return submission.index\n\nclass TestLayout:\n    def test_xml_is_wellformed(self, xml_tree):\n        assert xml_tree is not None, \"XML file could not be parsed\"\n\n    def test_root_is_linear_layout(self, root_element):\n        assert root_element.tag.endswith('LinearLayout'), f\"Root element should be LinearLayout, got {root_element.tag}\"\n\n    def test_layout_dimensions(self, layout_index):\n        width = layout_index.root.get('layout_width')\n        height = layout_index.root.get('layout_height')\n        assert width == 'match_parent', f\"Layout width should be match_parent, got {width}\"\n        assert height == 'match_parent', f\"Layout height should be match_parent, got {height}\"\n\n    def test_layout_gravity_center(self, layout_index):\n        gravity = layout_index.root.get('gravity')\n        assert gravity is not None and 'center' in gravity.lower(), f\"Layout gravity should be center, got {gravity}\"\n\nclass TestTextView:\n    def test_textview_exists(self, layout_index):\n        textviews = layout_index.findall('TextView')\n        assert len(textviews) > 0, \"No TextView found in the layout\"\n\n    def test_textview_text(self, layout_index):\n        textviews = layout_index.findall('TextView')\n        found = any(tv.get('text') == 'Hi Android' for tv in textviews)\n        assert found, \"TextView with text 'Hi Android' not found\"\n\n    def test_textview_dimensions(self, layout_index):\n        textviews = layout_index.findall('TextView')\n        assert any(tv.get('layout_width') in ['wrap_content', '400dp'] for tv in textviews), \"TextView width should be wrap_content or 400dp\"\n        assert any(tv.get('layout_height') in ['wrap_content', '70dp'] for tv in textviews), \"TextView height should be wrap_content or 70dp\"\n\n    def test_textview_textsize(self, layout_index):\n        textviews = layout_index.findall('TextView')\n        found = False\n        for tv in textviews:\n            size = tv.get('textSize')\n            if size:\n                try:\n                    value = int(''.join(filter(str.isdigit, size)))\n                    if value >= 24:\n                        found = True\n                        break\n                except Exception:\n                    continue\n        assert found, \"TextView textSize should be at least 24sp\"\n\n    def test_textview_textstyle_bold(self, layout_index):\n        textviews = layout_index.findall('TextView')\n        found = any('bold' in (tv.get('textStyle') or '') for tv in textviews)\n        assert found, \"TextView should have textStyle bold\"\n'''),
     ("ARCHITECTURE.md", "# This assignment was generated automatically.\n"),
     ("README.md", "# This assignment was generated automatically.\n")
 ]
 
+# Shared judge runtime modules; Dockerfile.base bakes every judge/*.py into the base image
+RUNTIME_DIR = Path(__file__).parent.resolve() / "judge"
+
+# Shared base image with Python, the grading dependencies and the runtime, built once for all assignments
+BASE_DOCKERFILE = RUNTIME_DIR / "Dockerfile.base"
+BASE_IMAGE_NAME = "android-judge-base"
+MANIFEST_FILE = ".build_manifest.json"
+
+# Multi-assignment judge image (--bundle): suites live under /app/suites/<assignment_id>
+BUNDLE_DIR = "judge_bundle"
+BUNDLE_IMAGE_NAME = "android-judge-x86"
+SUITE_FILES = ["test_assignment.py", "pytest.ini", "conftest.py"]
+# Recorded in every generated folder; --bundle serves the suite under this assignment_id
+ASSIGNMENT_FILE = "assignment.json"
+# Reference layout for the structural feedback (solution_diff.py), copied as-is
+SOLUTION_ZIP = "solution.zip"
+
+# Cold-start image (--fast-start)
+DEFAULT_START_BUDGET_MS = 1500
+
+# Rule spec suites (--spec / --derive-spec)
+SPEC_FILE = "assignment_spec.json"
+SPEC_NAMESPACES = {
+    "http://schemas.android.com/apk/res/android": "",
+    "http://schemas.android.com/apk/res-auto": "app:",
+    "http://schemas.android.com/tools": "tools:",
+}
+# Design-time attributes never decide a grade
+SPEC_SKIP_PREFIXES = ("tools:",)
+
+def sha256(data):
+    if isinstance(data, str):
+        data = data.encode()
+    return hashlib.sha256(data).hexdigest()
+
+def docker(*args, cwd=None, **kwargs):
+    try:
+        return subprocess.run(["docker", *args], cwd=cwd, **kwargs)
+    except FileNotFoundError:
+        return subprocess.CompletedProcess(["docker", *args], 127, "", "docker not found")
+
+def image_exists(image):
+    return docker("image", "inspect", image, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode == 0
+
+def base_tag():
+    """Content hash of Dockerfile.base and the runtime modules it copies."""
+    sources = [BASE_DOCKERFILE] + sorted(RUNTIME_DIR.glob("*.py"))
+    return sha256(b"".join(path.name.encode() + b"\0" + path.read_bytes() + b"\0" for path in sources))[:12]
+
+def ensure_base_image(root_dir, force=False):
+    """Build (once) and save the shared base image; returns its content-addressed tag."""
+    base_image = f"{BASE_IMAGE_NAME}:{base_tag()}"
+    base_tar = root_dir / "judge-base.tar"
+    if force or not image_exists(base_image):
+        if docker("buildx", "build", "--platform", "linux/amd64", "-t", base_image, "-t", f"{BASE_IMAGE_NAME}:latest",
+                  "-f", str(BASE_DOCKERFILE), str(RUNTIME_DIR)).returncode != 0:
+            sys.exit(f"❌ Failed to build the shared base image {base_image}")
+        if base_tar.exists():
+            base_tar.unlink()
+    if not base_tar.exists() and docker("save", "-o", str(base_tar), base_image).returncode != 0:
+        sys.exit(f"❌ Failed to save {base_image} to {base_tar}")
+    return base_image
+
+def image_layers(image):
+    result = docker("image", "inspect", "--format", "{{json .RootFS.Layers}}", image, capture_output=True, text=True)
+    return json.loads(result.stdout) if result.returncode == 0 else []
+
+def strip_base_layers(tar_path, base_image):
+    """Rewrite a docker save tar without the layers it shares with the base image.
+
+    docker load skips layers that are already present, so the thin tar loads on
+    any host that has loaded judge-base.tar first.
+    """
+    shared = len(image_layers(base_image))
+    if not shared:
+        return
+    with tarfile.open(tar_path) as src:
+        manifest = json.load(src.extractfile("manifest.json"))
+        base_paths = {path for entry in manifest for path in entry["Layers"][:shared]}
+        keep_paths = {path for entry in manifest for path in entry["Layers"][shared:]}
+        # Legacy layouts store each layer in its own <id>/ folder next to json/VERSION
+        base_dirs = {path.rsplit("/", 1)[0] + "/" for path in base_paths - keep_paths
+                     if path.endswith("/layer.tar")}
+        thin_path = tar_path.with_suffix(".thin")
+        with tarfile.open(thin_path, "w") as dst:
+            for member in src.getmembers():
+                if (member.name in base_paths - keep_paths or member.name + "/" in base_dirs
+                        or any(member.name.startswith(d) for d in base_dirs)):
+                    continue
+                dst.addfile(member, src.extractfile(member) if member.isfile() else None)
+    thin_path.replace(tar_path)
+
+def build_manifest(files, base_image, full_tar, **inputs):
+    return {
+        "base_image": base_image,
+        "full_tar": full_tar,
+        **{name: sha256(content) for name, content in inputs.items()},
+        "files": {fname: sha256(content) for fname, content in files},
+    }
+
+def build_image(build_dir, image_name, tar_name, manifest, force=False, full_tar=False):
+    """Build and save image_name from build_dir unless its manifest is unchanged; returns False when skipped."""
+    manifest_path = build_dir / MANIFEST_FILE
+    previous = json.loads(manifest_path.read_text()) if manifest_path.exists() else None
+    if not force and previous == manifest and (build_dir / tar_name).exists() and image_exists(f"{image_name}:latest"):
+        return False
+    if docker("buildx", "build", "--platform", "linux/amd64", "--build-arg", f"BASE_IMAGE={manifest['base_image']}",
+              "-t", f"{image_name}:latest", ".", cwd=build_dir).returncode != 0:
+        sys.exit(f"❌ Failed to build {image_name}:latest")
+    if docker("save", "-o", tar_name, f"{image_name}:latest", cwd=build_dir).returncode != 0:
+        sys.exit(f"❌ Failed to save {image_name}:latest to {tar_name}")
+    if not full_tar:
+        strip_base_layers(build_dir / tar_name, manifest["base_image"])
+    manifest_path.write_text(json.dumps(manifest, indent=2) + "\n")
+    return True
+
+def template(fname):
+    return dict(TEMPLATE_FILES)[fname]
+
+def bundle_dockerfile():
+    """The assignment Dockerfile with the per-assignment suite files replaced by the suites folder."""
+    lines = []
+    for line in template("Dockerfile").splitlines():
+        if any(line == f"COPY {fname} /app/{fname}" for fname in SUITE_FILES + [SOLUTION_ZIP]):
+            continue
+        if line == "COPY runner.sh /app/runner.sh":
+            lines.append("COPY suites /app/suites")
+        lines.append(line)
+    return "\n".join(lines) + "\n"
+
+def start_budget(flag):
+    """Budget in ms of a --fast-start[=budget_ms] flag; exits with a usage error for anything but a positive number."""
+    value = flag.partition("=")[2]
+    if not value:
+        return DEFAULT_START_BUDGET_MS
+    try:
+        budget = float(value)
+    except ValueError:
+        budget = None
+    if budget is None or not 0 < budget < float("inf"):
+        sys.exit(f"❌ --fast-start budget must be a positive number of milliseconds, got {value!r}")
+    return budget
+
+def fast_start_dockerfile(dockerfile, budget_ms=DEFAULT_START_BUDGET_MS):
+    """The assignment Dockerfile with CMD running fast_start.py directly, after a build-time bytecode and budget check."""
+    lines = []
+    for line in dockerfile.splitlines():
+        if line.startswith("CMD "):
+            lines.append(f"ENV JUDGE_START_BUDGET_MS={budget_ms:g}")
+            lines.append("# Compile once, then grade the solution: leaves pytest's rewritten suite bytecode and fails an over-budget start")
+            lines.append("RUN python3 -m compileall -q /app && python3 /app/fast_start.py --check-budget")
+            lines.append("")
+            line = 'CMD ["python3", "/app/fast_start.py"]'
+        lines.append(line)
+    return "\n".join(lines) + "\n"
+
+def load_spec(path):
+    """Read a rule spec from JSON, or from YAML when PyYAML is installed."""
+    text = Path(path).read_text()
+    if Path(path).suffix.lower() in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError:
+            sys.exit(f"❌ {path} is YAML but PyYAML is not installed; pip install pyyaml or use JSON")
+        return yaml.safe_load(text)
+    return json.loads(text)
+
+def local_name(tag):
+    return tag.rsplit("}", 1)[-1]
+
+def spec_attribute(name):
+    """Spec name of a parsed attribute: android:text -> text, app:x -> app:x; None for unknown namespaces."""
+    if not name.startswith("{"):
+        return name
+    uri, local = name[1:].split("}", 1)
+    prefix = SPEC_NAMESPACES.get(uri)
+    return None if prefix is None else prefix + local
+
+def snake(name):
+    return re.sub(r"[^0-9a-z]+", "_", re.sub(r"([a-z0-9])([A-Z])", r"\1_\2", name).lower()).strip("_")
+
+def derive_spec(starter_xml, solution_xml, assignment_id):
+    """A starting spec from what the solution has and the starter lacks.
+
+    Rules: the solution's root element, every element type with its count in
+    the solution, and every attribute whose value the student has to change
+    (elements are paired by tag and position). Sizes (textSize, ...) become
+    minimums, everything else exact values; edit the result as needed.
+    """
+    try:
+        solution = ET.fromstring(solution_xml.encode("utf-8"))
+    except ET.ParseError as e:
+        sys.exit(f"❌ Solution XML does not parse: {e}")
+    try:
+        starter = ET.fromstring(starter_xml.encode("utf-8"))
+    except ET.ParseError:
+        starter = None
+    rules = []
+    used = set()
+
+    def add(rule_id, **rule):
+        base, n = rule_id, 2
+        while rule_id in used:
+            rule_id, n = f"{base}_{n}", n + 1
+        used.add(rule_id)
+        rules.append({"id": rule_id, **rule})
+
+    root_tag = local_name(solution.tag)
+    add(f"root_is_{snake(root_tag)}", group="TestLayout", root=True, element=root_tag, markers=["layout"])
+
+    def positions(root):
+        """{tag: [element, ...]} in document order, root excluded."""
+        found = {}
+        for element in root.iter():
+            if element is not root and isinstance(element.tag, str):
+                found.setdefault(local_name(element.tag), []).append(element)
+        return found
+
+    solved = positions(solution)
+    started = positions(starter) if starter is not None else {}
+    for tag, elements in solved.items():
+        add(f"{snake(tag)}_exists", group=f"Test{tag}", element=tag, min_count=len(elements))
+    pairs = [(solution, starter if starter is not None and local_name(starter.tag) == root_tag else None)]
+    for tag, elements in solved.items():
+        before = started.get(tag, [])
+        pairs += [(element, before[i] if i < len(before) else None) for i, element in enumerate(elements)]
+    for element, before in pairs:
+        tag = local_name(element.tag)
+        is_root = element is solution
+        for name, value in element.attrib.items():
+            attribute = spec_attribute(name)
+            if attribute is None or attribute.startswith(SPEC_SKIP_PREFIXES):
+                continue
+            if before is not None and before.get(name) == value:
+                continue
+            digits = "".join(filter(str.isdigit, value))
+            constraint = {"min": int(digits)} if attribute.endswith("Size") and digits else value
+            rule = {"group": "TestLayout" if is_root else f"Test{tag}", "element": tag,
+                    "attributes": {attribute: constraint}}
+            if is_root:
+                rule["root"] = True
+            add(f"{snake(tag)}_{snake(attribute)}", **rule)
+    return {"assignment_id": assignment_id, "rules": rules}
+
+def check_spec(spec):
+    """Validate spec with the runtime's rule_spec (needs lxml); returns False when it cannot be checked here."""
+    sys.path.insert(0, str(RUNTIME_DIR))
+    try:
+        import rule_spec
+    except ImportError:
+        return False
+    finally:
+        sys.path.remove(str(RUNTIME_DIR))
+    try:
+        rule_spec.compile_spec(spec)
+        rule_spec.check_namespaces()
+    except rule_spec.SpecError as e:
+        sys.exit(f"❌ Invalid assignment spec: {e}")
+    return True
+
+def render_suite(spec):
+    """test_assignment.py source for a rule spec: one test per rule, all answered by one XPath evaluation."""
+    rules = spec["rules"]
+    groups = {}
+    for rule in rules:
+        groups.setdefault(rule.get("group", "TestLayout"), []).append(rule)
+    lines = [
+        "import pytest",
+        "import os",
+        "from submission_cache import load_submission",
+        "from rule_spec import compile_spec",
+        "",
+        "SUBMISSION_DIR = os.environ.get('SUBMISSION_DIR', '/app/submission')",
+        "",
+        "# Generated from assignment_spec.json; compiled to XPath once, at import",
+        "RULES = compile_spec({'rules': [",
+        *[f"    {rule!r}," for rule in rules],
+        "]})",
+        "",
+        "@pytest.fixture(scope='session')",
+        "def submission():",
+        "    return load_submission(SUBMISSION_DIR)",
+        "",
+        "@pytest.fixture(scope='session')",
+        "def xml_tree(submission):",
+        "    if not submission.exists:",
+        "        pytest.skip(f\"XML file not found at {submission.path}\")",
+        "    if submission.error is not None:",
+        "        pytest.fail(f\"XML parsing failed: {submission.error}\")",
+        "    return submission.tree",
+        "",
+        "@pytest.fixture(scope='session')",
+        "def rule_results(xml_tree):",
+        "    return RULES.evaluate(xml_tree)",
+    ]
+    for index, (group, members) in enumerate(groups.items()):
+        lines += ["", f"class {group}:"]
+        if index == 0:
+            lines += [
+                "    def test_xml_is_wellformed(self, xml_tree):",
+                "        assert xml_tree is not None, \"XML file could not be parsed\"",
+                "",
+            ]
+        for rule in members:
+            lines += [f"    @pytest.mark.{marker}" for marker in rule.get("markers", [])]
+            lines += [
+                f"    def test_{rule['id']}(self, rule_results):",
+                f"        assert rule_results[{rule['id']!r}], RULES.message({rule['id']!r})",
+                "",
+            ]
+        lines.pop()
+    return "\n".join(lines) + "\n"
+
+def find_assignments(root_dir):
+    return sorted(path for path in root_dir.iterdir()
+                  if path.is_dir() and path.name != BUNDLE_DIR and (path / "test_assignment.py").is_file())
+
+def assignment_id_of(folder):
+    """The assignment_id recorded in folder's ASSIGNMENT_FILE, or the lower-cased folder name without one."""
+    path = folder / ASSIGNMENT_FILE
+    assignment_id = json.loads(path.read_text())["assignment_id"] if path.is_file() else folder.name.lower()
+    if not assignment_id or assignment_id in (".", "..") or "/" in assignment_id or "\\" in assignment_id:
+        sys.exit(f"❌ {folder.name}: assignment_id {assignment_id!r} cannot name a suites/ folder")
+    return assignment_id
+
+def bundle(names, force=False, full_tar=False):
+    """Build one judge image that carries every assignment's suite under its assignment_id."""
+    root_dir = Path(__file__).parent.resolve()
+    folders = [root_dir / name for name in names] or find_assignments(root_dir)
+    if not folders:
+        sys.exit("❌ No assignment folders with a test_assignment.py found")
+    bundle_dir = root_dir / BUNDLE_DIR
+    # Start from an empty suites/ so dropped assignments leave the image
+    shutil.rmtree(bundle_dir / "suites", ignore_errors=True)
+    files = [("Dockerfile", bundle_dockerfile()),
+             ("runner.sh", template("runner.sh")),
+             ("enhance_json.py", template("enhance_json.py"))]
+    ids = {}
+    for folder in folders:
+        assignment_id = assignment_id_of(folder)
+        if assignment_id in ids:
+            sys.exit(f"❌ {ids[assignment_id].name} and {folder.name} are both assignment_id {assignment_id}")
+        ids[assignment_id] = folder
+    for assignment_id, folder in ids.items():
+        for fname in SUITE_FILES:
+            files.append((f"suites/{assignment_id}/{fname}", (folder / fname).read_text()))
+        if (folder / SOLUTION_ZIP).is_file():
+            files.append((f"suites/{assignment_id}/{SOLUTION_ZIP}", (folder / SOLUTION_ZIP).read_bytes()))
+    for fname, content in files:
+        (bundle_dir / fname).parent.mkdir(parents=True, exist_ok=True)
+        if isinstance(content, bytes):
+            (bundle_dir / fname).write_bytes(content)
+        else:
+            (bundle_dir / fname).write_text(content)
+    base_image = ensure_base_image(root_dir, force)
+    manifest = build_manifest(files, base_image, full_tar)
+    assignment_ids = ", ".join(ids)
+    if not build_image(bundle_dir, BUNDLE_IMAGE_NAME, "judge.tar", manifest, force, full_tar):
+        print(f"✅ {bundle_dir}/ is up to date ({assignment_ids}), skipped Docker build and judge.tar export")
+        return
+    print(f"✅ Built {BUNDLE_IMAGE_NAME}:latest serving {assignment_ids} and saved {bundle_dir}/judge.tar")
+
 def main():
-    if len(sys.argv) < 6:
-        print("Usage: python3 generic_assignment_generator.py <starter.xml> <solution.xml> <assignment_name> <assignment_id> <description>")
+    flags = [arg for arg in sys.argv[1:] if arg.startswith("--")]
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    force = "--force" in flags
+    full_tar = "--full-tar" in flags
+    if "--bundle" in flags:
+        bundle(args, force, full_tar)
+        return
+    spec_path = next((arg.split("=", 1)[1] for arg in flags if arg.startswith("--spec=")), None)
+    fast_start = next((arg for arg in flags if arg == "--fast-start" or arg.startswith("--fast-start=")), None)
+    if len(args) < 5:
+        print("Usage: python3 generic_assignment_generator.py <starter.xml> <solution.xml> <assignment_name> <assignment_id> <description> [--force] [--full-tar] [--spec=spec.json|--derive-spec] [--fast-start[=budget_ms]]")
+        print("       python3 generic_assignment_generator.py --bundle [assignment_folder ...] [--force] [--full-tar]")
         sys.exit(1)
-    starter_path, solution_path, assignment_name, assignment_id, description = sys.argv[1:6]
+    budget = start_budget(fast_start) if fast_start else None
+    starter_path, solution_path, assignment_name, assignment_id, description = args[:5]
     with open(starter_path) as f:
         starter_xml = f.read()
     with open(solution_path) as f:
@@ -35,20 +427,40 @@ def main():
     base_dir = root_dir / assignment_name.replace(' ', '_').lower()
     base_dir.mkdir(exist_ok=True)
     (base_dir / "src").mkdir(exist_ok=True)
+    image_name = assignment_name.replace(' ', '_').lower() + "-x86"
+    spec = None
+    if spec_path:
+        spec = load_spec(spec_path)
+    elif "--derive-spec" in flags:
+        spec = derive_spec(starter_xml, solution_xml, assignment_id)
+    if spec is not None and not check_spec(spec):
+        print("⚠️  lxml is not installed here, so the spec was not compiled; the suite will report any error")
     # Write template files
+    files = []
     for fname, content in TEMPLATE_FILES:
         if fname == "docker-compose.yml":
-            content = content.format(image_name=assignment_name.replace(' ', '_').lower() + "-x86")
+            content = content.format(image_name=image_name)
+        if fname == "test_assignment.py" and spec is not None:
+            content = render_suite(spec)
+        if fname == "Dockerfile" and budget is not None:
+            content = fast_start_dockerfile(content, budget)
+        files.append((fname, content))
+    files.append((ASSIGNMENT_FILE, json.dumps({"assignment_id": assignment_id, "name": assignment_name}, indent=2) + "\n"))
+    if spec is not None:
+        files.append((SPEC_FILE, json.dumps(spec, indent=2) + "\n"))
+    for fname, content in files:
         (base_dir / fname).write_text(content)
     # Write zips
     with ZipFile(base_dir / "startercode.zip", 'w') as zf:
         zf.writestr("activity_main.xml", starter_xml)
     with ZipFile(base_dir / "solution.zip", 'w') as zf:
         zf.writestr("activity_main.xml", solution_xml)
-    # Build docker image and save tar
-    image_name = assignment_name.replace(' ', '_').lower() + "-x86"
-    os.system(f"cd {base_dir} && docker buildx build --platform linux/amd64 -t {image_name}:latest .")
-    os.system(f"cd {base_dir} && docker save -o x86.tar {image_name}:latest")
+    # Build the shared base once, then only the thin assignment layer when its inputs changed
+    base_image = ensure_base_image(root_dir, force)
+    manifest = build_manifest(files, base_image, full_tar, starter=starter_xml, solution=solution_xml)
+    if not build_image(base_dir, image_name, "x86.tar", manifest, force, full_tar):
+        print(f"✅ {base_dir}/ is up to date, skipped Docker build and x86.tar export")
+        return
     print(f"✅ All files generated in {base_dir}/, Docker image built, and x86.tar created!")
 
 if __name__ == "__main__":
@@ -0,0 +1,348 @@
+import argparse
+import asyncio
+import base64
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import uuid
+from pathlib import Path
+from zipfile import ZIP_STORED, ZipFile, BadZipFile
+
+# Usage:
+# python3 grading_dispatcher.py jobs.jsonl [--workers 4] [--timeout 60] [--retries 1] [--backend docker|local|fake]
+# Grades a queue of (assignment, submission) jobs across a pool of long-lived judge workers and prints one
+# JSON result per line as soon as each job finishes. Jobs are JSON lines ("-" reads stdin):
+#     {"id": "alice", "assignment_id": "assignment2", "path": "submissions/alice.zip"}
+# Zips are sent as the whole archive (base64), which the judge reads without unpacking; folders are packed
+# into such an archive holding the activity_main.xml and MainActivity.java the judge grades. Each worker is a judge daemon (judge/judge_daemon.py) speaking its line
+# protocol over stdin/stdout:
+# docker runs the multi-assignment image built by `generic_assignment_generator.py --bundle` with the
+# docker-compose.yml limits, local runs judge_daemon.py on an assignment or bundle folder without Docker,
+# and fake answers every job with a canned report so the dispatcher can be exercised anywhere.
+# A job that times out or kills its worker is retried on a fresh worker, then reported as an error.
+
+XML_NAME = "activity_main.xml"
+JAVA_NAME = "MainActivity.java"
+DEFAULT_IMAGE = "android-judge-x86:latest"
+# Runtime modules the base image puts next to every suite (judge/Dockerfile.base)
+RUNTIME_DIR = Path(__file__).resolve().parent / "judge"
+# Per-worker limits and hardening, as in the assignments' docker-compose.yml
+WORKER_CPUS = "1"
+WORKER_MEMORY = "512M"
+WORKER_TMPFS = "/tmp:rw,noexec,nosuid,size=50m"
+
+# Stand-in judge daemon: answers every job with a passing report. Submissions containing
+# FAKE_HANG never get an answer and FAKE_CRASH kills the worker, to exercise timeouts and retries.
+FAKE_JUDGE = r'''
+import base64, io, json, sys, time, zipfile
+delay = float(sys.argv[1])
+for line in sys.stdin:
+    job = json.loads(line)
+    content = job.get("content", "")
+    if "archive" in job:
+        with zipfile.ZipFile(io.BytesIO(base64.b64decode(job["archive"]))) as zf:
+            content = "".join(zf.read(name).decode("utf-8", "replace") for name in zf.namelist())
+    if "FAKE_CRASH" in content:
+        sys.exit(1)
+    if "FAKE_HANG" in content:
+        time.sleep(3600)
+    time.sleep(delay)
+    report = {"summary": {"passed": 1, "total": 1, "collected": 1}, "tests": [],
+              "stats": {"total_tests": 1, "passed": 1, "failed": 0, "marks": 1.0, "percentage": 100.0}}
+    if "id" in job:
+        report["id"] = job["id"]
+    sys.stdout.write(json.dumps(report) + "\n")
+    sys.stdout.flush()
+'''
+
+
+class WorkerError(Exception):
+    """A worker timed out, died or answered with something that is not a report."""
+
+
+def error_report(message):
+    """Report in the shape enhance_json.error_data() produces inside the judge."""
+    return {
+        "error": message,
+        "stats": {"total_tests": 0, "passed": 0, "failed": 1, "marks": 0.0, "percentage": 0.0},
+    }
+
+
+def _shallowest(root, name):
+    candidates = sorted((p for p in Path(root).rglob(name) if p.is_file()), key=lambda p: (len(p.parts), str(p)))
+    return candidates[0] if candidates else None
+
+
+def pack_folder(path):
+    """Return a submission folder as a base64 zip of the files the judge grades, or None without a layout.
+
+    Like batch mode, the shallowest activity_main.xml is the layout, and the shallowest
+    MainActivity.java anywhere in the folder goes along for the Java checks.
+    """
+    layout = _shallowest(path, XML_NAME)
+    if layout is None:
+        return None
+    java = _shallowest(path, JAVA_NAME)
+    buffer = io.BytesIO()
+    with ZipFile(buffer, "w", ZIP_STORED) as zf:
+        zf.writestr(XML_NAME, layout.read_bytes())
+        if java is not None:
+            zf.writestr(JAVA_NAME, java.read_bytes())
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def read_archive(path):
+    """Return a submission zip as base64 text for the judge to grade in memory."""
+    with open(path, "rb") as f:
+        data = f.read()
+    # Fail here, not on a worker, for files that are not zips
+    ZipFile(io.BytesIO(data)).close()
+    return base64.b64encode(data).decode("ascii")
+
+
+class DockerBackend:
+    """Workers are `docker run -i` judge daemons limited like docker-compose.yml."""
+
+    def __init__(self, image=DEFAULT_IMAGE, cpus=WORKER_CPUS, memory=WORKER_MEMORY, env=None):
+        self.image = image
+        self.cpus = cpus
+        self.memory = memory
+        self.env = dict(env or {})
+        self.prefix = f"judge-worker-{uuid.uuid4().hex[:8]}"
+
+    def name(self, worker):
+        return f"{self.prefix}-{worker}"
+
+    def command(self, worker):
+        env = {"JUDGE_MODE": "daemon", **self.env}
+        return [
+            "docker", "run", "--rm", "-i", "--name", self.name(worker),
+            "--platform", "linux/amd64",
+            "--cpus", self.cpus, "--memory", self.memory,
+            "--network", "none", "--cap-drop", "ALL", "--security-opt", "no-new-privileges:true",
+            "--tmpfs", WORKER_TMPFS,
+            *[arg for key, value in env.items() for arg in ("-e", f"{key}={value}")],
+            self.image,
+        ]
+
+    async def kill(self, worker, process):
+        # Killing the docker client leaves the container running, so remove it by name
+        proc = await asyncio.create_subprocess_exec(
+            "docker", "rm", "-f", self.name(worker),
+            stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL)
+        await proc.wait()
+        if process.returncode is None:
+            process.kill()
+
+
+class LocalBackend:
+    """Workers are judge_daemon.py processes grading with an assignment or judge_bundle folder.
+
+    As in the images, the judge/ runtime modules and the folder's suite files are laid out in one
+    app folder, a temporary copy made once per backend.
+    """
+
+    def __init__(self, judge_dir, env=None):
+        self.app_dir = tempfile.TemporaryDirectory(prefix="judge-app-")
+        for module in RUNTIME_DIR.glob("*.py"):
+            shutil.copy2(module, self.app_dir.name)
+        shutil.copytree(Path(judge_dir).resolve(), self.app_dir.name, dirs_exist_ok=True,
+                        ignore=shutil.ignore_patterns("__pycache__", "*.tar"))
+        self.judge_dir = Path(self.app_dir.name)
+        self.env = {**os.environ, "RESULT_CACHE": "off", **(env or {})}
+
+    def command(self, worker):
+        return [sys.executable, str(self.judge_dir / "judge_daemon.py")]
+
+    async def kill(self, worker, process):
+        if process.returncode is None:
+            process.kill()
+
+
+class FakeBackend(LocalBackend):
+    """Workers run FAKE_JUDGE instead of a real judge."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.env = None
+
+    def command(self, worker):
+        return [sys.executable, "-c", FAKE_JUDGE, str(self.delay)]
+
+
+class JudgeWorker:
+    """One long-lived judge process; jobs are sent one at a time."""
+
+    def __init__(self, backend, index, timeout):
+        self.backend = backend
+        self.index = index
+        self.timeout = timeout
+        self.process = None
+
+    async def start(self):
+        self.process = await asyncio.create_subprocess_exec(
+            *self.backend.command(self.index),
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL,
+            env=getattr(self.backend, "env", None), limit=2 ** 26)
+
+    async def grade(self, payload):
+        """Send one job line and wait for its report line."""
+        if self.process is None or self.process.returncode is not None:
+            await self.start()
+        try:
+            self.process.stdin.write(json.dumps(payload).encode("utf-8") + b"\n")
+            await self.process.stdin.drain()
+            line = await asyncio.wait_for(self.process.stdout.readline(), self.timeout)
+        except asyncio.TimeoutError:
+            await self.stop()
+            raise WorkerError(f"timed out after {self.timeout}s")
+        except (BrokenPipeError, ConnectionResetError):
+            line = b""
+        if not line:
+            await self.stop()
+            raise WorkerError("worker exited")
+        try:
+            return json.loads(line)
+        except ValueError:
+            await self.stop()
+            raise WorkerError("worker sent an invalid report")
+
+    async def stop(self):
+        process, self.process = self.process, None
+        if process is None:
+            return
+        if process.returncode is None:
+            await self.backend.kill(self.index, process)
+        await process.wait()
+
+    async def close(self):
+        """Let the worker finish on end of input, killing it if it does not."""
+        if self.process is not None and self.process.returncode is None:
+            self.process.stdin.close()
+            try:
+                await asyncio.wait_for(self.process.wait(), 10)
+            except asyncio.TimeoutError:
+                pass
+        await self.stop()
+
+
+class Dispatcher:
+    """Runs jobs across a pool of JudgeWorkers and yields results as they finish."""
+
+    def __init__(self, backend, workers=2, timeout=60.0, retries=1):
+        self.backend = backend
+        self.workers = workers
+        self.timeout = timeout
+        self.retries = retries
+
+    @staticmethod
+    def payload(job):
+        if "path" not in job:
+            raise ValueError("Job needs a 'path' field")
+        payload = {key: job[key] for key in ("id", "assignment_id") if key in job}
+        if Path(job["path"]).is_file():
+            # Whole zips go to the judge, which reads the members it needs from memory
+            payload["archive"] = read_archive(job["path"])
+            return payload
+        archive = pack_folder(job["path"])
+        if archive is None:
+            raise ValueError(f"No {XML_NAME} in submission {job['path']}")
+        payload["archive"] = archive
+        return payload
+
+    async def _work(self, worker, jobs, results):
+        while True:
+            job = await jobs.get()
+            if job is None:
+                break
+            result = {"id": job.get("id"), "assignment_id": job.get("assignment_id"), "path": job.get("path")}
+            attempts = 0
+            try:
+                payload = self.payload(job)
+            except BadZipFile as e:
+                report = error_report(f"Invalid submission archive {Path(job['path']).name}: {e}")
+            except (OSError, UnicodeDecodeError, ValueError) as e:
+                report = error_report(str(e))
+            else:
+                while True:
+                    attempts += 1
+                    try:
+                        report = await worker.grade(payload)
+                        break
+                    except (OSError, WorkerError) as e:
+                        if attempts > self.retries:
+                            report = error_report(f"Grading failed after {attempts} attempts: {e}")
+                            break
+            result["attempts"] = attempts
+            result["report"] = report
+            await results.put(result)
+        await worker.close()
+
+    async def run(self, jobs):
+        """Grade every job dict and yield one result per job in completion order."""
+        jobs = list(jobs)
+        queue = asyncio.Queue()
+        results = asyncio.Queue()
+        for job in jobs:
+            queue.put_nowait(job)
+        pool = [JudgeWorker(self.backend, i, self.timeout) for i in range(max(1, min(self.workers, len(jobs))))]
+        for _ in pool:
+            queue.put_nowait(None)
+        tasks = [asyncio.create_task(self._work(worker, queue, results)) for worker in pool]
+        try:
+            for _ in jobs:
+                yield await results.get()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for worker in pool:
+                await worker.stop()
+
+
+def load_jobs(source):
+    """Job dicts from a JSON lines file, or stdin for '-'."""
+    stream = sys.stdin if source == "-" else open(source)
+    with stream:
+        return [json.loads(line) for line in stream if line.strip()]
+
+
+def make_backend(args):
+    if args.backend == "docker":
+        env = {"ASSIGNMENT_ID": args.assignment_id} if args.assignment_id else None
+        return DockerBackend(args.image, args.cpus, args.memory, env)
+    if args.backend == "local":
+        env = {"ASSIGNMENT_ID": args.assignment_id} if args.assignment_id else None
+        return LocalBackend(args.judge_dir, env)
+    return FakeBackend(args.fake_delay)
+
+
+async def dispatch(args):
+    jobs = load_jobs(args.jobs)
+    dispatcher = Dispatcher(make_backend(args), args.workers, args.timeout, args.retries)
+    async for result in dispatcher.run(jobs):
+        sys.stdout.write(json.dumps(result, separators=(",", ":")) + "\n")
+        sys.stdout.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Grade (assignment, submission) jobs across a pool of judge workers")
+    parser.add_argument("jobs", help="JSON lines file of jobs, or - for stdin")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds per job before the worker is replaced")
+    parser.add_argument("--retries", type=int, default=1, help="extra attempts for a job that timed out or crashed")
+    parser.add_argument("--backend", choices=["docker", "local", "fake"], default="docker")
+    parser.add_argument("--image", default=DEFAULT_IMAGE)
+    parser.add_argument("--cpus", default=WORKER_CPUS)
+    parser.add_argument("--memory", default=WORKER_MEMORY)
+    parser.add_argument("--judge-dir", default="judge_bundle", help="assignment or bundle folder for --backend local")
+    parser.add_argument("--assignment-id", help="default assignment for jobs without one")
+    parser.add_argument("--fake-delay", type=float, default=0.0)
+    args = parser.parse_args(argv)
+    asyncio.run(dispatch(args))
+
+if __name__ == "__main__":
+    main()
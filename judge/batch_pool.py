@@ -0,0 +1,173 @@
+"""
+Multi-process batch grading.
+
+batch_runner.py grades a batch one submission after another in a single warm
+session, which leaves all but one core idle on a large regrade node. With
+BATCH_WORKERS=<n> (or auto, one per usable CPU within the container's CPU
+quota) grade_in_pool() forks n
+workers instead:
+
+- the parent imports pytest, pytest-json-report, lxml and the judge modules
+  before forking, so workers start with them loaded; each worker then
+  collects the suite once and keeps its session warm for all its jobs.
+- jobs sit in one shared queue, largest submissions first, and every idle
+  worker takes the next one. A worker stuck on a huge layout never holds up
+  jobs another worker could take, and the big ones start early instead of
+  being the tail of the run.
+- results come back tagged with their position in the batch and are handed
+  on in batch order, so reports, summary.json and NDJSON lines are the same
+  for any worker count (timings aside).
+
+Every worker opens the result cache and the regrade store itself; SQLite
+serializes the writes. A
+worker that dies takes only its current job with it: that submission is
+reported as an error and the others carry on.
+"""
+
+import importlib
+import multiprocessing
+import os
+from multiprocessing.connection import wait
+from pathlib import Path
+
+from enhance_json import error_data
+from fast_eval import run_engine
+from regrade_store import RegradeStore
+from result_cache import ResultCache, suite_hash
+
+XML_NAME = 'activity_main.xml'
+CGROUP_CPU_MAX = '/sys/fs/cgroup/cpu.max'
+# Loaded before forking so every worker inherits them
+PRELOAD_MODULES = ['pytest', 'pytest_jsonreport.plugin', 'judge_timings', 'tiers', 'warm_session',
+                   'java_checks', 'similarity_index', 'solution_diff']
+
+for _name in PRELOAD_MODULES:
+    importlib.import_module(_name)
+
+
+def usable_cpus():
+    """CPUs this process may run on, capped by a cgroup CPU quota (docker --cpus)."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open(CGROUP_CPU_MAX) as f:
+            quota, period = f.read().split()[:2]
+        if quota != 'max':
+            cpus = min(cpus, max(1, int(quota) // int(period)))
+    except (OSError, ValueError):
+        pass
+    return max(1, cpus)
+
+
+def worker_count(value=None):
+    """Worker processes from value or BATCH_WORKERS: a number, or auto for one per usable CPU."""
+    value = str(value if value is not None else os.environ.get('BATCH_WORKERS', '1')).strip().lower()
+    if value == 'auto':
+        return usable_cpus()
+    try:
+        return max(1, int(value))
+    except ValueError:
+        return 1
+
+
+def submission_size(path):
+    """Bytes to grade for a student folder or zip, to schedule the largest first."""
+    path = Path(path)
+    try:
+        if path.is_dir():
+            return sum(candidate.stat().st_size for candidate in path.rglob(XML_NAME) if candidate.is_file())
+        return path.stat().st_size
+    except OSError:
+        return 0
+
+
+def _worker(test_file, jobs, conn, grade_reports, cache_config, signatures, store_config):
+    """Grade jobs from the shared queue in one warm session until it hands out None."""
+
+    def pending():
+        # Each worker gets one None after the last job
+        for job in iter(jobs.get, None):
+            conn.send(('started', job[0], None))
+            yield job
+
+    def run(grade):
+        if store_config is not None:
+            grade = RegradeStore(*store_config).wrap(grade, test_file)
+        if cache_config is not None:
+            grade = ResultCache(*cache_config).wrap(grade, suite_hash(Path(test_file).parent))
+        # grade_reports() passes the job index through as the student id
+        for index, report, sig in grade_reports(grade, pending(), signatures):
+            conn.send(('done', index, (report, sig)))
+
+    try:
+        run_engine(run, test_file=test_file)
+    except Exception as e:
+        conn.send(('failed', None, str(e)))
+    finally:
+        conn.close()
+
+
+def grade_in_pool(submissions, test_file, workers, grade_reports, cache=None, signatures=False, store=None):
+    """Yield (student_id, report, signature) for every submission, in batch order, graded by workers.
+
+    grade_reports is batch_runner.grade_reports; cache a ResultCache and store a RegradeStore
+    whose files the workers share.
+    """
+    context = multiprocessing.get_context('fork')
+    jobs = context.Queue()
+    order = sorted(range(len(submissions)), key=lambda i: (-submission_size(submissions[i][1]), i))
+    for index in order:
+        jobs.put((index, submissions[index][1]))
+    cache_config = (cache.path, cache.max_entries) if cache is not None else None
+    store_config = (store.path, store.max_submissions) if store is not None else None
+    # One pipe per worker: a send is complete once it returns, so a worker that dies loses nothing it reported
+    workers = min(workers, len(submissions))
+    connections = {}
+    for _ in range(workers):
+        jobs.put(None)
+        receiver, sender = context.Pipe(duplex=False)
+        process = context.Process(target=_worker, daemon=True, args=(
+            str(test_file), jobs, sender, grade_reports, cache_config, signatures, store_config))
+        process.start()
+        sender.close()
+        connections[receiver] = process
+
+    finished = {}
+    current = {}
+    errors = []
+    next_index = 0
+    try:
+        while next_index < len(submissions):
+            if next_index in finished:
+                report, sig = finished.pop(next_index)
+                yield submissions[next_index][0], report, sig
+                next_index += 1
+                continue
+            if not connections:
+                message = errors[0] if errors else 'Grading workers exited early'
+                for index in range(next_index, len(submissions)):
+                    finished.setdefault(index, (error_data(message), None))
+                continue
+            for receiver in wait(list(connections)):
+                try:
+                    kind, index, payload = receiver.recv()
+                except EOFError:
+                    # The worker is gone; whatever it had started is not coming back
+                    if receiver in current:
+                        index = current.pop(receiver)
+                        name = submissions[index][0]
+                        finished[index] = (error_data(f"Grading worker exited while grading {name}"), None)
+                    connections.pop(receiver).join()
+                    continue
+                if kind == 'started':
+                    current[receiver] = index
+                elif kind == 'done':
+                    current.pop(receiver, None)
+                    finished[index] = payload
+                else:
+                    errors.append(payload)
+    finally:
+        for process in connections.values():
+            process.terminate()
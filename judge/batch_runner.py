@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Batch grading for a whole cohort in one container run.
+
+Each entry of the batch directory is one student: either a folder that
+contains activity_main.xml somewhere inside it, or a .zip archive of one.
+Archives are graded in place, memory-mapped and never unpacked (see
+submission_archive.py), so a large batch writes nothing to /tmp.
+Every submission is graded with the same test_assignment.py checks that
+runner.sh uses, collected once by the engine JUDGE_ENGINE selects (a warm
+pytest session by default, see fast_eval.py). One enhanced report is written per student and a combined
+summary.json is written next to them. In the multi-assignment image
+ASSIGNMENT_ID selects the bundled suite (see suite_registry.py).
+
+With REPORT_FORMAT=ndjson each student's report is also printed as one JSON
+line as soon as it is graded, and the summary follows as the last line.
+With SIMILARITY=on every result in summary.json also gets a 'similarity'
+entry with its closest matches in the cohort, and the summary lists the
+near-duplicate clusters (see similarity_index.py).
+BATCH_WORKERS=<n> or auto spreads the batch over worker processes (see
+batch_pool.py); reports and summary come out the same, in the same order.
+After an edit to the suite, submissions graded before re-run only the
+changed and new tests (see regrade_store.py). With RESULTS_STORE=on every
+report is also appended to the cohort's columnar results store (see
+results_store.py).
+
+Usage:
+    python3 /app/batch_runner.py <batch_dir> <output_dir>
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+from zipfile import BadZipFile
+
+os.environ['PYTHONUNBUFFERED'] = '1'
+
+APP_DIR = Path(__file__).resolve().parent
+XML_NAME = 'activity_main.xml'
+
+if str(APP_DIR) not in sys.path:
+    sys.path.insert(0, str(APP_DIR))
+
+from batch_pool import grade_in_pool, worker_count
+from enhance_json import enhance_data, error_data, write_report
+from fast_eval import run_engine
+from regrade_store import open_regrade_store
+from result_cache import open_result_cache, suite_hash
+from results_store import open_results_store
+from similarity_index import open_similarity_index, similarity_entry, submission_signature
+from submission_archive import open_archive
+from submission_cache import set_submission_root
+from suite_registry import suite_file
+
+
+def discover_submissions(batch_dir):
+    """Return (student_id, path) pairs for every folder or zip in batch_dir."""
+    submissions = []
+    for entry in sorted(Path(batch_dir).iterdir()):
+        if entry.name.startswith('.'):
+            continue
+        if entry.is_dir():
+            submissions.append((entry.name, entry))
+        elif entry.suffix.lower() == '.zip':
+            submissions.append((entry.stem, entry))
+    return submissions
+
+
+def find_submission_dir(root):
+    """Return the folder holding activity_main.xml, or root if there is none.
+
+    Its MainActivity.java is still searched from root (see submission_cache.find_source()).
+    """
+    root = Path(root)
+    if (root / XML_NAME).is_file():
+        return root
+    for candidate in sorted(root.rglob(XML_NAME)):
+        if candidate.is_file():
+            set_submission_root(candidate.parent, root)
+            return candidate.parent
+    return root
+
+
+def grade_submission(grade, path):
+    """Grade one student folder or zip with a warm-session grade() and return the enhanced report."""
+    try:
+        path = Path(path)
+        if path.is_dir():
+            return enhance_data(grade(find_submission_dir(path)))
+        # Reject unreadable or oversized archives up front; the tests read the zip itself
+        with open_archive(path):
+            pass
+        return enhance_data(grade(str(path)))
+    except BadZipFile as e:
+        return error_data(f"Invalid submission archive {path.name}: {e}")
+    except Exception as e:
+        return error_data(str(e))
+
+
+def layout_signature(path):
+    """Similarity signature of a student folder or zip, or None if it has no layout to compare."""
+    try:
+        path = Path(path)
+        return submission_signature(find_submission_dir(path) if path.is_dir() else str(path))
+    except Exception:
+        return None
+
+
+def build_summary(results):
+    """Combine per-student stats into one cohort summary."""
+    errors = sum(1 for r in results if 'error' in r)
+    percentages = [r['stats']['percentage'] for r in results]
+    return {
+        'total_submissions': len(results),
+        'graded': len(results) - errors,
+        'errors': errors,
+        'average_percentage': round(sum(percentages) / len(percentages), 2) if percentages else 0.0,
+        'results': results
+    }
+
+
+def grade_batch(batch_dir, output_dir, cache=None, assignment_id=None, stream=None, similarity=None, store=None,
+                results=None):
+    """Grade every submission in batch_dir, writing reports into output_dir (and to stream if given).
+
+    With a SimilarityIndex, results also report near duplicates across the batch; with a
+    RegradeStore, only tests changed since a submission was last graded are run; a
+    ResultsStore gets every report appended.
+    """
+    test_file = suite_file(assignment_id)
+    submissions = discover_submissions(batch_dir)
+
+    workers = worker_count()
+    if workers > 1 and len(submissions) > 1:
+        reports = grade_in_pool(submissions, test_file, workers, grade_reports, cache, similarity is not None, store)
+        return collect_reports(reports, output_dir, stream, similarity, results)
+
+    def run(grade):
+        if store is not None:
+            grade = store.wrap(grade, test_file)
+        if cache is not None:
+            grade = cache.wrap(grade, suite_hash(test_file.parent))
+        return write_reports(grade, submissions, output_dir, stream, similarity, results)
+
+    return run_engine(run, test_file=test_file)
+
+
+def grade_reports(grade, submissions, signatures=False):
+    """Yield (student_id, report, signature) for each (student_id, path) pair, one after another."""
+    for student_id, path in submissions:
+        report = grade_submission(grade, path)
+        yield student_id, report, layout_signature(path) if signatures else None
+
+
+def write_reports(grade, submissions, output_dir, stream=None, similarity=None, results=None):
+    """Grade each (student_id, path) pair and write its report plus summary.json."""
+    reports = grade_reports(grade, submissions, similarity is not None)
+    return collect_reports(reports, output_dir, stream, similarity, results)
+
+
+def collect_reports(reports, output_dir, stream=None, similarity=None, results_store=None):
+    """Write each (student_id, report, signature) and then summary.json, in the order given.
+
+    With a stream, every report is also written to it as one NDJSON line right away.
+    With a similarity index, each signature is added to it as it arrives and the
+    matches are filled in once the whole batch is indexed. With a ResultsStore,
+    each report is appended to it.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    results = []
+    indexed = []
+    for student_id, report, sig in reports:
+        report_name = f"{student_id}.json"
+        with open(output_dir / report_name, 'w') as f:
+            json.dump(report, f, indent=2)
+        if stream is not None:
+            write_report({'student': student_id, **report}, stream, 'ndjson')
+        if results_store is not None:
+            results_store.append(student_id, report)
+        result = {
+            'student': student_id,
+            'report': report_name,
+            'stats': report['stats'],
+        }
+        if 'error' in report:
+            result['error'] = report['error']
+        results.append(result)
+        if similarity is not None and sig is not None:
+            similarity.add(student_id, sig)
+            indexed.append(student_id)
+    summary = build_summary(results)
+    if similarity is not None:
+        for result in results:
+            if result['student'] in indexed:
+                result['similarity'] = similarity_entry(similarity, result['student'])
+        summary['similarity'] = {
+            'threshold': similarity.threshold,
+            'clusters': similarity.clusters(ids=indexed),
+        }
+    with open(output_dir / 'summary.json', 'w') as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        write_report(error_data('Usage: batch_runner.py <batch_dir> <output_dir>'), report_format='compact')
+        sys.exit(0)
+    # The engine silences stdout while it runs, so hold on to the real one for streamed lines
+    stream = sys.stdout if os.environ.get('REPORT_FORMAT') == 'ndjson' else None
+    try:
+        summary = grade_batch(sys.argv[1], sys.argv[2], open_result_cache(), stream=stream,
+                              similarity=open_similarity_index(), store=open_regrade_store(),
+                              results=open_results_store())
+    except Exception as e:
+        summary = error_data(str(e))
+    write_report(summary)
+    sys.exit(0)
@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+In-process evaluator for test_assignment.py without pytest collection.
+
+FastEvaluator imports the suite once, finds its Test* classes and test_*
+functions itself and resolves the module's fixtures (submission, xml_tree,
+root_element, layout_index, ...) by name, honouring their scope and caching
+skips and failures the way pytest does. grade(submission_dir) returns a
+report with the same 'summary' and 'tests' layout pytest-json-report writes,
+so enhance_json.py and everything downstream sees no difference.
+
+It covers what the generated suites use: plain and yield fixtures, test
+classes and module-level tests. JUDGE_TIERED=1 blocks tests of unusable
+submissions as the pytest plugin in tiers.py does. Anything else (parametrize, builtin fixtures
+such as tmp_path) is reported as a test error; use the pytest engine for it.
+
+run_engine() picks the engine from JUDGE_ENGINE:
+    pytest  - warm pytest session, the reference path (default)
+    fast    - this evaluator
+    parity  - run both, return the pytest report with a 'parity' section
+
+Usage:
+    python3 /app/fast_eval.py [submission_dir]      # ASSIGNMENT_ID picks a bundled suite, JUDGE_ENGINE the engine
+
+pytest, the pytest plugins it shares code with (tiers.py, judge_timings.py)
+and the report sections (java_checks.py, similarity_index.py,
+solution_diff.py) are imported when an evaluator first needs them, so
+importing run_engine() stays cheap.
+"""
+
+import contextlib
+import importlib.util
+import inspect
+import io
+import os
+import sys
+import time
+import traceback
+from collections import Counter, OrderedDict
+from pathlib import Path
+
+os.environ['PYTHONUNBUFFERED'] = '1'
+
+APP_DIR = Path(__file__).resolve().parent
+
+if str(APP_DIR) not in sys.path:
+    sys.path.insert(0, str(APP_DIR))
+
+from regrade_store import test_name
+from submission_cache import clear_cache, intake_rejection, last_loaded, reset_load_timings
+
+TEST_FILE = APP_DIR / 'test_assignment.py'
+SUBMISSION_DIR = '/app/submission'
+ENGINES = ('pytest', 'fast', 'parity')
+
+
+def _fixture_function(obj):
+    """Return the plain function behind a @pytest.fixture definition."""
+    if hasattr(obj, '_get_wrapped_function'):
+        return obj._get_wrapped_function()
+    wrapped = getattr(obj, '__pytest_wrapped__', None)
+    return wrapped.obj if wrapped is not None else obj
+
+
+class FixtureError(Exception):
+    """A test asked for a fixture the evaluator does not provide."""
+
+
+class Fixture:
+    def __init__(self, name, func, scope):
+        self.name = name
+        self.func = func
+        self.scope = scope
+        self.params = list(inspect.signature(func).parameters)
+
+
+class Item:
+    def __init__(self, nodeid, func, cls, lineno, keywords, markers=()):
+        self.nodeid = nodeid
+        self.func = func
+        self.cls = cls
+        self.lineno = lineno
+        self.keywords = keywords
+        self.markers = list(markers)
+        self.params = [p for p in inspect.signature(func).parameters if p != 'self']
+
+
+class _Outcome:
+    """Result of one setup/call stage: outcome plus pytest-json-report details."""
+
+    def __init__(self, outcome, duration, exc=None, stdout=''):
+        self.outcome = outcome
+        self.duration = duration
+        self.exc = exc
+        self.stdout = stdout
+
+
+class FastEvaluator:
+    """Runs a test_assignment.py suite directly, without a pytest session."""
+
+    def __init__(self, test_file=TEST_FILE):
+        from judge_timings import Profiler, Stopwatch, startup_timing
+
+        self.startup = startup_timing()
+        clock = Stopwatch()
+        self.test_file = Path(test_file).resolve()
+        spec = importlib.util.spec_from_file_location('_fast_' + self.test_file.stem, self.test_file)
+        self.module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(self.module)
+        self.fixtures = self._collect_fixtures()
+        self.tests = self._collect_tests()
+        self._session_finalizers = []
+        self.collection = clock.elapsed()
+        self.profiler = Profiler()
+
+    def _collect_fixtures(self):
+        from _pytest.fixtures import getfixturemarker
+
+        fixtures = {}
+        for attr, obj in vars(self.module).items():
+            marker = getfixturemarker(obj)
+            if marker is None:
+                continue
+            name = marker.name or attr
+            fixtures[name] = Fixture(name, _fixture_function(obj), marker.scope)
+        return fixtures
+
+    def _collect_tests(self):
+        tests = []
+        base = self.test_file.name
+        keywords_tail = [base, self.test_file.parent.name, '']
+
+        def marks(obj):
+            return [m.name for m in getattr(obj, 'pytestmark', [])]
+
+        for name, obj in vars(self.module).items():
+            if inspect.isclass(obj) and name.startswith('Test') and obj.__module__ == self.module.__name__:
+                if '__init__' in vars(obj):
+                    continue
+                for attr, func in vars(obj).items():
+                    if attr.startswith('test_') and inspect.isfunction(func):
+                        keywords = [attr] + marks(func) + [name] + keywords_tail
+                        tests.append(Item(f"{base}::{name}::{attr}", func, obj,
+                                          func.__code__.co_firstlineno - 1, keywords, marks(func)))
+            elif name.startswith('test_') and inspect.isfunction(obj):
+                tests.append(Item(f"{base}::{name}", obj, None,
+                                  obj.__code__.co_firstlineno - 1, [name] + marks(obj) + keywords_tail, marks(obj)))
+        return tests
+
+    def _fixture_closure(self, names):
+        """Every fixture names depend on, directly or through other fixtures."""
+        closure = set()
+        pending = list(names)
+        while pending:
+            name = pending.pop()
+            if name in closure:
+                continue
+            closure.add(name)
+            fixture = self.fixtures.get(name)
+            if fixture is not None:
+                pending.extend(fixture.params)
+        return closure
+
+    def _blockable(self, test):
+        import tiers
+
+        return (tiers.DEPENDENCY in self._fixture_closure(test.params)
+                and not tiers.gate_test(test.func.__name__, test.markers))
+
+    def _resolve(self, name, cache, local, finalizers, active):
+        """Return a fixture value; cached values and cached exceptions are reused per scope.
+
+        Function-scoped fixtures live in local and are finalized after the test,
+        wider scopes live in cache for the rest of the submission.
+        """
+        fixture = self.fixtures.get(name)
+        if fixture is None:
+            raise FixtureError(f"fixture '{name}' not found")
+        store = local if fixture.scope == 'function' else cache
+        if name in store:
+            ok, value = store[name]
+            if ok:
+                return value
+            raise value
+        if name in active:
+            raise FixtureError(f"recursive dependency involving fixture '{name}'")
+        active.add(name)
+        try:
+            kwargs = {param: self._resolve(param, cache, local, finalizers, active) for param in fixture.params}
+            value = fixture.func(**kwargs)
+            if inspect.isgenerator(value):
+                generator = value
+                value = next(generator)
+                (finalizers if fixture.scope == 'function' else self._session_finalizers).append(generator)
+        except BaseException as e:
+            store[name] = (False, e)
+            raise
+        finally:
+            active.discard(name)
+        store[name] = (True, value)
+        return value
+
+    @staticmethod
+    def _finalize(finalizers):
+        while finalizers:
+            generator = finalizers.pop()
+            with contextlib.suppress(StopIteration):
+                next(generator)
+
+    def _stage(self, func):
+        from _pytest.outcomes import OutcomeException, Skipped
+
+        out = io.StringIO()
+        start = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(out):
+                value = func()
+        except Skipped as e:
+            return _Outcome('skipped', time.perf_counter() - start, e, out.getvalue()), None
+        except (Exception, OutcomeException) as e:
+            return _Outcome('failed', time.perf_counter() - start, e, out.getvalue()), None
+        return _Outcome('passed', time.perf_counter() - start, None, out.getvalue()), value
+
+    def _stage_json(self, stage):
+        from _pytest.outcomes import Failed
+
+        data = {'duration': stage.duration, 'outcome': stage.outcome}
+        exc = stage.exc
+        if exc is not None:
+            frames = [f for f in traceback.extract_tb(exc.__traceback__)
+                      if Path(f.filename).resolve() == self.test_file]
+            lineno = frames[-1].lineno if frames else 0
+            message = str(getattr(exc, 'msg', exc))
+            if stage.outcome == 'skipped':
+                data['longrepr'] = str((str(self.test_file), lineno, f"Skipped: {message}"))
+            else:
+                label = 'Failed' if isinstance(exc, Failed) else type(exc).__name__
+                data['crash'] = {'path': str(self.test_file), 'lineno': lineno, 'message': f"{label}: {message}"}
+                data['traceback'] = [
+                    {'path': self.test_file.name, 'lineno': f.lineno, 'message': label} for f in frames
+                ]
+                data['longrepr'] = ''.join(traceback.format_exception(type(exc), exc, exc.__traceback__))
+        if stage.stdout:
+            data['stdout'] = stage.stdout
+        return data
+
+    def _blocked_test(self, test, reason):
+        """Report entry of a test recorded as blocked by tiers.py, without running anything."""
+        import tiers
+
+        item = OrderedDict(nodeid=test.nodeid, lineno=test.lineno, outcome=tiers.OUTCOME, keywords=test.keywords)
+        item['setup'] = {'duration': 0.0, 'outcome': 'skipped',
+                         'longrepr': str((str(self.test_file), test.lineno + 1, reason))}
+        item['teardown'] = {'duration': 0.0, 'outcome': 'passed'}
+        return item
+
+    def _run_test(self, test, cache):
+        item = OrderedDict(nodeid=test.nodeid, lineno=test.lineno, outcome='passed', keywords=test.keywords)
+        local = {}
+        finalizers = []
+        setup, kwargs = self._stage(
+            lambda: {p: self._resolve(p, cache, local, finalizers, set()) for p in test.params})
+        item['setup'] = self._stage_json(setup)
+        if setup.outcome == 'passed':
+            instance = test.cls() if test.cls is not None else None
+            func = test.func.__get__(instance) if instance is not None else test.func
+            call, _ = self._stage(lambda: func(**kwargs))
+            item['call'] = self._stage_json(call)
+            item['outcome'] = call.outcome
+        else:
+            item['outcome'] = 'skipped' if setup.outcome == 'skipped' else 'error'
+        teardown, _ = self._stage(lambda: self._finalize(finalizers))
+        item['teardown'] = self._stage_json(teardown)
+        return item
+
+    def grade(self, submission_dir, select=None):
+        """Run the tests against submission_dir and return a pytest-json-report style report.
+
+        select limits the run to tests named like 'TestClass::test_name' (see regrade_store.py).
+        """
+        import java_checks
+        import tiers
+        from judge_timings import Stopwatch, build_timings
+        from similarity_index import capture
+        from solution_diff import feedback
+
+        start = time.time()
+        self.module.SUBMISSION_DIR = str(submission_dir)
+        cache = {}
+        self._session_finalizers = []
+        reset_load_timings()
+        run_clock = Stopwatch()
+        self.profiler.start()
+        tests = []
+        test_timings = {}
+        tiered = tiers.tiered_enabled()
+        java = java_checks.start(submission_dir, self.test_file)
+        try:
+            for test in self.tests:
+                if select is not None and test_name(test.nodeid) not in select:
+                    continue
+                clock = Stopwatch()
+                reason = tiers.blocked_reason(submission_dir) if tiered and self._blockable(test) else None
+                if reason is None:
+                    tests.append(self._run_test(test, cache))
+                else:
+                    tests.append(self._blocked_test(test, reason))
+                test_timings[test.nodeid] = clock.elapsed()
+            # While the submission is still cached
+            diff = feedback(submission_dir, self.test_file)
+            java = java_checks.finish(java)
+        finally:
+            self._finalize(self._session_finalizers)
+            capture(submission_dir)
+            clear_cache()
+        run = run_clock.elapsed()
+        path = last_loaded()
+        profile = self.profiler.stop(run['wall_ms'], path)
+        summary = Counter(t['outcome'] for t in tests)
+        summary['total'] = sum(summary.values())
+        summary['collected'] = len(self.tests)
+        failed = any(t['outcome'] in ('failed', 'error') for t in tests)
+        report = {
+            'created': time.time(),
+            'duration': time.time() - start,
+            'exitcode': 1 if failed else 0,
+            'root': str(self.test_file.parent),
+            'environment': {},
+            'summary': dict(summary),
+            'tests': tests,
+            'timings': build_timings(self.startup, self.collection, test_timings, run, path, profile)
+        }
+        rejection = intake_rejection(path)
+        if rejection:
+            report['intake'] = rejection
+        if diff is not None:
+            report['feedback'] = diff
+        if java is not None:
+            report['java'] = java
+        return report
+
+
+def compare_reports(reference, candidate):
+    """Differences between two reports' summaries and per-test outcomes."""
+    mismatches = []
+    if reference.get('summary') != candidate.get('summary'):
+        mismatches.append({'field': 'summary', 'pytest': reference.get('summary'), 'fast': candidate.get('summary')})
+    ref_tests = {t['nodeid']: t['outcome'] for t in reference.get('tests', [])}
+    fast_tests = {t['nodeid']: t['outcome'] for t in candidate.get('tests', [])}
+    for nodeid in sorted(set(ref_tests) | set(fast_tests)):
+        if ref_tests.get(nodeid) != fast_tests.get(nodeid):
+            mismatches.append({'nodeid': nodeid, 'pytest': ref_tests.get(nodeid), 'fast': fast_tests.get(nodeid)})
+    return {'match': not mismatches, 'mismatches': mismatches}
+
+
+def parity_grade(reference_grade, fast_grade):
+    """grade() that runs both engines and returns the reference report with a 'parity' section."""
+
+    def grade(submission_dir, select=None):
+        report = reference_grade(submission_dir, select)
+        report['parity'] = compare_reports(report, fast_grade(submission_dir, select))
+        return report
+
+    return grade
+
+
+def run_engine(callback, engine=None, test_file=TEST_FILE):
+    """Call callback(grade) with the grading engine named by engine or JUDGE_ENGINE."""
+    from warm_session import run_warm
+
+    engine = engine or os.environ.get('JUDGE_ENGINE', 'pytest')
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown JUDGE_ENGINE {engine}, expected one of {', '.join(ENGINES)}")
+    if engine == 'fast':
+        return callback(FastEvaluator(test_file).grade)
+    if engine == 'parity':
+        fast = FastEvaluator(test_file)
+        return run_warm(lambda grade: callback(parity_grade(grade, fast.grade)), test_file)
+    return run_warm(callback, test_file)
+
+
+if __name__ == '__main__':
+    from enhance_json import enhance_data, error_data, write_report
+    from suite_registry import suite_file
+
+    submission_dir = sys.argv[1] if len(sys.argv) > 1 else os.environ.get('SUBMISSION_DIR', SUBMISSION_DIR)
+    try:
+        output = enhance_data(run_engine(lambda grade: grade(submission_dir), test_file=suite_file()))
+    except Exception as e:
+        output = error_data(str(e))
+    write_report(output)
+    sys.exit(0)
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Cold-start entry point for one-shot `docker run` grading.
+
+The default image goes CMD -> /bin/sh -> runner.sh -> pytest, and pytest
+then imports every plugin installed in site-packages. For a single
+submission that start-up is most of the run. An image built with
+`generic_assignment_generator.py --fast-start` runs this file as its CMD
+instead:
+
+- no shell: the choices runner.sh makes (a mounted submission.zip,
+  ASSIGNMENT_ID, daemon, batch and fast modes) are made here, and the chosen
+  mode runs in this interpreter. Only that mode's modules are imported.
+- no plugin autoload: PYTEST_DISABLE_PLUGIN_AUTOLOAD skips the installed
+  pytest11 entry points (pytest-metadata, ...). pytest-json-report and the
+  judge plugins are named with -p. pytest's cacheprovider, doctest, junitxml
+  and pastebin plugins are blocked.
+- bytecode: the image build compiles /app and runs check_budget(), which
+  grades the solution once. That run leaves pytest's assertion-rewritten
+  bytecode for the suite and conftest.py behind. pip already compiled
+  site-packages when the base image installed the dependencies.
+
+`fast_start.py --check-budget [ms]` grades a probe submission (the suite's
+solution.zip) in fresh interpreters. It fails with exit status 1 when the
+median time from interpreter start to the first test exceeds the budget
+(JUDGE_START_BUDGET_MS, default 1500). That time is the 'startup' plus
+'collection' phases of judge_timings.py. The fast-start build runs the check
+as its last step, so a slow import breaks the build instead of slowing every
+grading run.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent
+SUBMISSION_DIR = Path('/app/submission')
+SUBMISSION_ZIP = Path('/app/submission.zip')
+TEST_NAME = 'test_assignment.py'
+
+PLUGINS = ['pytest_jsonreport.plugin', 'judge_timings', 'tiers', 'solution_diff', 'java_checks', 'report_stream']
+BLOCKED_PLUGINS = ['cacheprovider', 'doctest', 'junitxml', 'pastebin']
+DEFAULT_BUDGET_MS = 1500.0
+BUDGET_RUNS = 3
+USAGE = 'Usage: fast_start.py [assignment_id] | fast_start.py --check-budget [budget_ms]'
+
+
+def pytest_args(test_file):
+    """Arguments of the one-shot pytest run: the -p list of runner.sh without autoloaded plugins."""
+    args = [str(test_file)]
+    for name in BLOCKED_PLUGINS:
+        args += ['-p', f"no:{name}"]
+    for name in PLUGINS:
+        args += ['-p', name]
+    return args + ['--json-report', '--json-report-file=none', '-v']
+
+
+def suite_file(assignment_id=None):
+    """The suite runner.sh would pick: a bundled one for ASSIGNMENT_ID if present, else the image's own."""
+    assignment_id = assignment_id or os.environ.get('ASSIGNMENT_ID')
+    if assignment_id and (APP_DIR / 'suites' / assignment_id / TEST_NAME).is_file():
+        return APP_DIR / 'suites' / assignment_id / TEST_NAME
+    return APP_DIR / TEST_NAME
+
+
+def run_script(name, *args):
+    """Run an /app script as __main__ in this interpreter, as `python3 /app/<name> args` would."""
+    import runpy
+
+    sys.argv = [str(APP_DIR / name), *args]
+    try:
+        runpy.run_path(str(APP_DIR / name), run_name='__main__')
+    except SystemExit as e:
+        return e.code or 0
+    return 0
+
+
+def grade_once(test_file):
+    """Grade SUBMISSION_DIR with the suite in this interpreter; the enhanced report goes to stdout."""
+    os.environ['PYTEST_DISABLE_PLUGIN_AUTOLOAD'] = '1'
+    import pytest
+
+    # pytest's own errors stay off stdout, as with runner.sh's 2> /dev/null
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 2)
+    os.close(devnull)
+    code = pytest.main(pytest_args(test_file))
+    if code == pytest.ExitCode.USAGE_ERROR:
+        # Usage errors stop pytest before any plugin runs
+        from enhance_json import error_data, write_report
+        write_report(error_data('pytest could not start'))
+    return 0
+
+
+def parse_budget(value):
+    """A budget in ms as a positive float, or None when value is not one."""
+    try:
+        budget = float(value)
+    except (TypeError, ValueError):
+        return None
+    return budget if 0 < budget < float('inf') else None
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ['--check-budget']:
+        value = argv[1] if len(argv) > 1 else os.environ.get('JUDGE_START_BUDGET_MS', DEFAULT_BUDGET_MS)
+        budget = parse_budget(value)
+        if budget is None:
+            print(f"Budget must be a positive number of milliseconds, got {value!r}\n{USAGE}", file=sys.stderr)
+            return 2
+        return 0 if check_budget(budget)['passed'] else 1
+    for path in (str(APP_DIR), str(SUBMISSION_DIR)):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    os.environ['PYTHONPATH'] = os.pathsep.join(
+        [str(SUBMISSION_DIR), str(APP_DIR)] + ([os.environ['PYTHONPATH']] if os.environ.get('PYTHONPATH') else []))
+    if not os.environ.get('SUBMISSION_DIR') and SUBMISSION_ZIP.is_file():
+        os.environ['SUBMISSION_DIR'] = str(SUBMISSION_ZIP)
+    if argv:
+        os.environ['ASSIGNMENT_ID'] = argv[0]
+    if os.environ.get('JUDGE_MODE') == 'daemon':
+        socket_path = os.environ.get('JUDGE_SOCKET')
+        return run_script('judge_daemon.py', *(['--socket', socket_path] if socket_path else []))
+    if os.environ.get('BATCH_DIR'):
+        run_script('batch_runner.py', os.environ['BATCH_DIR'], os.environ.get('BATCH_OUTPUT_DIR', '/app/reports'))
+        return 0
+    if os.environ.get('JUDGE_ENGINE') in ('fast', 'parity'):
+        run_script('fast_eval.py', os.environ.get('SUBMISSION_DIR', str(SUBMISSION_DIR)))
+        return 0
+    return grade_once(suite_file())
+
+
+def check_budget(budget_ms=None, runs=BUDGET_RUNS, test_file=None):
+    """Grade a probe submission in `runs` fresh interpreters and compare start-to-first-test time with budget_ms."""
+    import json
+    import statistics
+    import subprocess
+    import time
+
+    if budget_ms is None:
+        budget_ms = float(os.environ.get('JUDGE_START_BUDGET_MS', DEFAULT_BUDGET_MS))
+    test_file = Path(test_file or suite_file())
+    probe = test_file.parent / 'solution.zip'
+    env = {**os.environ, 'SUBMISSION_DIR': str(probe if probe.is_file() else SUBMISSION_DIR),
+           'REPORT_FORMAT': 'compact', 'RESULT_CACHE': 'off', 'REGRADE_STORE': 'off'}
+    env.pop('BATCH_DIR', None)
+    env.pop('JUDGE_MODE', None)
+    env.pop('JUDGE_ENGINE', None)
+    samples = []
+    for _ in range(runs):
+        env['JUDGE_START'] = repr(time.time())
+        output = subprocess.run([sys.executable, str(Path(__file__).resolve())], env=env, cwd=str(test_file.parent),
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True).stdout
+        try:
+            timings = json.loads(output)['timings']
+            samples.append(round(timings['startup']['wall_ms'] + timings['collection']['wall_ms'], 3))
+        except (ValueError, KeyError, TypeError):
+            result = {'passed': False, 'budget_ms': budget_ms, 'error': f"Probe run produced no timings: {output[:200]!r}"}
+            print(json.dumps(result))
+            return result
+    median = statistics.median(samples)
+    result = {'passed': median <= budget_ms, 'budget_ms': budget_ms, 'first_test_ms': median, 'samples_ms': samples}
+    print(json.dumps(result))
+    return result
+
+
+if __name__ == '__main__':
+    sys.exit(main())
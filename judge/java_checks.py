@@ -0,0 +1,203 @@
+"""
+Java checks of MainActivity.java, run alongside the layout tests.
+
+Suites that ask for them with a module-level `CHECK_JAVA = True` (Assignment1,
+which ships MainActivity.java) run three checks on a submission's
+MainActivity.java:
+
+    java_extends_activity    a class extends an Activity (AppCompatActivity, ...)
+    java_sets_content_view   setContentView(R.layout.activity_main) is called
+    java_view_ids_resolve    every findViewById(R.id.<name>) names an android:id
+                             of activity_main.xml
+
+They read the source through submission_cache.load_source(), which keeps one
+SourceFile and its JavaIndex (java_index.py: a single-pass tokenizer, no
+JVM) per submission, and resolve ids against the submission's cached
+LayoutIndex. start() reads and tokenizes the source on a background thread
+as soon as a run begins, so that work overlaps the layout tests, and
+finish() waits for it and runs the checks, which by then only look up
+names. The result is reported in its own section, which enhance_json.py summarizes
+as stats['java'] without changing the layout tests' marks, as
+
+    "java": {
+        "path": "/app/submission/MainActivity.java",
+        "tests": [{"id": "java_sets_content_view", "outcome": "failed",
+                   "message": "setContentView() is never called"}, ...],
+        "summary": {"passed": 2, "failed": 1, "total": 3}
+    }
+
+As a pytest plugin (`pytest -p java_checks`, which runner.sh and the warm
+session pass) it starts with the first test of a run and reports with the
+last; fast_eval.py calls start() and finish() itself. Other suites and
+submissions without MainActivity.java get no section; JAVA_CHECKS=off turns
+the stage off everywhere.
+"""
+
+import ast
+import os
+from collections import OrderedDict
+from functools import lru_cache
+
+import pytest
+
+from submission_cache import JAVA_NAME, load_source, load_submission
+
+LAYOUT_NAME = 'activity_main'
+SUITE_FLAG = 'CHECK_JAVA'
+
+_executor = None
+_executor_pid = None
+
+
+def java_enabled():
+    return os.environ.get('JAVA_CHECKS', 'on').lower() not in ('off', '0', 'false', 'no')
+
+
+@lru_cache(maxsize=32)
+def _suite_flag(path, mtime_ns):
+    try:
+        tree = ast.parse(open(path, encoding='utf-8').read())
+    except (OSError, SyntaxError, ValueError):
+        return False
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and isinstance(node.value, ast.Constant) \
+                and any(isinstance(target, ast.Name) and target.id == SUITE_FLAG for target in node.targets):
+            return node.value.value is True
+    return False
+
+
+def suite_checks_java(test_file):
+    """True when the suite in test_file sets CHECK_JAVA = True; read from its source, without importing it."""
+    if test_file is None:
+        return False
+    try:
+        return _suite_flag(str(test_file), os.stat(test_file).st_mtime_ns)
+    except OSError:
+        return False
+
+
+def check_extends_activity(java, layout):
+    if not java.extends('Activity'):
+        return f"{JAVA_NAME} should declare a class that extends an Activity, such as AppCompatActivity"
+    return None
+
+
+def check_sets_content_view(java, layout):
+    calls = java.calls_to('setContentView')
+    if not calls:
+        return "setContentView() is never called"
+    layouts = [name for call in calls for _, name in call.resources('layout')]
+    if LAYOUT_NAME not in layouts:
+        used = ', '.join(f"R.layout.{name}" for name in layouts) or 'no layout resource'
+        return f"setContentView() should be called with R.layout.{LAYOUT_NAME}, got {used}"
+    return None
+
+
+def check_view_ids_resolve(java, layout):
+    lookups = [(name, call.line) for call in java.calls_to('findViewById') for _, name in call.resources('id')]
+    if not lookups:
+        return None
+    if layout is None:
+        return f"findViewById() ids cannot be resolved: {LAYOUT_NAME}.xml did not parse"
+    ids = {view.get('id').split('/', 1)[-1] for view in layout.views if view.get('id')}
+    missing = [f"R.id.{name} (line {line})" for name, line in lookups if name not in ids]
+    if missing:
+        return f"findViewById() ids with no matching android:id in {LAYOUT_NAME}.xml: {', '.join(missing)}"
+    return None
+
+
+CHECKS = OrderedDict([
+    ('java_extends_activity', check_extends_activity),
+    ('java_sets_content_view', check_sets_content_view),
+    ('java_view_ids_resolve', check_view_ids_resolve),
+])
+
+
+def _pool():
+    # One thread per process; a forked batch worker starts its own
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid():
+        from concurrent.futures import ThreadPoolExecutor
+
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='java-checks')
+        _executor_pid = os.getpid()
+    return _executor
+
+
+def _prepare(submission_dir):
+    source = load_source(submission_dir)
+    if source.text is not None:
+        source.index
+    return source
+
+
+def start(submission_dir, test_file):
+    """Begin reading and tokenizing the submission's Java source; returns a handle for finish()."""
+    if submission_dir is None or not java_enabled() or not suite_checks_java(test_file):
+        return None
+    return submission_dir, _pool().submit(_prepare, submission_dir)
+
+
+def finish(pending):
+    """The 'java' report section for a start() handle, or None when the submission has no Java source."""
+    if pending is None:
+        return None
+    submission_dir, future = pending
+    source = future.result()
+    if not source.exists:
+        return None
+    tests = []
+    error = source.error or source.index_error
+    if error is not None:
+        tests = [{'id': check_id, 'outcome': 'failed', 'message': f"{JAVA_NAME} could not be read: {error}"}
+                 for check_id in CHECKS]
+    else:
+        document = load_submission(submission_dir)
+        layout = document.index if document.parsed else None
+        for check_id, check in CHECKS.items():
+            message = check(source.index, layout)
+            tests.append({'id': check_id, 'outcome': 'failed' if message else 'passed', 'message': message})
+    passed = sum(1 for test in tests if test['outcome'] == 'passed')
+    return {
+        'path': source.path,
+        'tests': tests,
+        'summary': {'passed': passed, 'failed': len(tests) - passed, 'total': len(tests)},
+    }
+
+
+def java_section(submission_dir, test_file):
+    """start() and finish() in one call."""
+    return finish(start(submission_dir, test_file))
+
+
+class JavaChecksPlugin:
+    """Starts the Java stage with the first test of a run and reports it after the last."""
+
+    def __init__(self):
+        self.pending = None
+        self.running = False
+        self.section = None
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_protocol(self, item, nextitem):
+        module = getattr(item, 'module', None)
+        if not self.running:
+            self.running = True
+            self.pending = start(getattr(module, 'SUBMISSION_DIR', None), getattr(module, '__file__', None))
+        yield
+        if nextitem is None:
+            # Before the warm session clears the submission cache
+            self.section = finish(self.pending)
+            self.pending = None
+            self.running = False
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_json_modifyreport(self, json_report):
+        if self.section is not None:
+            json_report['java'] = self.section
+        self.section = None
+
+
+def pytest_configure(config):
+    if not config.pluginmanager.has_plugin('judge_java_checks_plugin'):
+        config.pluginmanager.register(JavaChecksPlugin(), 'judge_java_checks_plugin')
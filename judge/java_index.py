@@ -0,0 +1,176 @@
+"""
+Single-pass tokenizer and index for an Android activity's Java source.
+
+No JVM and no full parser: tokenize() splits the source into identifiers,
+literals and punctuation in one regular-expression scan, dropping comments
+and whitespace, and JavaIndex records while walking the tokens once
+
+- the package, the imports, every `class Name extends Base` and the names
+  of the methods declared with a body,
+- every other method call by name, with the tokens of its argument list,
+- every resource reference R.<type>.<name>, such as R.layout.activity_main
+  or R.id.greeting,
+
+which is what the judge's Java checks (java_checks.py) need: the layout
+passed to setContentView() and the ids looked up with findViewById().
+Unterminated comments, strings or text blocks and unbalanced brackets raise
+JavaSyntaxError with the line they start on.
+"""
+
+import re
+
+_TOKEN = re.compile(r'''
+    (?P<space>\s+)
+  | (?P<comment>//[^\n]*|/\*.*?\*/)
+  | (?P<open_comment>/\*)
+  | (?P<text_block>""".*?""")
+  | (?P<open_text_block>""")
+  | (?P<string>"(?:[^"\\\n]|\\.)*")
+  | (?P<char>'(?:[^'\\\n]|\\.)+')
+  | (?P<open_string>["'])
+  | (?P<identifier>[A-Za-z_$][A-Za-z0-9_$]*)
+  | (?P<number>\.?[0-9][0-9A-Za-z_.]*)
+  | (?P<punct>::|->|\.\.\.|[(){}\[\];,.@=<>!~?:+\-*/&|^%])
+''', re.VERBOSE | re.DOTALL)
+
+_ERRORS = {
+    'open_comment': 'Unterminated comment',
+    'open_text_block': 'Unterminated text block',
+    'open_string': 'Unterminated string or character literal',
+}
+_PAIRS = {')': '(', ']': '[', '}': '{'}
+
+
+class JavaSyntaxError(ValueError):
+    """The source cannot be tokenized; line is where the offending token starts."""
+
+    def __init__(self, message, line):
+        super().__init__(f"{message} at line {line}")
+        self.line = line
+
+
+class Token:
+    """One token; close is the position of the matching bracket for an opening one."""
+
+    __slots__ = ('kind', 'value', 'line', 'close')
+
+    def __init__(self, kind, value, line):
+        self.kind = kind
+        self.value = value
+        self.line = line
+        self.close = None
+
+    def __repr__(self):
+        return f"<Token {self.kind} {self.value!r} line={self.line}>"
+
+
+def tokenize(text):
+    """List of Tokens in text, without whitespace and comments."""
+    tokens = []
+    line = 1
+    position = 0
+    brackets = []
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if match is None:
+            raise JavaSyntaxError(f"Unexpected character {text[position]!r}", line)
+        kind = match.lastgroup
+        value = match.group()
+        if kind in _ERRORS:
+            raise JavaSyntaxError(_ERRORS[kind], line)
+        if kind not in ('space', 'comment'):
+            tokens.append(Token(kind, value, line))
+            if kind == 'punct' and value in '([{':
+                brackets.append(len(tokens) - 1)
+            elif kind == 'punct' and value in _PAIRS:
+                if not brackets or tokens[brackets[-1]].value != _PAIRS[value]:
+                    raise JavaSyntaxError(f"Unbalanced {value!r}", line)
+                tokens[brackets.pop()].close = len(tokens) - 1
+        line += value.count('\n')
+        position = match.end()
+    if brackets:
+        opening = tokens[brackets[-1]]
+        raise JavaSyntaxError(f"Unclosed {opening.value!r}", opening.line)
+    return tokens
+
+
+class Call:
+    """One method call: its name, the tokens between its parentheses and its line."""
+
+    __slots__ = ('name', 'args', 'line')
+
+    def __init__(self, name, args, line):
+        self.name = name
+        self.args = args
+        self.line = line
+
+    def resources(self, kind=None):
+        """The app's R.<kind>.<name> references among the arguments, as (kind, name) pairs; android.R is skipped."""
+        found = []
+        values = [token.value for token in self.args]
+        for i in range(len(values) - 4):
+            # android.R.<kind>.<name> is a framework resource, not one of the app's
+            framework = values[max(i - 2, 0):i] == ['android', '.'] and (i < 3 or values[i - 3] != '.')
+            if values[i] == 'R' and values[i + 1] == '.' and values[i + 3] == '.' and not framework \
+                    and (kind is None or values[i + 2] == kind):
+                found.append((values[i + 2], values[i + 4]))
+        return found
+
+    def __repr__(self):
+        return f"<Call {self.name} line={self.line}>"
+
+
+class JavaIndex:
+    """Package, imports, classes, declared methods, calls and resource references from one pass over the tokens."""
+
+    def __init__(self, text):
+        self.tokens = tokenize(text)
+        self.package = None
+        self.imports = []
+        self.classes = {}
+        self.methods = []
+        self.calls = {}
+        self.resources = []
+        tokens = self.tokens
+        values = [token.value for token in tokens]
+        for i, token in enumerate(tokens):
+            if token.kind != 'identifier':
+                continue
+            value = token.value
+            previous = values[i - 1] if i else None
+            following = values[i + 1] if i + 1 < len(values) else None
+            if value in ('package', 'import') and previous in (None, ';', '}'):
+                end = i + 1
+                while end < len(values) and values[end] != ';':
+                    end += 1
+                name = ''.join(value for value in values[i + 1:end] if value != 'static')
+                if value == 'package':
+                    self.package = name
+                else:
+                    self.imports.append(name)
+            elif value in ('class', 'interface', 'enum', 'record') and previous != '.' \
+                    and following is not None and tokens[i + 1].kind == 'identifier':
+                base = None
+                if values[i + 2:i + 3] == ['extends'] and i + 3 < len(values):
+                    # A qualified base (androidx.appcompat.app.AppCompatActivity) keeps its full name
+                    end = i + 3
+                    while values[end + 1:end + 2] == ['.'] and end + 2 < len(values) and tokens[end + 2].kind == 'identifier':
+                        end += 2
+                    base = ''.join(values[i + 3:end + 1])
+                self.classes[following] = base
+            elif value == 'R' and previous != '.' and following == '.' and values[i + 3:i + 4] == ['.'] \
+                    and i + 4 < len(values):
+                self.resources.append((values[i + 2], values[i + 4], token.line))
+            elif following == '(' and previous != 'new':
+                close = tokens[i + 1].close
+                if values[close + 1:close + 2] in (['{'], ['throws']):
+                    self.methods.append(value)
+                else:
+                    self.calls.setdefault(value, []).append(Call(value, tokens[i + 2:close], token.line))
+
+    def calls_to(self, name):
+        return self.calls.get(name, [])
+
+    def extends(self, suffix):
+        """Names of classes whose base class's simple name ends with suffix (e.g. 'Activity')."""
+        return [name for name, base in self.classes.items() if base and base.rsplit('.', 1)[-1].endswith(suffix)]
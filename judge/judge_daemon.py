@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Long-running judge that keeps pytest, lxml and the collected suite warm.
+
+Jobs are JSON objects, one per line, answered with one compact enhanced
+report per line:
+
+    {"id": "42", "assignment_id": "assignment2", "path": "/data/alice"}
+    {"id": "43", "assignment_id": "assignment2", "content": "<LinearLayout ...>"}
+    {"id": "44", "assignment_id": "assignment2", "archive": "<base64 zip>"}
+
+"path" may be a submission folder or a .zip, as in batch mode; "content" is
+the activity_main.xml text itself and "archive" a base64-encoded submission
+zip. Both are graded in memory (see submission_archive.py), so nothing is
+written to /tmp. "id" is echoed back when present. When ASSIGNMENT_ID is set,
+jobs for any other assignment are rejected. Repeated submissions are answered
+from the result cache (see result_cache.py), and after a suite edit only the
+changed tests run (see regrade_store.py).
+
+In the multi-assignment image (see suite_registry.py) every bundled suite is
+loaded at startup and each job is graded by the suite its assignment_id
+names; ASSIGNMENT_ID then only sets the default for jobs without one.
+
+Usage:
+    python3 /app/judge_daemon.py                       # stdin/stdout
+    python3 /app/judge_daemon.py --socket /tmp/judge.sock
+"""
+
+import argparse
+import base64
+import binascii
+import json
+import os
+import socket
+import socketserver
+import sys
+from pathlib import Path
+from zipfile import BadZipFile
+
+os.environ['PYTHONUNBUFFERED'] = '1'
+
+APP_DIR = Path(__file__).resolve().parent
+
+if str(APP_DIR) not in sys.path:
+    sys.path.insert(0, str(APP_DIR))
+
+from batch_runner import XML_NAME, grade_submission
+from enhance_json import enhance_data, error_data
+from fast_eval import TEST_FILE, run_engine
+from regrade_store import open_regrade_store
+from result_cache import open_result_cache, suite_hash
+from submission_archive import memory_archive, open_archive, pack
+from suite_registry import discover_suites, run_suites
+from xml_intake import IntakeLimitError, IntakeLimits
+
+
+def select_grade(grades, wanted, assignment_id=None):
+    """Return (grade, error) for the wanted assignment; error is None when a suite serves it.
+
+    grades maps assignment ids to grade functions; a single suite loaded without
+    an ASSIGNMENT_ID is stored under None and serves every job.
+    """
+    if None in grades:
+        return grades[None], None
+    key = str(wanted) if wanted else assignment_id
+    if key in grades:
+        return grades[key], None
+    served = ', '.join(grades)
+    if key:
+        return None, f"Unknown assignment_id {key}, this judge serves {served}"
+    return None, f"Job needs an 'assignment_id', this judge serves {served}"
+
+
+def handle_job(grades, job, assignment_id=None):
+    """Grade one decoded job and return the enhanced report."""
+    if not isinstance(job, dict):
+        return error_data('Job must be a JSON object')
+    grade, error = select_grade(grades, job.get('assignment_id'), assignment_id)
+    field = next((name for name in ('content', 'archive', 'path') if name in job), None)
+    if error:
+        report = error_data(error)
+    elif field is not None and not isinstance(job[field], str):
+        # null or a number would otherwise be graded as its text, such as 'None'
+        got = 'null' if job[field] is None else type(job[field]).__name__
+        report = error_data(f"Job field '{field}' must be a string, got {got}")
+    elif 'content' in job:
+        try:
+            # Refuse oversized content before it is copied again
+            content = job['content'].encode('utf-8')
+            max_bytes = IntakeLimits.from_env().bytes
+            if len(content) > max_bytes:
+                raise IntakeLimitError('bytes', len(content), max_bytes)
+            with memory_archive(pack({XML_NAME: content})) as source:
+                report = enhance_data(grade(source))
+        except Exception as e:
+            report = error_data(str(e))
+    elif 'archive' in job:
+        report = grade_archive(grade, job['archive'])
+    elif 'path' in job:
+        if os.path.exists(job['path']):
+            report = grade_submission(grade, job['path'])
+        else:
+            report = error_data(f"Submission {job['path']} not found")
+    else:
+        report = error_data("Job needs a 'path', 'content' or 'archive' field")
+    if 'id' in job:
+        report['id'] = job['id']
+    return report
+
+
+def grade_archive(grade, encoded):
+    """Grade a base64-encoded submission zip without writing it anywhere."""
+    try:
+        data = base64.b64decode(str(encoded), validate=True)
+    except (binascii.Error, ValueError) as e:
+        return error_data(f"Invalid submission archive: {e}")
+    max_bytes = IntakeLimits.from_env().archive_bytes
+    if len(data) > max_bytes:
+        return error_data(str(IntakeLimitError('archive_bytes', len(data), max_bytes)))
+    with memory_archive(data) as source:
+        try:
+            with open_archive(source):
+                pass
+            return enhance_data(grade(source))
+        except BadZipFile as e:
+            return error_data(f"Invalid submission archive: {e}")
+        except Exception as e:
+            return error_data(str(e))
+
+
+def handle_line(grades, line, assignment_id=None):
+    """Decode one protocol line and return the encoded response line."""
+    try:
+        job = json.loads(line)
+    except ValueError as e:
+        report = error_data(f"Invalid job: {e}")
+    else:
+        report = handle_job(grades, job, assignment_id)
+    return json.dumps(report, separators=(',', ':')) + '\n'
+
+
+def serve_stream(grades, infile, outfile, assignment_id=None):
+    for line in infile:
+        if not line.strip():
+            continue
+        outfile.write(handle_line(grades, line, assignment_id))
+        outfile.flush()
+
+
+class JobHandler(socketserver.StreamRequestHandler):
+    """One client connection; it may send any number of job lines."""
+
+    def handle(self):
+        for raw in self.rfile:
+            if not raw.strip():
+                continue
+            response = handle_line(self.server.grades, raw.decode('utf-8'), self.server.assignment_id)
+            self.wfile.write(response.encode('utf-8'))
+            self.wfile.flush()
+
+
+def serve_socket(grades, socket_path, assignment_id=None):
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    # Jobs share the warm pytest sessions, so connections are served one at a time
+    with socketserver.UnixStreamServer(socket_path, JobHandler) as server:
+        server.grades = grades
+        server.assignment_id = assignment_id
+        server.serve_forever()
+
+
+def submit(socket_path, job):
+    """Client helper: send one job to a running daemon and return its report."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        stream = sock.makefile('rwb')
+        stream.write(json.dumps(job).encode('utf-8') + b'\n')
+        stream.flush()
+        return json.loads(stream.readline())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Warm judge daemon')
+    parser.add_argument('--socket', help='Unix socket path; stdin/stdout is used when omitted')
+    parser.add_argument('--assignment-id', default=os.environ.get('ASSIGNMENT_ID'))
+    args = parser.parse_args(argv)
+    cache = open_result_cache()
+    store = open_regrade_store()
+
+    if not args.socket:
+        # pytest captures fds 0 and 1 while the session is live, so keep private copies
+        infile = os.fdopen(os.dup(sys.stdin.fileno()), 'r')
+        outfile = os.fdopen(os.dup(sys.stdout.fileno()), 'w')
+
+    suites = discover_suites()
+
+    def serve(grades):
+        if store is not None:
+            grades = {key: store.wrap(grade, suites.get(key, TEST_FILE)) for key, grade in grades.items()}
+        if cache is not None:
+            grades = {
+                key: cache.wrap(grade, suite_hash(suites[key].parent) if key in suites else None)
+                for key, grade in grades.items()
+            }
+        if args.socket:
+            serve_socket(grades, args.socket, args.assignment_id)
+        else:
+            serve_stream(grades, infile, outfile, args.assignment_id)
+
+    if suites:
+        run_suites(serve, suites)
+    else:
+        run_engine(lambda grade: serve({args.assignment_id or None: grade}))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,180 @@
+"""
+Wall and CPU time of each grading phase, reported as a 'timings' section.
+
+As a pytest plugin (`pytest -p judge_timings`, which runner.sh and the warm
+session pass) it adds to the pytest-json-report output:
+
+    "timings": {
+        "startup":    {"wall_ms": ..., "cpu_ms": ...},   # process start to session start
+        "collection": {...},                              # plugin load done, suite imported and collected
+        "discovery":  {...},                              # locating activity_main.xml
+        "parse":      {...},                              # reading and parsing it
+        "index":      {...},                              # building the LayoutIndex
+        "tests":      {"<nodeid>": {...}, ...},           # setup + call + teardown per test
+        "run":        {...},                              # all tests
+        "peak_rss_kb": ..., "submission_bytes": ...
+    }
+
+enhance_json.py (in the session: report_stream.py) adds "report", the time
+spent enhancing the raw report. A submission rejected by xml_intake.py also
+gets a top-level "intake" section naming the limit it crossed. In a warm
+session startup and collection happen once and are repeated in every report. Times of a phase that did not run (no file, parse error) are omitted.
+
+Setting JUDGE_PROFILE_DIR turns on cProfile; a submission whose tests take
+longer than JUDGE_PROFILE_THRESHOLD_MS (default 1000) gets a .prof file there,
+and its path is reported as timings["profile"].
+"""
+
+import os
+import resource
+import time
+
+import pytest
+
+import submission_cache
+
+DEFAULT_PROFILE_THRESHOLD_MS = 1000.0
+
+
+class Stopwatch:
+    """Wall and CPU time since creation."""
+
+    def __init__(self):
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+
+    def elapsed(self):
+        return {
+            'wall_ms': round((time.perf_counter() - self.wall) * 1000, 3),
+            'cpu_ms': round((time.process_time() - self.cpu) * 1000, 3)
+        }
+
+
+def process_age():
+    """Seconds since this process started: from JUDGE_START if runner.sh set it, else from /proc."""
+    if os.environ.get('JUDGE_START'):
+        try:
+            return max(0.0, time.time() - float(os.environ['JUDGE_START']))
+        except ValueError:
+            pass
+    try:
+        with open('/proc/self/stat') as f:
+            started_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        return max(0.0, time.clock_gettime(time.CLOCK_BOOTTIME) - started_ticks / os.sysconf('SC_CLK_TCK'))
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def startup_timing():
+    """Wall and CPU time from process start until now."""
+    age = process_age()
+    timing = {'cpu_ms': round(time.process_time() * 1000, 3)}
+    if age is not None:
+        timing['wall_ms'] = round(age * 1000, 3)
+    return timing
+
+
+def peak_rss_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class Profiler:
+    """Opt-in cProfile of one grading run, kept only for slow submissions."""
+
+    def __init__(self, directory=None, threshold_ms=None):
+        self.directory = directory if directory is not None else os.environ.get('JUDGE_PROFILE_DIR')
+        if threshold_ms is None:
+            threshold_ms = float(os.environ.get('JUDGE_PROFILE_THRESHOLD_MS', DEFAULT_PROFILE_THRESHOLD_MS))
+        self.threshold_ms = threshold_ms
+        self.profile = None
+
+    def start(self):
+        if self.directory:
+            # Imported here: one-shot runs without profiling should not pay for it
+            import cProfile
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+
+    def stop(self, wall_ms, submission_path=None):
+        """Stop profiling; dump the profile if the run was slow and return its path."""
+        profile, self.profile = self.profile, None
+        if profile is None:
+            return None
+        profile.disable()
+        if wall_ms < self.threshold_ms:
+            return None
+        import hashlib
+        os.makedirs(self.directory, exist_ok=True)
+        tag = hashlib.sha256(str(submission_path).encode('utf-8')).hexdigest()[:12]
+        path = os.path.join(self.directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{tag}.prof")
+        profile.dump_stats(path)
+        return path
+
+
+def build_timings(startup, collection, tests, run, submission_path=None, profile=None):
+    """Assemble the 'timings' section from measured phases and the submission cache's load timings."""
+    timings = {'startup': startup}
+    if collection is not None:
+        timings['collection'] = collection
+    loads = submission_cache.load_timings(submission_path)
+    for phase in ('discovery', 'parse', 'index'):
+        if phase in loads:
+            timings[phase] = loads[phase]
+    timings['tests'] = tests
+    timings['run'] = run
+    timings['peak_rss_kb'] = peak_rss_kb()
+    if 'bytes' in loads:
+        timings['submission_bytes'] = loads['bytes']
+    if profile:
+        timings['profile'] = profile
+    return timings
+
+
+class TimingsPlugin:
+    """Collects phase timings for a pytest session; every pass over the items is one run."""
+
+    def __init__(self):
+        self.startup = None
+        self.collection = None
+        self.collection_clock = None
+        self.first_nodeid = None
+        self.run_clock = None
+        self.tests = {}
+        self.profiler = Profiler()
+
+    def pytest_sessionstart(self, session):
+        self.startup = startup_timing()
+        self.collection_clock = Stopwatch()
+
+    def pytest_collection_finish(self, session):
+        self.collection = self.collection_clock.elapsed()
+        self.first_nodeid = session.items[0].nodeid if session.items else None
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_protocol(self, item, nextitem):
+        if item.nodeid == self.first_nodeid or self.run_clock is None:
+            # Start of a run; a warm session runs the same items once per submission
+            self.tests = {}
+            submission_cache.reset_load_timings()
+            self.run_clock = Stopwatch()
+            self.profiler.start()
+        clock = Stopwatch()
+        yield
+        self.tests[item.nodeid] = clock.elapsed()
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_json_modifyreport(self, json_report):
+        run = self.run_clock.elapsed() if self.run_clock is not None else {'wall_ms': 0.0, 'cpu_ms': 0.0}
+        self.run_clock = None
+        path = submission_cache.last_loaded()
+        profile = self.profiler.stop(run['wall_ms'], path)
+        json_report['timings'] = build_timings(self.startup or startup_timing(), self.collection,
+                                               self.tests, run, path, profile)
+        rejection = submission_cache.intake_rejection(path)
+        if rejection:
+            json_report['intake'] = rejection
+
+
+def pytest_configure(config):
+    if not config.pluginmanager.has_plugin('judge_timings_plugin'):
+        config.pluginmanager.register(TimingsPlugin(), 'judge_timings_plugin')
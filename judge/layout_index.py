@@ -0,0 +1,118 @@
+"""
+Single-pass element/attribute index over a parsed layout.
+
+The index walks the tree once and records every element under its tag,
+together with a normalized attribute view. Tags are kept as ElementTree has
+them, so findall('TextView') returns what root.findall('.//TextView') did:
+a namespaced <android:TextView> is '{namespace}TextView' and does not match. Attributes in the Android
+namespace ({http://schemas.android.com/apk/res/android}text) and prefixed
+attributes (android:text) are both readable as 'text'; the namespaced form
+wins when both are present. Attributes in other well known namespaces keep
+their usual prefix (tools:context, app:layout_constraintTop_toTopOf).
+Bare attributes (text) are not Android attributes and are kept apart in
+View.plain; only a suite that accepts them asks for them with
+get(name, bare=True).
+"""
+
+ANDROID_NS = 'http://schemas.android.com/apk/res/android'
+
+NS_PREFIXES = {
+    ANDROID_NS: 'android',
+    'http://schemas.android.com/apk/res-auto': 'app',
+    'http://schemas.android.com/tools': 'tools',
+}
+
+
+def normalize_attribute(name, element=None):
+    """Return the normalized key for an attribute name and whether it is Android-namespaced.
+
+    The key is None for a bare attribute.
+    """
+    if name.startswith('{'):
+        uri, local = name[1:].split('}', 1)
+        if uri == ANDROID_NS:
+            return local, True
+        prefix = NS_PREFIXES.get(uri)
+        if prefix is None and element is not None:
+            prefix = next((p for p, u in element.nsmap.items() if u == uri and p), None)
+        return (f"{prefix}:{local}" if prefix else local), False
+    if name.startswith('android:'):
+        return name[len('android:'):], False
+    if ':' in name:
+        return name, False
+    return None, False
+
+
+class View:
+    """One indexed element with its normalized attributes and its bare ones."""
+
+    __slots__ = ('element', 'tag', 'depth', 'attrs', 'plain')
+
+    def __init__(self, element, tag, depth, attrs, plain=None):
+        self.element = element
+        self.tag = tag
+        self.depth = depth
+        self.attrs = attrs
+        self.plain = plain or {}
+
+    def get(self, name, default=None, bare=False):
+        """Value of an Android attribute; bare=True falls back to the un-namespaced attribute of that name."""
+        value = self.attrs.get(name)
+        if not value and bare:
+            value = self.plain.get(name)
+        return default if value is None else value
+
+    def __repr__(self):
+        return f"<View {self.tag} depth={self.depth}>"
+
+
+class LayoutIndex:
+    """Tag -> views map built in one traversal of the document."""
+
+    def __init__(self, root):
+        self.by_tag = {}
+        self.views = []
+        self.root = None
+        if root is None:
+            return
+        stack = [(root, 0)]
+        while stack:
+            element, depth = stack.pop()
+            if not isinstance(element.tag, str):
+                continue
+            view = View(element, element.tag, depth, *self._attributes(element))
+            self.views.append(view)
+            self.by_tag.setdefault(view.tag, []).append(view)
+            # Push children reversed so views come out in document order
+            stack.extend((child, depth + 1) for child in reversed(element))
+        self.root = self.views[0]
+
+    @staticmethod
+    def _attributes(element):
+        attrs = {}
+        plain = {}
+        for name, value in element.attrib.items():
+            key, is_android = normalize_attribute(name, element)
+            if key is None:
+                plain[name] = value
+            elif is_android:
+                attrs[key] = value
+            else:
+                attrs.setdefault(key, value)
+        return attrs, plain
+
+    def findall(self, tag):
+        """Views with the given tag below the root, like root.findall('.//tag')."""
+        return [view for view in self.by_tag.get(tag, ()) if view is not self.root]
+
+    def find(self, tag):
+        """First view with the given tag below the root, or None."""
+        views = self.findall(tag)
+        return views[0] if views else None
+
+    def count(self, tag):
+        return len(self.findall(tag))
+
+    @property
+    def max_depth(self):
+        return max((view.depth for view in self.views), default=0)
@@ -0,0 +1,278 @@
+"""
+Per-test results, so a suite edit only re-runs the tests it changed.
+
+The result cache (result_cache.py) keys whole reports on the whole suite, so
+fixing one assertion in test_assignment.py regrades every test of every
+submission. RegradeStore keeps each test's report entry instead, keyed by
+
+- the submission: the key result_cache.py computes (canonical XML, Java
+  source, judge runtime modules and intake limits), and
+- the test: a hash of its source (decorators included), of the fixtures it
+  requests directly or indirectly, of its class body outside other tests,
+  and of everything else the suite shares: module-level code that is not a
+  test or fixture, conftest.py, pytest.ini, enhance_json.py, solution.zip,
+  the judge runtime modules and intake limits (result_cache.judge_digest())
+  and whether tiers are on.
+
+Digests come from the suite's source (ast), without importing it. When a
+submission is graded again, tests whose stored digest still matches are
+reused and the engine runs only the changed or new ones (grade(..., select=)
+in warm_session.py and fast_eval.py). The merged report has the tests in
+suite order, a recomputed summary, so enhance_json.py's marks and percentage
+cover every test, and an 'incremental' section naming what ran:
+
+    "incremental": {"rerun": ["TestTextView::test_textview_dimensions"], "reused": 8}
+
+A submission with nothing to re-run is answered without the engine.
+JUDGE_ENGINE=parity runs every test, as the comparison needs both engines.
+Entries are stored with the submission path replaced, as in the result cache
+(result_cache.relocate()), so reused output names the submission being graded.
+
+Entries live in SQLite next to the result cache (REGRADE_STORE_PATH,
+default /app/cache/tests.db), with least-recently-used eviction of whole
+submissions once max_submissions is exceeded. The store is opt-in:
+REGRADE_STORE=on enables it.
+"""
+
+import ast
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from collections import Counter, OrderedDict
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent
+SHARED_FILES = ['conftest.py', 'pytest.ini', 'enhance_json.py', 'solution.zip']
+DEFAULT_PATH = '/app/cache/tests.db'
+DEFAULT_MAX_SUBMISSIONS = 10000
+
+
+def test_name(nodeid):
+    """'TestClass::test_name' for a node id, without the file and any parametrize id."""
+    return nodeid.split('::', 1)[-1].split('[', 1)[0]
+
+
+def _source(lines, node):
+    """Source of a definition including its decorators."""
+    start = min([node.lineno] + [decorator.lineno for decorator in getattr(node, 'decorator_list', [])])
+    return '\n'.join(lines[start - 1:node.end_lineno])
+
+
+def _is_fixture(node):
+    if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+        return False
+    for decorator in node.decorator_list:
+        target = decorator.func if isinstance(decorator, ast.Call) else decorator
+        if (isinstance(target, ast.Attribute) and target.attr == 'fixture') or \
+                (isinstance(target, ast.Name) and target.id == 'fixture'):
+            return True
+    return False
+
+
+def _fixture_name(node):
+    for decorator in node.decorator_list:
+        if isinstance(decorator, ast.Call):
+            for keyword in decorator.keywords:
+                if keyword.arg == 'name' and isinstance(keyword.value, ast.Constant):
+                    return keyword.value.value
+    return node.name
+
+
+def _params(node):
+    return [arg.arg for arg in node.args.args + node.args.kwonlyargs if arg.arg != 'self']
+
+
+def _digest(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode('utf-8') + b'\0')
+    return digest.hexdigest()
+
+
+def suite_digests(test_file, tiered=False):
+    """OrderedDict of test name -> digest for every test in test_file, in suite order."""
+    from result_cache import judge_digest
+
+    test_file = Path(test_file)
+    text = test_file.read_text()
+    lines = text.splitlines()
+    tree = ast.parse(text)
+    fixtures = {}
+    tests = []
+    shared = []
+    for node in tree.body:
+        if _is_fixture(node):
+            fixtures[_fixture_name(node)] = node
+        elif isinstance(node, ast.ClassDef) and node.name.startswith('Test'):
+            members = [member for member in node.body
+                       if isinstance(member, (ast.FunctionDef, ast.AsyncFunctionDef)) and member.name.startswith('test_')]
+            # The class body without its tests: helpers, attributes, class-level marks
+            body = _source(lines, node).splitlines()
+            offset = min([node.lineno] + [d.lineno for d in node.decorator_list])
+            for member in reversed(members):
+                start = min([member.lineno] + [d.lineno for d in member.decorator_list])
+                del body[start - offset:member.end_lineno - offset + 1]
+            context = '\n'.join(body)
+            tests.extend((f"{node.name}::{member.name}", member, context) for member in members)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name.startswith('test_'):
+            tests.append((node.name, node, ''))
+        else:
+            shared.append(_source(lines, node))
+    for name in SHARED_FILES:
+        path = test_file.parent / name
+        if not path.is_file():
+            path = APP_DIR / name
+        shared.append(hashlib.sha256(path.read_bytes()).hexdigest() if path.is_file() else '')
+    shared.append(f"judge={judge_digest()}")
+    shared.append(f"tiered={bool(tiered)}")
+    shared_digest = _digest(*shared)
+
+    def closure(names):
+        found, pending = OrderedDict(), list(names)
+        while pending:
+            name = pending.pop(0)
+            if name in found or name not in fixtures:
+                continue
+            found[name] = _source(lines, fixtures[name])
+            pending.extend(_params(fixtures[name]))
+        return [found[name] for name in sorted(found)]
+
+    return OrderedDict(
+        (name, _digest(shared_digest, context, _source(lines, node), *closure(_params(node))))
+        for name, node, context in tests
+    )
+
+
+def merge_report(report, stored, order, rerun):
+    """Report with every test of order: from report when it re-ran, else the stored entry."""
+    fresh = {test_name(entry['nodeid']): entry for entry in (report or {}).get('tests', [])}
+    tests = [fresh[name] if name in fresh else stored[name] for name in order if name in fresh or name in stored]
+    summary = Counter(entry['outcome'] for entry in tests)
+    summary['total'] = sum(summary.values())
+    summary['collected'] = len(order)
+    merged = dict(report) if report is not None else {
+        'created': time.time(),
+        'duration': 0.0,
+        'root': None,
+        'environment': {},
+    }
+    merged['exitcode'] = 1 if any(entry['outcome'] in ('failed', 'error') for entry in tests) else 0
+    merged['summary'] = dict(summary)
+    merged['tests'] = tests
+    merged['incremental'] = {'rerun': list(rerun), 'reused': len(tests) - len(fresh)}
+    return merged
+
+
+class RegradeStore:
+    """SQLite store of per-test report entries keyed by submission and test digest, LRU-bounded by submission."""
+
+    def __init__(self, path=DEFAULT_PATH, max_submissions=DEFAULT_MAX_SUBMISSIONS):
+        self.path = str(path)
+        self.max_submissions = max_submissions
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(self.path, timeout=30)
+        self.db.execute(
+            'CREATE TABLE IF NOT EXISTS tests ('
+            'submission TEXT NOT NULL, test TEXT NOT NULL, digest TEXT NOT NULL, entry TEXT NOT NULL, '
+            'PRIMARY KEY (submission, test))'
+        )
+        self.db.execute(
+            'CREATE TABLE IF NOT EXISTS submissions (submission TEXT PRIMARY KEY, last_used REAL NOT NULL)'
+        )
+        self.db.execute('CREATE INDEX IF NOT EXISTS submissions_last_used ON submissions (last_used)')
+        self.db.commit()
+
+    def lookup(self, submission, digests):
+        """{test name: entry} of stored entries whose digest matches digests."""
+        rows = self.db.execute('SELECT test, digest, entry FROM tests WHERE submission = ?', (submission,)).fetchall()
+        if rows:
+            self.db.execute('UPDATE submissions SET last_used = ? WHERE submission = ?', (time.time(), submission))
+            self.db.commit()
+        return {name: json.loads(entry) for name, digest, entry in rows if digests.get(name) == digest}
+
+    def save(self, submission, digests, entries):
+        self.db.executemany(
+            'INSERT OR REPLACE INTO tests (submission, test, digest, entry) VALUES (?, ?, ?, ?)',
+            [(submission, test_name(entry['nodeid']), digests[test_name(entry['nodeid'])],
+              json.dumps(entry, separators=(',', ':')))
+             for entry in entries if test_name(entry['nodeid']) in digests]
+        )
+        self.db.execute('INSERT OR REPLACE INTO submissions (submission, last_used) VALUES (?, ?)',
+                        (submission, time.time()))
+        excess = self.db.execute('SELECT COUNT(*) FROM submissions').fetchone()[0] - self.max_submissions
+        if excess > 0:
+            evicted = [row[0] for row in self.db.execute(
+                'SELECT submission FROM submissions ORDER BY last_used LIMIT ?', (excess,))]
+            self.db.executemany('DELETE FROM tests WHERE submission = ?', [(key,) for key in evicted])
+            self.db.executemany('DELETE FROM submissions WHERE submission = ?', [(key,) for key in evicted])
+        self.db.commit()
+
+    def __len__(self):
+        return self.db.execute('SELECT COUNT(*) FROM submissions').fetchone()[0]
+
+    def close(self):
+        self.db.close()
+
+    def wrap(self, grade, test_file):
+        """Return a grade(submission_dir) that re-runs only tests without a matching stored result.
+
+        grade must accept select= like WarmSession.grade and FastEvaluator.grade.
+        """
+        # Imported here: result_cache pulls in lxml, which the engines only need once a session runs
+        from java_checks import java_section
+        from result_cache import SUBMISSION_TOKEN, relocate, submission_key
+        from solution_diff import feedback
+        from submission_cache import submission_root
+        from tiers import tiered_enabled
+
+        if os.environ.get('JUDGE_ENGINE') == 'parity':
+            # Parity compares the engines on every test; stored outcomes would skip the comparison
+            return grade
+        digests = suite_digests(test_file, tiered_enabled())
+        order = list(digests)
+        supported = [True]
+
+        def incremental_grade(submission_dir):
+            if not supported[0]:
+                return grade(submission_dir)
+            start = time.perf_counter()
+            submission = submission_key(submission_dir, 'tests')
+            path = str(submission_root(submission_dir))
+            stored = relocate(self.lookup(submission, digests), SUBMISSION_TOKEN, path)
+            rerun = [name for name in order if name not in stored]
+            if not rerun:
+                report = merge_report(None, stored, order, rerun)
+                report['root'] = str(Path(test_file).parent)
+                report['timings'] = {'cached': True, 'lookup': {'wall_ms': round((time.perf_counter() - start) * 1000, 3)}}
+                diff = feedback(submission_dir, test_file)
+                if diff is not None:
+                    report['feedback'] = diff
+                java = java_section(submission_dir, test_file)
+                if java is not None:
+                    report['java'] = java
+                return report
+            report = grade(submission_dir, select=set(rerun) if stored else None)
+            if any(test_name(entry['nodeid']) not in digests or '[' in entry['nodeid']
+                   for entry in report.get('tests', [])):
+                # Tests the source scan cannot tell apart (parametrized, generated, inherited): run them all
+                supported[0] = False
+                return report
+            self.save(submission, digests, relocate(report.get('tests', []), path, SUBMISSION_TOKEN))
+            return merge_report(report, stored, order, rerun) if stored else report
+
+        return incremental_grade
+
+
+def open_regrade_store():
+    """RegradeStore configured from the environment, or None unless REGRADE_STORE enables it."""
+    if os.environ.get('REGRADE_STORE', 'off').lower() in ('off', '0', 'false', 'no'):
+        return None
+    try:
+        return RegradeStore(
+            os.environ.get('REGRADE_STORE_PATH', DEFAULT_PATH),
+            int(os.environ.get('REGRADE_STORE_MAX_SUBMISSIONS', DEFAULT_MAX_SUBMISSIONS))
+        )
+    except (OSError, sqlite3.Error, ValueError):
+        return None
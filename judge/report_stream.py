@@ -0,0 +1,62 @@
+"""
+Enhance the report inside the pytest session and stream it to stdout.
+
+runner.sh used to have pytest write /tmp/report.json and then start a second
+interpreter for enhance_json.py to read, enhance and re-print it. With
+`pytest -p report_stream --json-report --json-report-file=none` the report
+pytest-json-report builds in memory gets its stats (and its 'report' timing)
+here, at the end of the session, and is written straight to stdout. Nothing
+else is printed: the plugin unregisters pytest's terminal reporter (disabling
+the terminal plugin with -p no:terminal would also drop the options
+pytest-json-report reads).
+
+REPORT_FORMAT picks the output: compact (default), pretty (indent=2), or
+ndjson (compact, one report per line).
+"""
+
+import sys
+import time
+
+import pytest
+
+from enhance_json import add_report_timing, enhance_data, error_data, write_report
+
+
+class ReportStream:
+    """Writes the enhanced pytest-json-report output once the session finishes."""
+
+    def __init__(self, stream=None, report_format=None):
+        self.stream = stream
+        self.report_format = report_format
+        self.written = False
+
+    def write(self, data):
+        self.written = True
+        write_report(data, self.stream or sys.stdout, self.report_format)
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_sessionfinish(self, session):
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+        json_report = getattr(session.config, '_json_report', None)
+        data = getattr(json_report, 'report', None)
+        if data is None:
+            self.write(error_data('pytest did not produce a report'))
+            return
+        try:
+            self.write(add_report_timing(enhance_data(data), start_wall, start_cpu))
+        except Exception as e:
+            self.write(error_data(str(e)))
+
+    def pytest_unconfigure(self, config):
+        # An internal error can end the session before sessionfinish; still print valid JSON
+        if not self.written:
+            self.write(error_data('pytest did not produce a report'))
+
+
+@pytest.hookimpl(trylast=True)
+def pytest_configure(config):
+    terminal = config.pluginmanager.get_plugin('terminalreporter')
+    if terminal is not None:
+        config.pluginmanager.unregister(terminal)
+    if not config.pluginmanager.has_plugin('report_stream_plugin'):
+        config.pluginmanager.register(ReportStream(), 'report_stream_plugin')
@@ -0,0 +1,273 @@
+"""
+Content-addressed cache of graded reports.
+
+Many submissions are the untouched starter code, resubmits or copies of the
+solution. The cache key combines a hash of the canonical submission XML with
+a hash of the grading suite, so such submissions are answered from disk
+without running pytest at all:
+
+- canonical XML is the C14N form with comments and whitespace-only text
+  dropped; C14N also fixes the attribute order. Attribute values and real text
+  are kept as-is because the tests read them. Files that do not parse are keyed
+  on their raw bytes, since the error message depends on them.
+  A MainActivity.java next to it adds the hash of its bytes (java_checks.py
+  grades it).
+- the suite hash covers SUITE_FILES, so editing a test or the solution
+  (its feedback section, see solution_diff.py) invalidates the cache.
+  A bundled suite folder (see suite_registry.py) is hashed together with the
+  shared enhance_json.py it is reported with.
+- judge_digest() covers the judge itself: the runtime modules that parse and
+  grade a submission (RUNTIME_MODULES) and the effective INTAKE_* limits, so
+  raising a limit regrades the submissions it rejected.
+- grading_settings() covers the environment that changes the report of the
+  same submission under the same suite: the engine (JUDGE_ENGINE=parity adds
+  a 'parity' section the other engines do not have) and whether tiers are on
+  (JUDGE_TIERED reports tests as blocked, see tiers.py).
+
+Reports name the submission they were graded from (the debug output of the
+fixtures, the java section's path), so entries are stored with the submission
+path replaced by SUBMISSION_TOKEN and a hit is rewritten for the submission
+that asked for it.
+
+Entries live in a SQLite file with least-recently-used eviction once
+max_entries is exceeded. The cache is opt-in: RESULT_CACHE=on enables it, and
+RESULT_CACHE_PATH on a volume keeps it across container restarts.
+"""
+
+import functools
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+from zipfile import BadZipFile
+
+from lxml import etree
+
+from submission_archive import is_archive, open_archive
+from submission_cache import find_source, submission_root
+from xml_intake import IntakeLimitError, IntakeLimits
+
+APP_DIR = Path(__file__).resolve().parent
+XML_NAME = 'activity_main.xml'
+JAVA_NAME = 'MainActivity.java'
+SUITE_FILES = ['test_assignment.py', 'pytest.ini', 'conftest.py', 'enhance_json.py', 'solution.zip']
+# Judge modules whose code decides a submission's outcomes
+RUNTIME_MODULES = ['submission_cache.py', 'submission_archive.py', 'xml_intake.py', 'layout_index.py',
+                   'tiers.py', 'warm_session.py', 'fast_eval.py', 'report_stream.py', 'solution_diff.py',
+                   'java_index.py', 'java_checks.py']
+
+DEFAULT_PATH = '/app/cache/results.db'
+DEFAULT_MAX_ENTRIES = 10000
+# Stands in for the submission path in stored reports
+SUBMISSION_TOKEN = '\0submission\0'
+
+_PARSER = etree.XMLParser(remove_comments=True, remove_pis=True, resolve_entities=False, no_network=True)
+
+
+def canonical_xml(data):
+    """Return the canonical bytes of an XML document, or None if it does not parse."""
+    try:
+        root = etree.fromstring(data, _PARSER)
+    except etree.XMLSyntaxError:
+        return None
+    for element in root.iter():
+        if element.text is not None and not element.text.strip():
+            element.text = None
+        if element.tail is not None and not element.tail.strip():
+            element.tail = None
+    return etree.tostring(root, method='c14n')
+
+
+def suite_hash(app_dir=APP_DIR, files=SUITE_FILES):
+    """Hash of the files that decide how a submission is graded.
+
+    Files missing from app_dir are taken from the shared APP_DIR.
+    """
+    digest = hashlib.sha256()
+    for name in files:
+        path = Path(app_dir) / name
+        if not path.is_file():
+            path = APP_DIR / name
+        digest.update(name.encode('utf-8') + b'\0')
+        if path.is_file():
+            digest.update(path.read_bytes())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def runtime_hash(app_dir=APP_DIR):
+    """Hash of the RUNTIME_MODULES in app_dir, computed once per process."""
+    digest = hashlib.sha256()
+    for name in RUNTIME_MODULES:
+        path = Path(app_dir) / name
+        digest.update(name.encode('utf-8') + b'\0')
+        if path.is_file():
+            digest.update(path.read_bytes())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def judge_digest():
+    """Hash of the judge runtime modules and the effective intake limits."""
+    limits = json.dumps(IntakeLimits.from_env().as_dict(), sort_keys=True)
+    return hashlib.sha256(f"{runtime_hash()}\0{limits}".encode('utf-8')).hexdigest()
+
+
+def grading_settings():
+    """Settings outside the suite files that change the report, as a string for the cache key."""
+    from tiers import tiered_enabled
+
+    return f"engine={os.environ.get('JUDGE_ENGINE', 'pytest')};tiered={tiered_enabled()}"
+
+
+def _read_layout(submission_dir, max_bytes):
+    """Bytes of the submission's activity_main.xml; IntakeLimitError when it is over max_bytes."""
+    if is_archive(submission_dir):
+        with open_archive(submission_dir) as archive:
+            info = archive.find(XML_NAME)
+            if info is None:
+                raise FileNotFoundError(XML_NAME)
+            return archive.read(info, max_bytes)
+    path = os.path.join(submission_dir, XML_NAME)
+    size = os.path.getsize(path)
+    if size > max_bytes:
+        raise IntakeLimitError('bytes', size, max_bytes)
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _read_source(submission_dir, max_bytes):
+    """Bytes of the submission's MainActivity.java (see submission_cache.load_source()), or b'' without one."""
+    if is_archive(submission_dir):
+        with open_archive(submission_dir) as archive:
+            info = archive.find(JAVA_NAME)
+            return archive.read(info, max_bytes) if info is not None else b''
+    path = find_source(submission_dir, JAVA_NAME)
+    if path is None:
+        return b''
+    if path.stat().st_size > max_bytes:
+        raise IntakeLimitError('bytes', path.stat().st_size, max_bytes)
+    return path.read_bytes()
+
+
+def submission_key(submission_dir, suite_digest):
+    """Cache key for the activity_main.xml and MainActivity.java in submission_dir (a folder or zip) under a suite."""
+    prefix = f"{suite_digest}\0{judge_digest()}".encode('ascii')
+    try:
+        data = _read_layout(submission_dir, IntakeLimits.from_env().bytes)
+    except IntakeLimitError as e:
+        # Rejected on size without being parsed, so the limit that was crossed is the whole key
+        oversize = f"oversize:{e.limit}:{e.value}".encode('ascii')
+        return hashlib.sha256(prefix + b'\0' + oversize).hexdigest()
+    except BadZipFile:
+        content = b'bad-archive'
+    except OSError:
+        content = b'missing'
+    else:
+        canonical = canonical_xml(data)
+        content = b'c14n:' + canonical if canonical is not None else b'raw:' + data
+    try:
+        java = _read_source(submission_dir, IntakeLimits.from_env().bytes)
+    except IntakeLimitError as e:
+        java = f"oversize:{e.limit}:{e.value}".encode('ascii')
+    except (BadZipFile, OSError):
+        java = b''
+    if java:
+        # The Java checks (java_checks.py) grade it too
+        content += b'\0java:' + hashlib.sha256(java).digest()
+    return hashlib.sha256(prefix + b'\0' + content).hexdigest()
+
+
+def relocate(value, old, new):
+    """Copy of a report with every occurrence of the path old in its strings replaced by new."""
+    if isinstance(value, str):
+        return value.replace(old, new)
+    if isinstance(value, dict):
+        return {key: relocate(item, old, new) for key, item in value.items()}
+    if isinstance(value, list):
+        return [relocate(item, old, new) for item in value]
+    return value
+
+
+class ResultCache:
+    """SQLite-backed LRU store mapping cache keys to report JSON."""
+
+    def __init__(self, path=DEFAULT_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = str(path)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(self.path, timeout=30)
+        self.db.execute(
+            'CREATE TABLE IF NOT EXISTS results ('
+            'key TEXT PRIMARY KEY, report TEXT NOT NULL, last_used REAL NOT NULL)'
+        )
+        self.db.execute('CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)')
+        self.db.commit()
+
+    def get(self, key):
+        row = self.db.execute('SELECT report FROM results WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.db.execute('UPDATE results SET last_used = ? WHERE key = ?', (time.time(), key))
+        self.db.commit()
+        return json.loads(row[0])
+
+    def put(self, key, report):
+        self.db.execute(
+            'INSERT OR REPLACE INTO results (key, report, last_used) VALUES (?, ?, ?)',
+            (key, json.dumps(report, separators=(',', ':')), time.time())
+        )
+        excess = self.db.execute('SELECT COUNT(*) FROM results').fetchone()[0] - self.max_entries
+        if excess > 0:
+            self.db.execute(
+                'DELETE FROM results WHERE key IN '
+                '(SELECT key FROM results ORDER BY last_used LIMIT ?)', (excess,)
+            )
+        self.db.commit()
+
+    def __len__(self):
+        return self.db.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+
+    def close(self):
+        self.db.close()
+
+    def wrap(self, grade, suite_digest=None):
+        """Return a grade(submission_dir) that answers repeated submissions from the cache."""
+        suite_digest = hashlib.sha256(f"{suite_digest or suite_hash()}\0{grading_settings()}".encode('utf-8')).hexdigest()
+
+        def cached_grade(submission_dir):
+            start = time.perf_counter()
+            key = submission_key(submission_dir, suite_digest)
+            path = str(submission_root(submission_dir))
+            report = self.get(key)
+            if report is None:
+                report = grade(submission_dir)
+                self.put(key, relocate(report, path, SUBMISSION_TOKEN))
+                return report
+            report = relocate(report, SUBMISSION_TOKEN, path)
+            if 'timings' in report:
+                # The stored timings describe the run that filled the cache, not this lookup
+                report['timings'] = {'cached': True, 'lookup': {'wall_ms': round((time.perf_counter() - start) * 1000, 3)}}
+            return report
+
+        return cached_grade
+
+
+def open_result_cache():
+    """ResultCache configured from the environment, or None unless RESULT_CACHE enables it."""
+    if os.environ.get('RESULT_CACHE', 'off').lower() in ('off', '0', 'false', 'no'):
+        return None
+    try:
+        return ResultCache(
+            os.environ.get('RESULT_CACHE_PATH', DEFAULT_PATH),
+            int(os.environ.get('RESULT_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES))
+        )
+    except (OSError, sqlite3.Error, ValueError):
+        return None
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Columnar store of graded reports for cohort analytics.
+
+Per-student report files are large pretty-printed JSON, and questions about
+the whole cohort (pass rate per test, score histogram, most frequent failure
+messages) would mean re-reading every one of them. ResultsStore appends each
+graded report to a folder of fixed-width columns instead (array module, one
+file per column):
+
+    rows.student  rows.created  rows.percentage  rows.passed  rows.total
+                  one entry per graded report
+    cells.row     cells.key     cells.message
+                  one entry per test of a report; key packs the test and its
+                  outcome as test << 3 | outcome
+    tests.txt  students.txt  messages.txt
+                  interned strings, one JSON string per line; columns hold
+                  their positions (messages from 1, 0 meaning none)
+
+Appends write only the new entries to the ends of the files, under an
+exclusive lock. Columns are written cells first and rows last, and readers
+cut every column to the last complete row, so an interrupted append is
+simply not there. Queries run on whole columns with C-level counting
+(collections.Counter over the key column), over the latest report of each
+student unless asked for every report. Java checks (java_checks.py) count
+as tests named java::<check id>.
+
+With RESULTS_STORE=on batch_runner.py appends every report of the batch to
+RESULTS_STORE_PATH/<assignment_id> (default /app/cache/cohort/default).
+
+Usage:
+    python3 /app/results_store.py [assignment_id|store_dir] [--failures=N] [--histogram]
+"""
+
+import fcntl
+import json
+import os
+import sys
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from itertools import compress
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent
+
+if str(APP_DIR) not in sys.path:
+    sys.path.insert(0, str(APP_DIR))
+
+from regrade_store import test_name
+
+DEFAULT_PATH = '/app/cache/cohort'
+DEFAULT_NAME = 'default'
+OUTCOMES = ('passed', 'failed', 'skipped', 'error', 'blocked', 'xfailed', 'xpassed', 'other')
+OUTCOME_BITS = 3
+MESSAGE_LENGTH = 200
+
+ROW_COLUMNS = (('rows.student', 'I'), ('rows.created', 'd'), ('rows.percentage', 'f'),
+               ('rows.passed', 'H'), ('rows.total', 'H'))
+CELL_COLUMNS = (('cells.row', 'I'), ('cells.key', 'I'), ('cells.message', 'I'))
+TABLES = ('tests', 'students', 'messages')
+
+
+def outcome_code(outcome):
+    return OUTCOMES.index(outcome) if outcome in OUTCOMES else len(OUTCOMES) - 1
+
+
+def failure_message(entry):
+    """First line of the crash message of a failed or errored test entry, or None."""
+    for stage in ('call', 'setup', 'teardown'):
+        crash = (entry.get(stage) or {}).get('crash')
+        if crash and crash.get('message'):
+            line = crash['message'].strip().splitlines()[0] if crash['message'].strip() else ''
+            return line[:MESSAGE_LENGTH] or None
+    return None
+
+
+def report_cells(report):
+    """(test name, outcome, message) for every test and Java check of an enhanced report."""
+    cells = []
+    for entry in report.get('tests', []):
+        message = failure_message(entry) if entry['outcome'] in ('failed', 'error') else None
+        cells.append((test_name(entry['nodeid']), entry['outcome'], message))
+    for check in (report.get('java') or {}).get('tests', []):
+        cells.append((f"java::{check['id']}", check['outcome'], check.get('message')))
+    return cells
+
+
+def _read_column(path, typecode):
+    column = array(typecode)
+    try:
+        with open(path, 'rb') as f:
+            column.fromfile(f, os.fstat(f.fileno()).st_size // column.itemsize)
+    except FileNotFoundError:
+        pass
+    return column
+
+
+class _Table:
+    """Append-only interned strings; position in the file is the id."""
+
+    def __init__(self, path):
+        self.path = path
+        self.values = []
+        self.ids = {}
+        self.pending = []
+        # Bytes of complete lines; a line cut short by an interrupted append is dropped
+        self.size = 0
+        try:
+            with open(path, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break
+                    value = json.loads(line)
+                    self.ids.setdefault(value, len(self.values))
+                    self.values.append(value)
+                    self.size += len(line)
+        except FileNotFoundError:
+            pass
+
+    def intern(self, value):
+        if value not in self.ids:
+            self.ids[value] = len(self.values)
+            self.values.append(value)
+            self.pending.append(value)
+        return self.ids[value]
+
+    def flush(self):
+        if self.pending:
+            data = ''.join(json.dumps(value) + '\n' for value in self.pending).encode('utf-8')
+            with open(self.path, 'ab') as f:
+                f.truncate(self.size)
+                f.write(data)
+            self.size += len(data)
+            self.pending = []
+
+
+class ResultsStore:
+    """Columns of one assignment's graded reports in a folder, loaded into memory."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._lock = open(self.path / '.lock', 'a')
+        self.load()
+
+    def load(self):
+        """(Re)read every column, cut back to the last complete row."""
+        self.tables = {name: _Table(self.path / f"{name}.txt") for name in TABLES}
+        self.columns = {name: _read_column(self.path / name, typecode)
+                        for name, typecode in ROW_COLUMNS + CELL_COLUMNS}
+        rows = min(len(self.columns[name]) for name, _ in ROW_COLUMNS)
+        cells = min(len(self.columns[name]) for name, _ in CELL_COLUMNS)
+        # cells.row ascends, so the cells of complete rows are a prefix
+        cells = min(cells, bisect_left(self.columns['cells.row'], rows, 0, cells))
+        for name, _ in ROW_COLUMNS:
+            del self.columns[name][rows:]
+        for name, _ in CELL_COLUMNS:
+            del self.columns[name][cells:]
+
+    def _stale(self):
+        """True when the files have grown past what was loaded."""
+        column = self.columns['rows.student']
+        try:
+            if os.path.getsize(self.path / 'rows.student') > len(column) * column.itemsize:
+                return True
+            return any(os.path.getsize(table.path) > table.size for table in self.tables.values())
+        except FileNotFoundError:
+            return False
+
+    def __len__(self):
+        return len(self.columns['rows.student'])
+
+    def append(self, student_id, report, created=None):
+        """Add one enhanced report (from enhance_json.py) for student_id."""
+        self.extend([(student_id, report)], created)
+
+    def extend(self, reports, created=None):
+        """Add (student_id, report) pairs in one locked write."""
+        fcntl.flock(self._lock, fcntl.LOCK_EX)
+        try:
+            if self._stale():
+                # Another writer appended since this store was loaded
+                self.load()
+            tests, students, messages = (self.tables[name] for name in TABLES)
+            new = {name: array(typecode) for name, typecode in ROW_COLUMNS + CELL_COLUMNS}
+            row = len(self)
+            for student_id, report in reports:
+                stats = report.get('stats') or {}
+                new['rows.student'].append(students.intern(str(student_id)))
+                new['rows.created'].append(created if created is not None else time.time())
+                new['rows.percentage'].append(float(stats.get('percentage', 0.0)))
+                new['rows.passed'].append(min(int(stats.get('passed', 0)), 0xFFFF))
+                new['rows.total'].append(min(int(stats.get('total_tests', 0)), 0xFFFF))
+                for name, outcome, message in report_cells(report):
+                    new['cells.row'].append(row)
+                    new['cells.key'].append(tests.intern(name) << OUTCOME_BITS | outcome_code(outcome))
+                    new['cells.message'].append(messages.intern(message) + 1 if message else 0)
+                row += 1
+            for table in self.tables.values():
+                table.flush()
+            for name, _ in CELL_COLUMNS + ROW_COLUMNS:
+                column = self.columns[name]
+                with open(self.path / name, 'ab') as f:
+                    # Drops whatever an interrupted append left past the last complete row
+                    f.truncate(len(column) * column.itemsize)
+                    new[name].tofile(f)
+                column.extend(new[name])
+        finally:
+            fcntl.flock(self._lock, fcntl.LOCK_UN)
+
+    def _live_rows(self, latest):
+        """bytes with 1 for every row a query covers, or None when it covers them all."""
+        if not latest:
+            return None
+        last = {}
+        for row, student in enumerate(self.columns['rows.student']):
+            last[student] = row
+        if len(last) == len(self):
+            return None
+        live = bytearray(len(self))
+        for row in last.values():
+            live[row] = 1
+        return bytes(live)
+
+    def _cells(self, column, latest):
+        live = self._live_rows(latest)
+        values = self.columns[column]
+        if live is None:
+            return values
+        return compress(values, map(live.__getitem__, self.columns['cells.row']))
+
+    def _rows(self, column, latest):
+        live = self._live_rows(latest)
+        values = self.columns[column]
+        return values if live is None else compress(values, live)
+
+    def students(self, latest=True):
+        return len(set(self.columns['rows.student'])) if latest else len(self)
+
+    def pass_rates(self, latest=True):
+        """[(test, passed, total, rate)] for every test, in the order tests were first seen."""
+        counts = Counter(self._cells('cells.key', latest))
+        passed = [0] * len(self.tables['tests'].values)
+        total = [0] * len(passed)
+        pass_code = outcome_code('passed')
+        for key, count in counts.items():
+            test = key >> OUTCOME_BITS
+            total[test] += count
+            if key & ((1 << OUTCOME_BITS) - 1) == pass_code:
+                passed[test] += count
+        return [(name, passed[i], total[i], passed[i] / total[i] if total[i] else 0.0)
+                for i, name in enumerate(self.tables['tests'].values) if total[i]]
+
+    def histogram(self, bins=10, latest=True):
+        """Report counts per percentage bin: [(low, high, count)], 100% in the last bin."""
+        width = 100.0 / bins
+        counts = Counter(min(int(p // width), bins - 1) for p in self._rows('rows.percentage', latest))
+        return [(round(i * width, 2), round((i + 1) * width, 2), counts.get(i, 0)) for i in range(bins)]
+
+    def average(self, latest=True):
+        percentages = array('f', self._rows('rows.percentage', latest))
+        return sum(percentages) / len(percentages) if percentages else 0.0
+
+    def top_failures(self, n=10, latest=True):
+        """[(message, count)] of the most frequent failure messages."""
+        counts = Counter(self._cells('cells.message', latest))
+        counts.pop(0, None)
+        values = self.tables['messages'].values
+        return [(values[index - 1], count) for index, count in counts.most_common(n)]
+
+    def close(self):
+        self._lock.close()
+
+
+def store_path(assignment_id=None):
+    """Folder of an assignment's store under RESULTS_STORE_PATH."""
+    name = assignment_id or os.environ.get('ASSIGNMENT_ID') or DEFAULT_NAME
+    return Path(os.environ.get('RESULTS_STORE_PATH', DEFAULT_PATH)) / name
+
+
+def open_results_store(assignment_id=None):
+    """ResultsStore for assignment_id, or None unless RESULTS_STORE is on."""
+    if os.environ.get('RESULTS_STORE', 'off').lower() not in ('on', '1', 'true', 'yes'):
+        return None
+    try:
+        return ResultsStore(store_path(assignment_id))
+    except OSError:
+        return None
+
+
+def format_table(store, failures=0, histogram=False):
+    """The pass-rate table (and optional failure and histogram sections) as text."""
+    rates = store.pass_rates()
+    width = max([len('test')] + [len(name) for name, *_ in rates])
+    lines = [f"{'test':<{width}}  {'passed':>6}  {'total':>6}  {'rate':>6}"]
+    lines += [f"{name:<{width}}  {passed:>6}  {total:>6}  {rate * 100:>5.1f}%" for name, passed, total, rate in rates]
+    lines.append(f"{store.students()} students, {len(store)} reports, average {store.average():.2f}%")
+    if histogram:
+        lines.append('')
+        lines += [f"{low:>5.1f}-{high:<5.1f}  {count}" for low, high, count in store.histogram()]
+    if failures:
+        lines.append('')
+        lines += [f"{count:>6}  {message}" for message, count in store.top_failures(failures)]
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    flags = [arg for arg in sys.argv[1:] if arg.startswith('--')]
+    failures = next((int(flag.split('=', 1)[1]) for flag in flags if flag.startswith('--failures=')), 0)
+    target = args[0] if args else None
+    path = Path(target) if target and Path(target).is_dir() else store_path(target)
+    if not (path / 'rows.student').is_file():
+        print(f"No results stored in {path}", file=sys.stderr)
+        sys.exit(1)
+    start = time.perf_counter()
+    store = ResultsStore(path)
+    output = format_table(store, failures, '--histogram' in flags)
+    print(output)
+    print(f"({(time.perf_counter() - start) * 1000:.1f} ms)", file=sys.stderr)
@@ -0,0 +1,223 @@
+"""
+Declarative layout rules compiled to precompiled XPath.
+
+An assignment spec lists what a correct activity_main.xml must contain
+instead of spelling it out as Python assertions:
+
+    {
+        "assignment_id": "assignment2",
+        "rules": [
+            {"id": "root_is_linear_layout", "group": "TestLayout", "root": true, "element": "LinearLayout"},
+            {"id": "textview_text", "group": "TestTextView", "element": "TextView",
+             "attributes": {"text": "Hi Android"}},
+            {"id": "textview_textsize", "group": "TestTextView", "element": "TextView",
+             "attributes": {"textSize": {"min": 24}}, "message": "TextView textSize should be at least 24sp"}
+        ]
+    }
+
+A rule holds when at least min_count (default 1) elements match it, and at
+most max_count if one is given. An element matches when its tag is `element`
+(any tag if omitted; the root itself with "root": true, else anything below
+it) and it meets every attribute constraint:
+
+    "value"                          shorthand for {"equals": "value"}
+    {"equals": v}  {"one_of": [...]}  {"contains": v}   optional "ignore_case": true
+    {"min": n}  {"max": n}           digits of the value, so "32sp" counts as 32
+    {"exists": false}                attribute must be absent
+
+Attribute names are matched like LayoutIndex does: "text" finds android:text
+only (not tools:text, nor a bare text, which Android ignores), "tools:context"
+needs the tools namespace. check_namespaces() verifies that on a probe
+layout; the generator runs it with every spec it checks.
+
+compile_spec() turns every rule into an etree.XPath once, at import of the
+generated suite, plus one combined XPath that evaluates the whole rule set
+in a single call per submission (RuleSet.evaluate()). generic_assignment_generator.py
+writes suites from specs and can derive a starting spec from the starter and
+solution layouts.
+"""
+
+import re
+from collections import OrderedDict
+
+from lxml import etree
+
+from layout_index import ANDROID_NS, NS_PREFIXES
+
+PREFIX_NAMESPACES = {prefix: uri for uri, prefix in NS_PREFIXES.items()}
+CONSTRAINTS = ('equals', 'one_of', 'contains', 'ignore_case', 'min', 'max', 'exists')
+RULE_KEYS = ('id', 'group', 'element', 'root', 'attributes', 'min_count', 'max_count', 'message', 'markers')
+DEFAULT_GROUP = 'TestLayout'
+
+_UPPER = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+_LOWER = 'abcdefghijklmnopqrstuvwxyz'
+_IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+class SpecError(ValueError):
+    """The spec is malformed; the message names the rule and field."""
+
+
+def literal(value):
+    """An XPath 1.0 string literal for value (XPath has no escapes, so mixed quotes use concat)."""
+    value = str(value)
+    if "'" not in value:
+        return f"'{value}'"
+    if '"' not in value:
+        return f'"{value}"'
+    parts = value.split("'")
+    return 'concat(' + ", \"'\", ".join(f"'{part}'" for part in parts) + ')'
+
+
+def attribute_path(name):
+    """XPath selecting attribute name in the namespace its prefix names, Android without one."""
+    prefix, _, local = name.rpartition(':')
+    if prefix and prefix != 'android':
+        if prefix not in PREFIX_NAMESPACES:
+            raise SpecError(f"Unknown attribute prefix {prefix!r} in {name!r}")
+        return f"@*[local-name()={literal(local)} and namespace-uri()={literal(PREFIX_NAMESPACES[prefix])}]"
+    return f"@*[local-name()={literal(local)} and namespace-uri()={literal(ANDROID_NS)}]"
+
+
+def constraint_expression(name, constraint):
+    """XPath predicate for one attribute constraint."""
+    if not isinstance(constraint, dict):
+        constraint = {'equals': constraint}
+    unknown = set(constraint) - set(CONSTRAINTS)
+    if unknown:
+        raise SpecError(f"Unknown constraint {', '.join(sorted(unknown))} for attribute {name!r}")
+    attr = attribute_path(name)
+    value = attr
+    fold = (lambda v: str(v).lower()) if constraint.get('ignore_case') else str
+    if constraint.get('ignore_case'):
+        value = f"translate({attr}, '{_UPPER}', '{_LOWER}')"
+    terms = []
+    if 'exists' in constraint:
+        terms.append(attr if constraint['exists'] else f"not({attr})")
+    if 'equals' in constraint:
+        terms.append(f"{value}={literal(fold(constraint['equals']))}")
+    if 'one_of' in constraint:
+        options = constraint['one_of']
+        if not isinstance(options, list) or not options:
+            raise SpecError(f"one_of for attribute {name!r} must be a non-empty list")
+        terms.append('(' + ' or '.join(f"{value}={literal(fold(option))}" for option in options) + ')')
+    if 'contains' in constraint:
+        terms.append(f"contains({value}, {literal(fold(constraint['contains']))})")
+    number = f"number(translate({attr}, translate({attr}, '0123456789', ''), ''))"
+    for key, op in (('min', '>='), ('max', '<=')):
+        if key in constraint:
+            try:
+                limit = float(constraint[key])
+            except (TypeError, ValueError):
+                raise SpecError(f"{key} for attribute {name!r} must be a number") from None
+            # XPath 1.0 numbers have no exponent notation
+            terms.append(f"{number} {op} {f'{limit:f}'.rstrip('0').rstrip('.')}")
+    if not terms:
+        raise SpecError(f"No constraint given for attribute {name!r}")
+    return ' and '.join(terms)
+
+
+def rule_expression(rule):
+    """XPath boolean expression for one rule."""
+    element = rule.get('element')
+    step = f"*[local-name()={literal(element)}]" if element else '*'
+    nodes = f"/{step}" if rule.get('root') else f"/*//{step}"
+    predicates = [constraint_expression(name, constraint)
+                  for name, constraint in (rule.get('attributes') or {}).items()]
+    if predicates:
+        nodes += ''.join(f"[{predicate}]" for predicate in predicates)
+    terms = [f"count({nodes}) >= {int(rule.get('min_count', 1))}"]
+    if rule.get('max_count') is not None:
+        terms.append(f"count({nodes}) <= {int(rule['max_count'])}")
+    return ' and '.join(terms)
+
+
+def default_message(rule):
+    where = 'Root element' if rule.get('root') else (rule.get('element') or 'Element')
+    parts = []
+    for name, constraint in (rule.get('attributes') or {}).items():
+        if not isinstance(constraint, dict):
+            constraint = {'equals': constraint}
+        described = ', '.join(f"{key} {constraint[key]!r}" for key in CONSTRAINTS
+                              if key in constraint and key != 'ignore_case')
+        parts.append(f"{name} {described}")
+    if parts:
+        return f"{where} should have {'; '.join(parts)}"
+    if rule.get('root') and rule.get('element'):
+        return f"Root element should be {rule['element']}"
+    return f"Layout should contain {where}"
+
+
+def validate_spec(spec):
+    """Check a spec dict and return its rules; raises SpecError."""
+    if not isinstance(spec, dict) or not isinstance(spec.get('rules'), list) or not spec['rules']:
+        raise SpecError("Spec needs a non-empty 'rules' list")
+    seen = set()
+    for index, rule in enumerate(spec['rules']):
+        if not isinstance(rule, dict):
+            raise SpecError(f"Rule {index} must be an object")
+        rule_id = rule.get('id')
+        if not isinstance(rule_id, str) or not _IDENTIFIER.match(rule_id):
+            raise SpecError(f"Rule {index} needs an 'id' usable as a Python name, got {rule_id!r}")
+        if rule_id in seen:
+            raise SpecError(f"Duplicate rule id {rule_id!r}")
+        seen.add(rule_id)
+        unknown = set(rule) - set(RULE_KEYS)
+        if unknown:
+            raise SpecError(f"Rule {rule_id!r} has unknown fields {', '.join(sorted(unknown))}")
+        if not _IDENTIFIER.match(rule.get('group', DEFAULT_GROUP)):
+            raise SpecError(f"Rule {rule_id!r} group must be a class name")
+        try:
+            rule_expression(rule)
+        except SpecError as e:
+            raise SpecError(f"Rule {rule_id!r}: {e}") from None
+    return spec['rules']
+
+
+class RuleSet:
+    """Compiled rules: one XPath per rule plus one that evaluates them all at once."""
+
+    def __init__(self, rules):
+        self.rules = OrderedDict((rule['id'], rule) for rule in rules)
+        self.expressions = OrderedDict((rule['id'], rule_expression(rule)) for rule in rules)
+        self.xpaths = OrderedDict((rule_id, etree.XPath(expression))
+                                  for rule_id, expression in self.expressions.items())
+        # concat() needs two arguments, hence the trailing ''
+        self.combined = etree.XPath('concat(' + ', '.join(
+            [f"number({expression})" for expression in self.expressions.values()] + ["''"]) + ')')
+
+    def evaluate(self, tree):
+        """{rule id: passed} for every rule, from a single XPath evaluation."""
+        flags = self.combined(tree)
+        return OrderedDict((rule_id, flag == '1') for rule_id, flag in zip(self.rules, flags))
+
+    def check(self, tree, rule_id):
+        return bool(self.xpaths[rule_id](tree))
+
+    def message(self, rule_id):
+        rule = self.rules[rule_id]
+        return rule.get('message') or default_message(rule)
+
+
+_PROBE = (f'<LinearLayout xmlns:android="{ANDROID_NS}" xmlns:tools="{PREFIX_NAMESPACES["tools"]}">'
+          '<TextView tools:text="Hi" text="Hi" android:text="TODO"/>'
+          '<TextView android:text="Hi" tools:textSize="99sp"/></LinearLayout>')
+
+
+def check_namespaces():
+    """Raise SpecError unless unprefixed names match android: attributes only, never tools: or bare ones."""
+    tree = etree.ElementTree(etree.fromstring(_PROBE))
+    rules = RuleSet([
+        {'id': 'one_text', 'element': 'TextView', 'attributes': {'text': 'Hi'}, 'max_count': 1},
+        {'id': 'no_text_size', 'element': 'TextView', 'attributes': {'textSize': {'exists': True}},
+         'min_count': 0, 'max_count': 0},
+        {'id': 'tools_text', 'element': 'TextView', 'attributes': {'tools:text': 'Hi'}},
+    ])
+    failed = [rule_id for rule_id, passed in rules.evaluate(tree).items() if not passed]
+    if failed:
+        raise SpecError(f"Attribute namespaces are not told apart: {', '.join(failed)}")
+
+
+def compile_spec(spec):
+    """Validate spec and compile it into a RuleSet."""
+    return RuleSet(validate_spec(spec))
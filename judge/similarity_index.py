@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate detection across a cohort with MinHash and LSH.
+
+Comparing every pair of submissions is quadratic. Instead each layout is
+reduced to a structural fingerprint and a MinHash signature, and signatures
+are bucketed by band (locality-sensitive hashing) so that only submissions
+sharing a bucket are ever compared:
+
+- the fingerprint is the set of shingles of the element tree, taken from the
+  LayoutIndex the judge already builds: every element as a token (its tag
+  plus its normalized attributes, sorted, values with whitespace collapsed),
+  and every parent>child and grandparent>parent>child chain of tokens.
+  Formatting, comments and attribute order therefore do not matter.
+- the signature is the minimum of NUM_PERM universal hashes over the shingle
+  hashes; the fraction of equal positions estimates the Jaccard similarity.
+- the signature is cut into BANDS bands of ROWS rows; two submissions become
+  candidates when any band matches, which for 16 x 8 makes pairs above ~0.7
+  likely and pairs below ~0.5 rare.
+
+With SIMILARITY on, the engines call capture() at the end of every grading
+run, while the submission is still in the submission cache, and
+submission_signature() hands that signature out instead of parsing the
+layout again; only submissions answered from a cache are parsed here.
+
+SimilarityIndex is incremental: add() buckets one more submission without
+touching the rest, and an index kept in a SQLite file (SIMILARITY_INDEX_PATH)
+grows across batches. Ids are stored as '<assignment_id>/<id>' (ASSIGNMENT_ID),
+so assignments sharing one file are never matched against each other. With SIMILARITY=on batch_runner.py adds every graded
+submission and reports its closest matches next to its stats in
+summary.json, plus the near-duplicate clusters of the cohort.
+
+Usage:
+    python3 /app/similarity_index.py <batch_dir> [threshold]
+"""
+
+import hashlib
+import os
+import random
+import sqlite3
+import sys
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent
+
+if str(APP_DIR) not in sys.path:
+    sys.path.insert(0, str(APP_DIR))
+
+from submission_cache import load_submission
+
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+DEFAULT_THRESHOLD = 0.8
+DEFAULT_PATH = ':memory:'
+MAX_MATCHES = 5
+MAX_CAPTURED = 32
+# SQLite's default limit on the parameters of one statement
+MAX_PARAMS = 999
+
+_PRIME = (1 << 61) - 1
+# Fixed seed: signatures must stay comparable across processes and batches
+_rng = random.Random(0x5eed)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+# str(submission_dir) -> signature from the grading run's own parse, until submission_signature() takes it
+_captured = OrderedDict()
+
+
+def similarity_enabled():
+    return os.environ.get('SIMILARITY', 'off').lower() in ('on', '1', 'true', 'yes')
+
+
+def _hash(text):
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def view_token(view):
+    """Tag and normalized attributes of one view, independent of order and whitespace."""
+    attrs = ','.join(f"{name}={' '.join(value.split())}" for name, value in sorted(view.attrs.items()))
+    return f"{view.tag}({attrs})"
+
+
+def fingerprint(index):
+    """Set of shingle hashes of a LayoutIndex; empty for a layout that did not parse."""
+    tokens = {}
+    shingles = set()
+    for view in index.views:
+        token = view_token(view)
+        tokens[view.element] = token
+        chain = [token]
+        parent = view.element.getparent()
+        while parent is not None and len(chain) < 3 and parent in tokens:
+            chain.append(tokens[parent])
+            parent = parent.getparent()
+        for size in range(1, len(chain) + 1):
+            shingles.add(_hash('>'.join(reversed(chain[:size]))))
+    return shingles
+
+
+def signature(shingles):
+    """MinHash signature of a shingle set, or None for an empty one."""
+    if not shingles:
+        return None
+    return tuple(min((a * shingle + b) % _PRIME for shingle in shingles) for a, b in _PERMUTATIONS)
+
+
+def capture(submission_dir):
+    """Keep the signature of the layout a grading run has just parsed, before the engine clears the cache."""
+    if submission_dir is None or not similarity_enabled():
+        return
+    document = load_submission(submission_dir)
+    _captured[str(submission_dir)] = signature(fingerprint(document.index)) if document.parsed else None
+    while len(_captured) > MAX_CAPTURED:
+        _captured.popitem(last=False)
+
+
+def submission_signature(submission_dir):
+    """Signature of the activity_main.xml in submission_dir (folder or zip), or None if it has none."""
+    if str(submission_dir) in _captured:
+        return _captured.pop(str(submission_dir))
+    document = load_submission(submission_dir)
+    if not document.parsed:
+        return None
+    return signature(fingerprint(document.index))
+
+
+def similarity(first, second):
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(1 for a, b in zip(first, second) if a == b) / NUM_PERM
+
+
+def band_keys(sig):
+    """One bucket key per band of the signature."""
+    for band in range(BANDS):
+        rows = array('Q', sig[band * ROWS:(band + 1) * ROWS]).tobytes()
+        yield band, hashlib.blake2b(rows, digest_size=8).digest()
+
+
+class SimilarityIndex:
+    """MinHash signatures bucketed by LSH band, in SQLite (in memory unless given a path).
+
+    Ids are scoped to assignment_id; without one they are stored as given.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, threshold=DEFAULT_THRESHOLD, assignment_id=None):
+        self.path = str(path)
+        self.threshold = threshold
+        self.prefix = f"{assignment_id}/" if assignment_id else ''
+        if self.path != ':memory:':
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(self.path, timeout=30)
+        self.db.execute('CREATE TABLE IF NOT EXISTS signatures (id TEXT PRIMARY KEY, signature BLOB NOT NULL)')
+        self.db.execute('CREATE TABLE IF NOT EXISTS buckets (band INTEGER, key BLOB, id TEXT)')
+        self.db.execute('CREATE INDEX IF NOT EXISTS buckets_key ON buckets (band, key)')
+        self.db.execute('CREATE INDEX IF NOT EXISTS buckets_id ON buckets (id)')
+        self.db.commit()
+
+    def _key(self, submission_id):
+        return self.prefix + submission_id
+
+    def _owns(self, key):
+        """True for stored ids of this index's assignment."""
+        return key.startswith(self.prefix) and '/' not in key[len(self.prefix):]
+
+    def _signatures(self, keys, known=None):
+        """{key: signature} for stored keys, read with one IN query per MAX_PARAMS keys; known is filled and reused."""
+        known = {} if known is None else known
+        missing = [key for key in keys if key not in known]
+        for start in range(0, len(missing), MAX_PARAMS):
+            chunk = missing[start:start + MAX_PARAMS]
+            rows = self.db.execute(
+                f"SELECT id, signature FROM signatures WHERE id IN ({', '.join('?' * len(chunk))})", chunk)
+            known.update((key, tuple(array('Q', blob))) for key, blob in rows)
+        return {key: known[key] for key in keys if key in known}
+
+    def add(self, submission_id, sig):
+        """Index one signature under submission_id, replacing an earlier one with the same id."""
+        self.remove(submission_id, commit=False)
+        key = self._key(submission_id)
+        self.db.execute('INSERT INTO signatures (id, signature) VALUES (?, ?)', (key, array('Q', sig).tobytes()))
+        self.db.executemany('INSERT INTO buckets (band, key, id) VALUES (?, ?, ?)',
+                            [(band, bucket, key) for band, bucket in band_keys(sig)])
+        self.db.commit()
+
+    def remove(self, submission_id, commit=True):
+        key = self._key(submission_id)
+        self.db.execute('DELETE FROM signatures WHERE id = ?', (key,))
+        self.db.execute('DELETE FROM buckets WHERE id = ?', (key,))
+        if commit:
+            self.db.commit()
+
+    def signature(self, submission_id):
+        return self._signatures([self._key(submission_id)]).get(self._key(submission_id))
+
+    def _query(self, sig, threshold, exclude=None, known=None):
+        candidates = set()
+        for band, bucket in band_keys(sig):
+            candidates.update(row[0] for row in self.db.execute(
+                'SELECT id FROM buckets WHERE band = ? AND key = ?', (band, bucket)))
+        candidates = sorted(key for key in candidates if key != exclude and self._owns(key))
+        matches = []
+        for key, other in self._signatures(candidates, known).items():
+            score = similarity(sig, other)
+            if score >= threshold:
+                matches.append((key[len(self.prefix):], round(score, 4)))
+        return sorted(matches, key=lambda match: (-match[1], match[0]))
+
+    def query(self, sig, threshold=None, exclude=None):
+        """[(id, score)] of indexed submissions at least threshold similar to sig, best first."""
+        threshold = self.threshold if threshold is None else threshold
+        return self._query(sig, threshold, None if exclude is None else self._key(exclude))
+
+    def matches(self, submission_id, threshold=None, known=None):
+        """Near duplicates of an indexed submission, best first; known caches signatures across calls."""
+        threshold = self.threshold if threshold is None else threshold
+        key = self._key(submission_id)
+        sig = self._signatures([key], known).get(key)
+        return [] if sig is None else self._query(sig, threshold, key, known)
+
+    def clusters(self, threshold=None, ids=None):
+        """Groups of near-duplicate submissions (two or more each), largest first.
+
+        Pairs above threshold are joined transitively. With ids only the
+        clusters of those submissions are returned (a new batch against a
+        persistent index); they still include earlier matches. Every
+        signature is read once for the whole call.
+        """
+        if ids is None:
+            ids = [row[0][len(self.prefix):] for row in self.db.execute('SELECT id FROM signatures ORDER BY id')
+                   if self._owns(row[0])]
+        known = {}
+        self._signatures([self._key(submission_id) for submission_id in ids], known)
+        parent = {}
+
+        def find(item):
+            parent.setdefault(item, item)
+            while parent[item] != item:
+                parent[item] = parent[parent[item]]
+                item = parent[item]
+            return item
+
+        for submission_id in ids:
+            find(submission_id)
+            for other, _ in self.matches(submission_id, threshold, known):
+                parent[find(other)] = find(submission_id)
+        groups = {}
+        for submission_id in parent:
+            groups.setdefault(find(submission_id), []).append(submission_id)
+        return sorted((sorted(group) for group in groups.values() if len(group) > 1),
+                      key=lambda group: (-len(group), group))
+
+    def __len__(self):
+        return sum(1 for (key,) in self.db.execute('SELECT id FROM signatures') if self._owns(key))
+
+    def close(self):
+        self.db.close()
+
+
+def similarity_entry(index, submission_id, threshold=None):
+    """The 'similarity' section reported next to a submission's stats."""
+    matches = index.matches(submission_id, threshold)
+    return {
+        'max_score': matches[0][1] if matches else 0.0,
+        'matches': [{'student': other, 'score': score} for other, score in matches[:MAX_MATCHES]],
+    }
+
+
+def open_similarity_index(assignment_id=None):
+    """SimilarityIndex configured from the environment, or None unless SIMILARITY is on."""
+    if not similarity_enabled():
+        return None
+    try:
+        return SimilarityIndex(
+            os.environ.get('SIMILARITY_INDEX_PATH', DEFAULT_PATH),
+            float(os.environ.get('SIMILARITY_THRESHOLD', DEFAULT_THRESHOLD)),
+            assignment_id or os.environ.get('ASSIGNMENT_ID')
+        )
+    except (OSError, sqlite3.Error, ValueError):
+        return None
+
+
+if __name__ == '__main__':
+    import json
+
+    from batch_runner import discover_submissions, find_submission_dir
+
+    if len(sys.argv) < 2:
+        print('Usage: similarity_index.py <batch_dir> [threshold]', file=sys.stderr)
+        sys.exit(1)
+    threshold = float(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_THRESHOLD
+    index = SimilarityIndex(os.environ.get('SIMILARITY_INDEX_PATH', DEFAULT_PATH), threshold,
+                            os.environ.get('ASSIGNMENT_ID'))
+    students = []
+    for student_id, path in discover_submissions(sys.argv[1]):
+        sig = submission_signature(find_submission_dir(path) if path.is_dir() else str(path))
+        if sig is not None:
+            index.add(student_id, sig)
+            students.append(student_id)
+    print(json.dumps({
+        'threshold': threshold,
+        'indexed': len(index),
+        'clusters': index.clusters(ids=students),
+        'students': {student_id: similarity_entry(index, student_id) for student_id in students},
+    }, indent=2))
@@ -0,0 +1,226 @@
+"""
+Structural feedback: how a submission's layout differs from the solution's.
+
+Test failures only say which assertion broke. Each assignment also ships
+solution.zip next to its suite; feedback() compares the submission's
+activity_main.xml with the reference layout in it and reports
+
+    "feedback": {
+        "solution": "activity_main.xml",
+        "matches_solution": false,
+        "missing_views": [{"view": "TextView#greeting", "parent": "LinearLayout"}],
+        "extra_views": [{"view": "Button[1]", "parent": "LinearLayout"}],
+        "attributes": [{"view": "LinearLayout", "attribute": "orientation",
+                        "expected": "vertical", "actual": null}],
+        "nesting": [{"view": "TextView#greeting", "expected_depth": 1, "actual_depth": 2}]
+    }
+
+Views are paired by android:id first, then by tag in document order; a view
+is named Tag#id, or Tag[n] for the n-th view of that tag without an id.
+Attribute values are compared after normalization (the namespaced and the
+android: prefixed text are the same attribute, a bare text is not an Android
+attribute and counts as unset, see layout_index.py), tools: attributes are
+ignored and
+attributes the solution does not set are the student's choice. Root tag
+differences are reported as "root".
+
+The reference is parsed and indexed once per process, keyed by the path,
+size and mtime of solution.zip, and survives submission_cache.clear_cache(),
+so a batch or daemon session pays for one pass over the two indexes per
+submission. Loading it does not touch the submission cache, its timings or
+last_loaded().
+
+As a pytest plugin (`pytest -p solution_diff`, which runner.sh and the warm
+session pass) it adds the section to the json report while the submission
+is still cached; fast_eval.py calls feedback() itself. A suite folder
+without solution.zip, a submission that did not parse, or
+SOLUTION_FEEDBACK=off leave the report without it.
+"""
+
+import os
+from pathlib import Path
+from zipfile import BadZipFile
+
+import pytest
+from lxml import etree
+
+from layout_index import LayoutIndex
+from submission_archive import is_archive, open_archive
+from submission_cache import load_submission
+from xml_intake import IntakeLimitError, parse_layout, parse_stream
+
+XML_NAME = 'activity_main.xml'
+SOLUTION_NAME = 'solution.zip'
+IGNORED_PREFIXES = ('tools:',)
+MAX_ITEMS = 50
+
+# (path, size, mtime_ns) -> LayoutIndex of the reference, or None if it could not be read
+_references = {}
+
+
+def feedback_enabled():
+    return os.environ.get('SOLUTION_FEEDBACK', 'on').lower() not in ('off', '0', 'false', 'no')
+
+
+def solution_path(test_file):
+    """solution.zip of the suite test_file belongs to."""
+    return Path(test_file).resolve().parent / SOLUTION_NAME
+
+
+def _parse_reference(path):
+    if is_archive(path):
+        with open_archive(path) as archive:
+            info = archive.find(XML_NAME)
+            if info is None:
+                return None
+            with archive.open(info) as f:
+                tree, _ = parse_stream(f, info.file_size)
+    else:
+        candidates = sorted(Path(path).rglob(XML_NAME), key=lambda p: (len(p.parts), str(p)))
+        if not candidates:
+            return None
+        tree, _ = parse_layout(candidates[0])
+    return LayoutIndex(tree.getroot())
+
+
+def reference_index(path):
+    """LayoutIndex of the solution layout at path (zip or folder), parsed once per process."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    key = (str(path), st.st_size, st.st_mtime_ns)
+    if key not in _references:
+        try:
+            _references[key] = _parse_reference(path)
+        except (IntakeLimitError, etree.XMLSyntaxError, BadZipFile, OSError):
+            _references[key] = None
+    return _references[key]
+
+
+def _view_id(view):
+    value = view.get('id')
+    return value.split('/', 1)[-1] if value else None
+
+
+def _labels(index):
+    """{view: label} naming every view as Tag#id or Tag[n]."""
+    labels = {}
+    counts = {}
+    for view in index.views:
+        view_id = _view_id(view)
+        if view is index.root:
+            labels[view] = view.tag
+        elif view_id:
+            labels[view] = f"{view.tag}#{view_id}"
+        else:
+            counts[view.tag] = counts.get(view.tag, 0) + 1
+            labels[view] = f"{view.tag}[{counts[view.tag]}]"
+    return labels
+
+
+def _parent_tag(view):
+    parent = view.element.getparent()
+    return None if parent is None else etree.QName(parent).localname
+
+
+def pair_views(reference, submission):
+    """[(reference view, submission view)] by id, then by tag in order; roots always pair."""
+    pairs = [(reference.root, submission.root)]
+    candidates = [view for view in submission.views if view is not submission.root]
+    by_id = {}
+    for view in candidates:
+        by_id.setdefault(_view_id(view), view)
+    by_id.pop(None, None)
+    used = set()
+    unmatched = []
+    for view in reference.views:
+        if view is reference.root:
+            continue
+        match = by_id.get(_view_id(view))
+        if match is not None and id(match) not in used:
+            used.add(id(match))
+            pairs.append((view, match))
+        else:
+            unmatched.append(view)
+    remaining = {}
+    for view in candidates:
+        if id(view) not in used:
+            remaining.setdefault(view.tag, []).append(view)
+    for view in unmatched:
+        queue = remaining.get(view.tag)
+        pairs.append((view, queue.pop(0) if queue else None))
+    return pairs
+
+
+def diff_layouts(reference, submission):
+    """The feedback section for two LayoutIndexes (reference first)."""
+    ref_labels = _labels(reference)
+    sub_labels = _labels(submission)
+    result = {'matches_solution': True}
+    if reference.root.tag != submission.root.tag:
+        result['root'] = {'expected': reference.root.tag, 'actual': submission.root.tag}
+    missing, attributes, nesting = [], [], []
+    paired = set()
+    for ref_view, sub_view in pair_views(reference, submission):
+        if sub_view is None:
+            missing.append({'view': ref_labels[ref_view], 'parent': _parent_tag(ref_view)})
+            continue
+        paired.add(id(sub_view))
+        for name, expected in ref_view.attrs.items():
+            if name == 'id' or name.startswith(IGNORED_PREFIXES):
+                continue
+            actual = sub_view.get(name)
+            if actual is None or ' '.join(actual.split()) != ' '.join(expected.split()):
+                attributes.append({'view': ref_labels[ref_view], 'attribute': name,
+                                   'expected': expected, 'actual': actual})
+        if ref_view.depth != sub_view.depth:
+            nesting.append({'view': ref_labels[ref_view], 'expected_depth': ref_view.depth,
+                            'actual_depth': sub_view.depth})
+    extra = [{'view': sub_labels[view], 'parent': _parent_tag(view)}
+             for view in submission.views if id(view) not in paired]
+    for key, items in (('missing_views', missing), ('extra_views', extra),
+                       ('attributes', attributes), ('nesting', nesting)):
+        result[key] = items[:MAX_ITEMS]
+        if len(items) > MAX_ITEMS:
+            result[f"{key}_total"] = len(items)
+    result['matches_solution'] = 'root' not in result and not (missing or extra or attributes or nesting)
+    return result
+
+
+def feedback(submission_dir, test_file):
+    """Feedback section for submission_dir against the solution of test_file's suite, or None."""
+    if submission_dir is None or not feedback_enabled():
+        return None
+    reference = reference_index(solution_path(test_file))
+    if reference is None:
+        return None
+    document = load_submission(submission_dir)
+    if not document.parsed:
+        return None
+    return dict({'solution': XML_NAME}, **diff_layouts(reference, document.index))
+
+
+class SolutionDiffPlugin:
+    """Computes the feedback at the end of each run, before the submission cache is cleared."""
+
+    def __init__(self):
+        self.feedback = None
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_protocol(self, item, nextitem):
+        yield
+        module = getattr(item, 'module', None)
+        if nextitem is None and getattr(module, '__file__', None):
+            self.feedback = feedback(getattr(module, 'SUBMISSION_DIR', None), module.__file__)
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_json_modifyreport(self, json_report):
+        if self.feedback is not None:
+            json_report['feedback'] = self.feedback
+        self.feedback = None
+
+
+def pytest_configure(config):
+    if not config.pluginmanager.has_plugin('judge_solution_diff_plugin'):
+        config.pluginmanager.register(SolutionDiffPlugin(), 'judge_solution_diff_plugin')
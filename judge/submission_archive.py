@@ -0,0 +1,152 @@
+"""
+Submissions read straight from their zip archive, without unpacking.
+
+Students hand in zips of the starter project. Instead of extracting one into
+/app/submission or a temporary folder on the 50m /tmp, the judge opens the
+archive and parses activity_main.xml and MainActivity.java from its members:
+
+- an archive on disk is memory-mapped, so a batch of large zips is paged in
+  by the kernel instead of being copied into the process or onto /tmp;
+- an archive that arrives as bytes (a daemon job, see judge_daemon.py) is
+  registered with memory_archive(), which returns a memory:// name that
+  stands in for a submission path wherever one is accepted.
+
+A member is found by file name anywhere in the archive; with several
+candidates the one closest to the archive root wins, then the first by name.
+Members are reported as <archive>!/<member>. check_archive() from
+xml_intake.py bounds the unpacked size before any member is read.
+"""
+
+import contextlib
+import hashlib
+import io
+import mmap
+import os
+import posixpath
+from zipfile import ZipFile, ZIP_STORED
+
+from xml_intake import IntakeLimitError, check_archive
+
+MEMORY_PREFIX = 'memory://'
+MEMBER_SEPARATOR = '!/'
+
+# memory:// name -> archive bytes, for as long as memory_archive() holds them
+_memory = {}
+
+
+def is_archive(source):
+    """True when source names a zip file or a registered in-memory archive."""
+    source = str(source)
+    if source in _memory:
+        return True
+    return source.lower().endswith('.zip') and os.path.isfile(source)
+
+
+class _MappedFile:
+    """Read-only file interface over an mmap, as ZipFile expects from a real file."""
+
+    def __init__(self, mapped):
+        self.mapped = mapped
+        self.read = mapped.read
+        self.tell = mapped.tell
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        # mmap raises ValueError before the start, where ZipFile expects OSError
+        try:
+            self.mapped.seek(offset, whence)
+        except ValueError as e:
+            raise OSError(str(e)) from None
+        return self.mapped.tell()
+
+    def seekable(self):
+        # Missing on mmap before Python 3.13
+        return True
+
+
+class SubmissionArchive:
+    """An open submission zip, memory-mapped when it lives on disk."""
+
+    def __init__(self, source, limits=None):
+        self.name = str(source)
+        self.zf = None
+        self._map = None
+        if self.name in _memory:
+            fileobj = io.BytesIO(_memory[self.name])
+        else:
+            with open(self.name, 'rb') as f:
+                # mmap refuses empty files; ZipFile reports those as not a zip
+                if os.fstat(f.fileno()).st_size:
+                    self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    fileobj = _MappedFile(self._map)
+                else:
+                    fileobj = io.BytesIO(b'')
+        try:
+            self.zf = ZipFile(fileobj)
+            check_archive(self.zf, limits)
+        except BaseException:
+            self.close()
+            raise
+
+    def find(self, name):
+        """ZipInfo of the member called name closest to the archive root, or None."""
+        matches = [
+            info for info in self.zf.infolist()
+            if not info.is_dir() and posixpath.basename(info.filename) == name
+            and not info.filename.startswith('__MACOSX/')
+        ]
+        return min(matches, key=lambda info: (info.filename.count('/'), info.filename), default=None)
+
+    def member_path(self, info):
+        return self.name + MEMBER_SEPARATOR + info.filename
+
+    def open(self, info):
+        return self.zf.open(info)
+
+    def read(self, info, max_bytes):
+        """Bytes of a member, refusing members that unpack to more than max_bytes."""
+        if info.file_size > max_bytes:
+            raise IntakeLimitError('bytes', info.file_size, max_bytes)
+        with self.zf.open(info) as f:
+            # file_size comes from the archive itself, so bound the actual read too
+            data = f.read(max_bytes + 1)
+        if len(data) > max_bytes:
+            raise IntakeLimitError('bytes', len(data), max_bytes, 'while reading')
+        return data
+
+    def close(self):
+        if self.zf is not None:
+            self.zf.close()
+            self.zf = None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_archive(source, limits=None):
+    return SubmissionArchive(source, limits)
+
+
+@contextlib.contextmanager
+def memory_archive(data, name='submission.zip'):
+    """Register zip bytes for the duration of the block and yield the name to grade them by."""
+    source = f"{MEMORY_PREFIX}{hashlib.sha256(data).hexdigest()[:16]}/{name}"
+    _memory[source] = data
+    try:
+        yield source
+    finally:
+        _memory.pop(source, None)
+
+
+def pack(files):
+    """Zip bytes holding {member name: text or bytes}, stored without compression."""
+    buffer = io.BytesIO()
+    with ZipFile(buffer, 'w', ZIP_STORED) as zf:
+        for name, content in files.items():
+            zf.writestr(name, content)
+    return buffer.getvalue()
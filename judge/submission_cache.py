@@ -0,0 +1,316 @@
+"""
+Parse-once cache for submission layout files.
+
+Every test in test_assignment.py reads the same activity_main.xml. Instead of
+each fixture re-checking the path and re-parsing the file, load_submission()
+reads and parses it once, within the limits of xml_intake.py, and hands back a SubmissionDocument holding the tree,
+its root, its LayoutIndex, the parse error (if any) and the file metadata.
+Entries are keyed on path, size and mtime, so a changed file is always re-read.
+
+submission_dir may also be a zip archive (see submission_archive.py): the
+layout is then parsed straight from the archive member, keyed on the member's
+size and CRC. load_source() reads other submission files, such as
+MainActivity.java, the same way, and indexes Java sources with java_index.py.
+A layout folder found below the folder the student handed in (see
+batch_runner.find_submission_dir()) has its sources searched from that
+folder, as an Android project keeps res/layout/ next to java/.
+
+Wall and CPU time of locating, parsing and indexing each file are kept for
+the 'timings' report section (see judge_timings.py).
+"""
+
+import os
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from zipfile import BadZipFile
+
+from lxml import etree
+
+from layout_index import LayoutIndex
+from submission_archive import is_archive, open_archive
+from xml_intake import IntakeLimitError, IntakeLimits, parse_layout, parse_stream
+
+XML_NAME = 'activity_main.xml'
+JAVA_NAME = 'MainActivity.java'
+MEMBER_CACHE_SIZE = 32
+
+# path -> {'discovery': ..., 'parse': ..., 'index': ..., 'bytes': ...} of the current run
+_timings = {}
+_last_path = None
+# (member path, size, crc) -> SubmissionDocument parsed from an archive
+_members = OrderedDict()
+# (path, size, mtime_ns) or (member path, size, crc) -> SourceFile
+_sources = {}
+# layout folder -> submission folder it was found in
+_roots = {}
+
+
+def _clock():
+    return time.perf_counter(), time.process_time()
+
+
+def _since(clock):
+    wall, cpu = clock
+    return {
+        'wall_ms': round((time.perf_counter() - wall) * 1000, 3),
+        'cpu_ms': round((time.process_time() - cpu) * 1000, 3)
+    }
+
+
+class SubmissionDocument:
+    """One submission layout file, read and parsed exactly once."""
+
+    def __init__(self, path, exists=False, size=0, mtime=None, tree=None, error=None):
+        self.path = path
+        self.exists = exists
+        self.size = size
+        self.mtime = mtime
+        self.tree = tree
+        self.error = error
+        self._index = None
+
+    @property
+    def root(self):
+        return self.tree.getroot() if self.tree is not None else None
+
+    @property
+    def index(self):
+        """LayoutIndex over the parsed tree, built on first use."""
+        if self._index is None and self.tree is not None:
+            clock = _clock()
+            self._index = LayoutIndex(self.root)
+            _timings.setdefault(self.path, {})['index'] = _since(clock)
+        return self._index
+
+    @property
+    def parsed(self):
+        return self.tree is not None
+
+    def metadata(self):
+        return {
+            'path': self.path,
+            'exists': self.exists,
+            'size': self.size,
+            'mtime': self.mtime,
+            'parsed': self.parsed,
+            'error': str(self.error) if self.error is not None else None
+        }
+
+
+@lru_cache(maxsize=32)
+def _load(path, size, mtime_ns):
+    clock = _clock()
+    timings = _timings.setdefault(path, {})
+    mtime = mtime_ns / 1e9
+    try:
+        tree, size = parse_layout(path)
+        return SubmissionDocument(path, exists=True, size=size, mtime=mtime, tree=tree)
+    except IntakeLimitError as e:
+        timings['intake'] = e.as_dict()
+        return SubmissionDocument(path, exists=True, size=size, mtime=mtime, error=e)
+    except (etree.XMLSyntaxError, OSError, MemoryError) as e:
+        return SubmissionDocument(path, exists=True, size=size, mtime=mtime, error=e)
+    finally:
+        timings['bytes'] = size
+        timings['parse'] = _since(clock)
+
+
+def _load_member(archive, info, path):
+    key = (path, info.file_size, info.CRC)
+    if key in _members:
+        _members.move_to_end(key)
+        return _members[key]
+    clock = _clock()
+    timings = _timings.setdefault(path, {})
+    mtime = _zip_mtime(info)
+    size = info.file_size
+    try:
+        with archive.open(info) as f:
+            tree, size = parse_stream(f, info.file_size)
+        document = SubmissionDocument(path, exists=True, size=size, mtime=mtime, tree=tree)
+    except IntakeLimitError as e:
+        timings['intake'] = e.as_dict()
+        document = SubmissionDocument(path, exists=True, size=size, mtime=mtime, error=e)
+    except (etree.XMLSyntaxError, BadZipFile, OSError, MemoryError) as e:
+        document = SubmissionDocument(path, exists=True, size=size, mtime=mtime, error=e)
+    finally:
+        timings['bytes'] = size
+        timings['parse'] = _since(clock)
+    _members[key] = document
+    if len(_members) > MEMBER_CACHE_SIZE:
+        _members.popitem(last=False)
+    return document
+
+
+def _zip_mtime(info):
+    try:
+        return time.mktime(info.date_time + (0, 0, -1))
+    except (OverflowError, ValueError):
+        return None
+
+
+def _load_from_archive(source, name):
+    global _last_path
+    clock = _clock()
+    path = os.path.join(str(source), name)
+    try:
+        with open_archive(source) as archive:
+            info = archive.find(name)
+            if info is not None:
+                path = archive.member_path(info)
+            _last_path = path
+            _timings.setdefault(path, {}).setdefault('discovery', _since(clock))
+            if info is None:
+                return SubmissionDocument(path, error=FileNotFoundError(f"No {name} in {source}"))
+            return _load_member(archive, info, path)
+    except IntakeLimitError as e:
+        # The archive as a whole is over the limit; nothing in it is read
+        _last_path = path
+        _timings.setdefault(path, {})['intake'] = e.as_dict()
+        return SubmissionDocument(path, exists=True, error=e)
+    except (BadZipFile, OSError) as e:
+        _last_path = path
+        return SubmissionDocument(path, exists=True, error=e)
+
+
+def load_submission(submission_dir, name=XML_NAME):
+    """Return the cached SubmissionDocument for submission_dir/name.
+
+    A zip archive is searched for a member called name (see submission_archive.py).
+    """
+    global _last_path
+    if is_archive(submission_dir):
+        return _load_from_archive(submission_dir, name)
+    clock = _clock()
+    path = os.path.join(submission_dir, name)
+    _last_path = path
+    try:
+        st = os.stat(path)
+    except OSError as e:
+        return SubmissionDocument(path, error=e)
+    finally:
+        _timings.setdefault(path, {}).setdefault('discovery', _since(clock))
+    return _load(path, st.st_size, st.st_mtime_ns)
+
+
+class SourceFile:
+    """Text of one submission source file, such as MainActivity.java."""
+
+    def __init__(self, path, exists=False, text=None, error=None):
+        self.path = path
+        self.exists = exists
+        self.text = text
+        self.error = error
+        self._index = None
+        self._index_error = None
+
+    @property
+    def index(self):
+        """JavaIndex of the text, built on first use; None if there is no text or it does not tokenize."""
+        if self._index is None and self._index_error is None and self.text is not None:
+            # Imported here: only suites with Java checks need the tokenizer
+            from java_index import JavaIndex, JavaSyntaxError
+            clock = _clock()
+            try:
+                self._index = JavaIndex(self.text)
+            except JavaSyntaxError as e:
+                self._index_error = e
+            _timings.setdefault(self.path, {})['index'] = _since(clock)
+        return self._index
+
+    @property
+    def index_error(self):
+        """JavaSyntaxError of the last index attempt, or None."""
+        return self._index_error
+
+
+def _decode(path, data):
+    try:
+        return SourceFile(path, exists=True, text=data.decode('utf-8'))
+    except UnicodeDecodeError as e:
+        return SourceFile(path, exists=True, error=e)
+
+
+def set_submission_root(submission_dir, root):
+    """Search the sources of the layout folder submission_dir from root, the submission it was found in."""
+    _roots[str(Path(submission_dir))] = Path(root)
+
+
+def submission_root(submission_dir):
+    """Folder the student handed in that holds submission_dir (submission_dir itself unless it was found below one)."""
+    return _roots.get(str(Path(submission_dir)), Path(submission_dir))
+
+
+def find_source(submission_dir, name=JAVA_NAME):
+    """Shallowest name below the submission_root() of submission_dir, or None."""
+    root = submission_root(submission_dir)
+    if (root / name).is_file():
+        return root / name
+    candidates = sorted((p for p in root.rglob(name) if p.is_file()), key=lambda p: (len(p.parts), str(p)))
+    return candidates[0] if candidates else None
+
+
+def load_source(submission_dir, name=JAVA_NAME):
+    """Read name from a submission folder (see find_source()) or archive, within the intake bytes limit.
+
+    Like layouts, sources are cached on path, size and mtime (member size and CRC in an archive),
+    so every check of a run shares one SourceFile and its index.
+    """
+    max_bytes = IntakeLimits.from_env().bytes
+    if is_archive(submission_dir):
+        path = os.path.join(str(submission_dir), name)
+        try:
+            with open_archive(submission_dir) as archive:
+                info = archive.find(name)
+                if info is None:
+                    return SourceFile(path, error=FileNotFoundError(f"No {name} in {submission_dir}"))
+                path = archive.member_path(info)
+                key = (path, info.file_size, info.CRC)
+                if key not in _sources:
+                    _sources[key] = _decode(path, archive.read(info, max_bytes))
+                return _sources[key]
+        except (IntakeLimitError, BadZipFile, OSError) as e:
+            return SourceFile(path, exists=True, error=e)
+    found = find_source(submission_dir, name)
+    if found is None:
+        return SourceFile(os.path.join(str(submission_dir), name), error=FileNotFoundError(f"No {name} in {submission_dir}"))
+    path = str(found)
+    try:
+        st = os.stat(path)
+        key = (path, st.st_size, st.st_mtime_ns)
+        if key not in _sources:
+            if st.st_size > max_bytes:
+                raise IntakeLimitError('bytes', st.st_size, max_bytes)
+            with open(path, 'rb') as f:
+                _sources[key] = _decode(path, f.read())
+        return _sources[key]
+    except (IntakeLimitError, OSError) as e:
+        return SourceFile(path, exists=True, error=e)
+
+
+def clear_cache():
+    _load.cache_clear()
+    _members.clear()
+    _sources.clear()
+
+
+def load_timings(path=None):
+    """Phase timings recorded for path (default: the last loaded submission) in this run."""
+    return dict(_timings.get(path or _last_path, {}))
+
+
+def last_loaded():
+    return _last_path
+
+
+def intake_rejection(path=None):
+    """The intake limit path (default: the last loaded submission) was rejected for, or None."""
+    return _timings.get(path or _last_path, {}).get('intake')
+
+
+def reset_load_timings():
+    global _last_path
+    _timings.clear()
+    _last_path = None
@@ -0,0 +1,84 @@
+"""
+Assignment suites bundled into one judge image.
+
+A per-assignment image has a single /app/test_assignment.py. The multi-
+assignment image built by `generic_assignment_generator.py --bundle` keeps
+every suite under its assignment_id instead:
+
+    /app/suites/<assignment_id>/test_assignment.py
+    /app/suites/<assignment_id>/pytest.ini
+    /app/suites/<assignment_id>/conftest.py
+
+The runtime modules (submission_cache.py, layout_index.py, ...) and
+enhance_json.py stay in /app and are shared by all suites. Each suite keeps
+its own folder as pytest rootdir, so node ids and reports are the same as in
+the assignment's own image.
+"""
+
+import os
+import sys
+from collections import OrderedDict
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent
+SUITES_DIR = APP_DIR / 'suites'
+TEST_NAME = 'test_assignment.py'
+
+
+def discover_suites(suites_dir=SUITES_DIR):
+    """Return assignment_id -> test file for every suite folder, in name order."""
+    suites = OrderedDict()
+    suites_dir = Path(suites_dir)
+    if not suites_dir.is_dir():
+        return suites
+    for entry in sorted(suites_dir.iterdir()):
+        if (entry / TEST_NAME).is_file():
+            suites[entry.name] = entry / TEST_NAME
+    return suites
+
+
+def suite_file(assignment_id=None, suites_dir=SUITES_DIR):
+    """Test file for assignment_id (default: ASSIGNMENT_ID), or the image's own suite."""
+    assignment_id = assignment_id or os.environ.get('ASSIGNMENT_ID')
+    suites = discover_suites(suites_dir)
+    if not suites:
+        return APP_DIR / TEST_NAME
+    if assignment_id in suites:
+        return suites[assignment_id]
+    if assignment_id:
+        raise ValueError(f"Unknown assignment_id {assignment_id}, this judge serves {', '.join(suites)}")
+    raise ValueError(f"ASSIGNMENT_ID is required, this judge serves {', '.join(suites)}")
+
+
+def _forget_module(test_file):
+    """Drop an imported suite module so the next suite's test_assignment.py can be imported."""
+    name = Path(test_file).stem
+    module = sys.modules.get(name)
+    if module is not None and Path(getattr(module, '__file__', '') or '').resolve() == Path(test_file).resolve():
+        del sys.modules[name]
+
+
+def run_suites(callback, suites, engine=None):
+    """Load every suite once and call callback(grades) with an assignment_id -> grade() map.
+
+    With the pytest engine each suite gets its own warm session; the sessions are
+    nested so all of them stay collected while callback runs.
+    """
+    from fast_eval import run_engine
+
+    grades = OrderedDict()
+    pending = list(suites.items())
+
+    def load_next():
+        if not pending:
+            return callback(grades)
+        assignment_id, test_file = pending.pop(0)
+
+        def loaded(grade):
+            grades[assignment_id] = grade
+            _forget_module(test_file)
+            return load_next()
+
+        return run_engine(loaded, engine, test_file)
+
+    return load_next()
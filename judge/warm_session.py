@@ -0,0 +1,94 @@
+"""
+Keep one pytest session alive and grade many submissions with it.
+
+pytest.main() pays for plugin loading, configuration and test collection on
+every call. run_warm() pays for them once: it starts a normal pytest session
+for test_assignment.py and takes over its run loop. Inside the loop the
+caller receives a grade(submission_dir) function that points the collected
+suite at another submission, runs every collected item again and returns the
+same report pytest-json-report would have written for a standalone run.
+"""
+
+import contextlib
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import pytest
+from pytest_jsonreport.plugin import JSONReport
+
+from regrade_store import test_name
+from similarity_index import capture
+from submission_cache import clear_cache
+
+APP_DIR = Path(__file__).resolve().parent
+TEST_FILE = APP_DIR / 'test_assignment.py'
+
+PYTEST_ARGS = ['-q', '-p', 'no:cacheprovider', '-p', 'judge_timings', '-p', 'tiers', '-p', 'solution_diff', '-p', 'java_checks', '--json-report-file=none']
+
+
+class WarmSession:
+    """pytest plugin that hands the collected session to a callback instead of running it once."""
+
+    def __init__(self, callback):
+        self.callback = callback
+        self.json_report = JSONReport()
+        self.session = None
+        self.result = None
+        self.error = None
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_runtestloop(self, session):
+        self.session = session
+        try:
+            self.result = self.callback(self.grade)
+        except Exception as e:
+            self.error = e
+        return True
+
+    def _reset_report(self):
+        plugin = self.json_report
+        plugin._json_tests = OrderedDict()
+        plugin._json_warnings = []
+        plugin._start_time = time.time()
+        plugin.report = None
+
+    def grade(self, submission_dir, select=None):
+        """Run the collected tests against submission_dir and return the raw json report.
+
+        select limits the run to tests named like 'TestClass::test_name' (see regrade_store.py).
+        """
+        session = self.session
+        items = session.items
+        if select is not None:
+            items = [item for item in items if test_name(item.nodeid) in select]
+        for module in {getattr(item, 'module', None) for item in items}:
+            if module is not None:
+                module.SUBMISSION_DIR = str(submission_dir)
+        self._reset_report()
+        session.testsfailed = 0
+        try:
+            for i, item in enumerate(items):
+                nextitem = items[i + 1] if i + 1 < len(items) else None
+                # nextitem=None on the last item tears down the session-scoped fixtures
+                item.config.hook.pytest_runtest_protocol(item=item, nextitem=nextitem)
+        finally:
+            capture(submission_dir)
+            clear_cache()
+        session.exitstatus = pytest.ExitCode.TESTS_FAILED if session.testsfailed else pytest.ExitCode.OK
+        self.json_report.pytest_sessionfinish(session)
+        return self.json_report.report
+
+
+def run_warm(callback, test_file=TEST_FILE, args=()):
+    """Collect test_file once, call callback(grade) inside the live session and return its result."""
+    warm = WarmSession(callback)
+    with open(os.devnull, 'w') as devnull:
+        with contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+            pytest.main([str(test_file), *PYTEST_ARGS, *args], plugins=[warm.json_report, warm])
+    if warm.error is not None:
+        raise warm.error
+    if warm.session is None:
+        raise RuntimeError(f"pytest could not start a session for {test_file}")
+    return warm.result
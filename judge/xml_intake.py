@@ -0,0 +1,161 @@
+"""
+Bounded, hardened parsing of submission layouts.
+
+The judge runs with 512M of memory and a 50m /tmp, so a submission must not
+be able to exhaust either. parse_layout() streams the file through lxml's
+iterparse and stops at the first limit it crosses, before the rest of the
+document is read:
+
+    bytes             file size, checked before and while reading
+    elements          number of elements
+    depth             nesting depth
+    attribute_length  length of any single attribute value
+    doctype           layouts never need a DTD, so none is accepted
+
+parse_stream() applies the same limits to an already open file, such as a zip
+member (see submission_archive.py). Entity resolution, DTD loading and network
+access are turned off. A crossed limit raises IntakeLimitError, which the
+submission cache reports like a parse error, so every test fails fast with a
+message naming the limit.
+
+Limits come from the environment (INTAKE_MAX_BYTES, INTAKE_MAX_ELEMENTS,
+INTAKE_MAX_DEPTH, INTAKE_MAX_ATTRIBUTE_LENGTH, INTAKE_MAX_ARCHIVE_BYTES).
+"""
+
+import os
+
+from lxml import etree
+
+DEFAULT_LIMITS = {
+    'bytes': 8 * 1024 * 1024,
+    'elements': 100000,
+    'depth': 128,
+    'attribute_length': 8192,
+    'archive_bytes': 32 * 1024 * 1024,
+}
+
+ENV_NAMES = {
+    'bytes': 'INTAKE_MAX_BYTES',
+    'elements': 'INTAKE_MAX_ELEMENTS',
+    'depth': 'INTAKE_MAX_DEPTH',
+    'attribute_length': 'INTAKE_MAX_ATTRIBUTE_LENGTH',
+    'archive_bytes': 'INTAKE_MAX_ARCHIVE_BYTES',
+}
+
+
+class IntakeLimits:
+    """Maximum sizes a submission may have; archive_bytes bounds an unpacked zip."""
+
+    def __init__(self, bytes=None, elements=None, depth=None, attribute_length=None, archive_bytes=None):
+        given = {'bytes': bytes, 'elements': elements, 'depth': depth,
+                 'attribute_length': attribute_length, 'archive_bytes': archive_bytes}
+        for name, value in given.items():
+            setattr(self, name, DEFAULT_LIMITS[name] if value is None else int(value))
+
+    @classmethod
+    def from_env(cls):
+        values = {}
+        for name, env_name in ENV_NAMES.items():
+            try:
+                values[name] = int(os.environ[env_name])
+            except (KeyError, ValueError):
+                pass
+        return cls(**values)
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in DEFAULT_LIMITS}
+
+
+class IntakeLimitError(Exception):
+    """The submission crossed one of the intake limits."""
+
+    def __init__(self, limit, value, maximum, detail=''):
+        self.limit = limit
+        self.value = value
+        self.maximum = maximum
+        if maximum is None:
+            message = f"Submission rejected ({limit}): {detail}"
+        else:
+            message = f"Submission exceeds the {limit} limit: {value} > {maximum}"
+            if limit in ENV_NAMES:
+                message += f" (raise {ENV_NAMES[limit]} to allow it)"
+            if detail:
+                message += f", {detail}"
+        super().__init__(message)
+
+    def as_dict(self):
+        return {'status': 'rejected', 'limit': self.limit, 'value': self.value,
+                'maximum': self.maximum, 'message': str(self)}
+
+
+class _LimitedReader:
+    """File wrapper that counts bytes and refuses to read past max_bytes."""
+
+    def __init__(self, f, max_bytes):
+        self.f = f
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        data = self.f.read(size)
+        self.bytes_read += len(data)
+        if self.bytes_read > self.max_bytes:
+            raise IntakeLimitError('bytes', self.bytes_read, self.max_bytes, 'while reading')
+        return data
+
+
+def parse_layout(path, limits=None):
+    """Parse path within limits; returns (ElementTree, bytes read).
+
+    Raises IntakeLimitError for a crossed limit and etree.XMLSyntaxError for
+    malformed XML.
+    """
+    limits = limits or IntakeLimits.from_env()
+    with open(path, 'rb') as f:
+        return parse_stream(f, os.path.getsize(path), limits)
+
+
+def parse_stream(f, size, limits=None):
+    """Parse an open binary file (e.g. a zip member) of the given size like parse_layout()."""
+    limits = limits or IntakeLimits.from_env()
+    if size > limits.bytes:
+        raise IntakeLimitError('bytes', size, limits.bytes)
+    reader = _LimitedReader(f, limits.bytes)
+    context = etree.iterparse(
+        reader, events=('start', 'end'),
+        resolve_entities=False, load_dtd=False, no_network=True, huge_tree=False
+    )
+    elements = 0
+    depth = 0
+    try:
+        for event, element in context:
+            if event == 'end':
+                depth -= 1
+                continue
+            if elements == 0 and element.getroottree().docinfo.doctype:
+                raise IntakeLimitError('doctype', None, None, 'layouts must not declare a DOCTYPE')
+            elements += 1
+            depth += 1
+            if elements > limits.elements:
+                raise IntakeLimitError('elements', elements, limits.elements)
+            if depth > limits.depth:
+                raise IntakeLimitError('depth', depth, limits.depth, f"at <{etree.QName(element).localname}>")
+            for name, value in element.attrib.items():
+                if len(value) > limits.attribute_length:
+                    raise IntakeLimitError('attribute_length', len(value), limits.attribute_length,
+                                           f"attribute {etree.QName(name).localname}")
+    except etree.XMLSyntaxError as e:
+        # lxml wraps exceptions raised inside read(); surface the limit itself
+        cause = e.__context__
+        if isinstance(cause, IntakeLimitError):
+            raise cause from None
+        raise
+    return context.root.getroottree(), reader.bytes_read
+
+
+def check_archive(zf, limits=None):
+    """Raise IntakeLimitError if unpacking the open ZipFile would exceed archive_bytes."""
+    limits = limits or IntakeLimits.from_env()
+    total = sum(info.file_size for info in zf.infolist())
+    if total > limits.archive_bytes:
+        raise IntakeLimitError('archive_bytes', total, limits.archive_bytes, 'when unpacked')
@@ -0,0 +1,73 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+JUDGE_DIR = ROOT / 'judge'
+if str(JUDGE_DIR) not in sys.path:
+    sys.path.insert(0, str(JUDGE_DIR))
+
+# Settings the judge reads from the environment; every test starts from the defaults
+JUDGE_SETTINGS = ('INTAKE_', 'JUDGE_', 'RESULT_CACHE', 'REGRADE_STORE', 'JAVA_CHECKS', 'SIMILARITY',
+                  'ASSIGNMENT_ID', 'SUBMISSION_DIR')
+
+LAYOUT = '''<?xml version="1.0" encoding="utf-8"?>
+<LinearLayout xmlns:android="http://schemas.android.com/apk/res/android"
+    android:layout_width="match_parent"
+    android:layout_height="match_parent"
+    android:orientation="vertical"
+    android:gravity="center">
+    <TextView
+        android:id="@+id/greeting"
+        android:layout_width="wrap_content"
+        android:layout_height="wrap_content"
+        android:text="Hi Android"
+        android:textSize="32sp" />
+</LinearLayout>
+'''
+
+ACTIVITY = '''package com.example.helloandroid;
+
+import android.os.Bundle;
+import androidx.appcompat.app.AppCompatActivity;
+
+public class MainActivity extends AppCompatActivity {
+    @Override
+    protected void onCreate(Bundle savedInstanceState) {
+        super.onCreate(savedInstanceState);
+        setContentView(R.layout.activity_main);
+        TextView greeting = findViewById(R.id.greeting);
+    }
+}
+'''
+
+
+@pytest.fixture(autouse=True)
+def judge_defaults(monkeypatch):
+    from submission_cache import clear_cache
+
+    for name in list(os.environ):
+        if name.startswith(JUDGE_SETTINGS):
+            monkeypatch.delenv(name)
+    clear_cache()
+    yield
+    clear_cache()
+
+
+@pytest.fixture
+def make_submission(tmp_path):
+    """make_submission(name, layout=LAYOUT, java=None) writes a submission folder under tmp_path."""
+
+    def make(name, layout=LAYOUT, java=None, java_path='MainActivity.java'):
+        folder = tmp_path / name
+        folder.mkdir(parents=True)
+        if layout is not None:
+            (folder / 'activity_main.xml').write_text(layout, encoding='utf-8')
+        if java is not None:
+            (folder / java_path).parent.mkdir(parents=True, exist_ok=True)
+            (folder / java_path).write_text(java, encoding='utf-8')
+        return folder
+
+    return make
@@ -0,0 +1,84 @@
+"""fast_eval and pytest agree on every test outcome, including the submissions that break fixtures."""
+
+import json
+import os
+import subprocess
+import sys
+import zipfile
+
+import pytest
+
+from conftest import ACTIVITY, JUDGE_DIR, ROOT
+
+# Runs in a child process: the warm pytest session cannot nest inside this one
+PARITY = '''
+import json
+import sys
+
+from fast_eval import run_engine
+
+test_file, submissions = sys.argv[1], sys.argv[2:]
+reports = run_engine(lambda grade: [grade(path) for path in submissions], 'parity', test_file)
+print(json.dumps({path: {'summary': report['summary'], 'parity': report['parity']}
+                  for path, report in zip(submissions, reports)}))
+'''
+
+SUITES = ['Assignment1', 'assignment2', 'assignment3']
+
+NAMESPACED = '''<?xml version="1.0" encoding="utf-8"?>
+<android:LinearLayout xmlns:android="http://schemas.android.com/apk/res/android"
+    android:layout_width="match_parent" android:layout_height="match_parent" android:gravity="center">
+    <android:TextView android:text="Hi Android" android:textSize="32sp" android:textStyle="bold" />
+</android:LinearLayout>
+'''
+
+BARE = '''<LinearLayout layout_width="match_parent" layout_height="match_parent" gravity="center">
+    <TextView text="Hi Android" textSize="32sp" textStyle="bold" layout_width="400dp" layout_height="70dp" />
+</LinearLayout>
+'''
+
+
+def member(archive, name='activity_main.xml'):
+    with zipfile.ZipFile(archive) as zf:
+        return zf.read(name).decode('utf-8')
+
+
+def edge_cases(suite_dir, make_submission):
+    solution = member(suite_dir / 'solution.zip')
+    return {
+        'solution': make_submission('solution', solution),
+        'starter': make_submission('starter', member(suite_dir / 'startercode.zip')),
+        'missing': make_submission('missing', layout=None),
+        'empty': make_submission('empty', ''),
+        'malformed': make_submission('malformed', '<LinearLayout><TextView></LinearLayout>'),
+        'namespaced': make_submission('namespaced', NAMESPACED),
+        'bare': make_submission('bare', BARE),
+        'too_deep': make_submission('too_deep', '<LinearLayout>' * 6 + '</LinearLayout>' * 6),
+        'java': make_submission('java', solution, ACTIVITY, 'app/src/main/java/com/x/MainActivity.java'),
+        'archive': suite_dir / 'solution.zip',
+    }
+
+
+def run_parity(test_file, submissions):
+    env = dict(os.environ, PYTHONPATH=str(JUDGE_DIR), INTAKE_MAX_DEPTH='5', JUDGE_ENGINE='parity')
+    result = subprocess.run(
+        [sys.executable, '-c', PARITY, str(test_file), *map(str, submissions)],
+        capture_output=True, text=True, env=env, cwd=test_file.parent, timeout=300
+    )
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.parametrize('suite', SUITES)
+def test_engines_agree(suite, make_submission):
+    suite_dir = ROOT / suite
+    cases = edge_cases(suite_dir, make_submission)
+    reports = run_parity(suite_dir / 'test_assignment.py', cases.values())
+    mismatches = {name: reports[str(path)]['parity']['mismatches']
+                  for name, path in cases.items() if not reports[str(path)]['parity']['match']}
+    assert mismatches == {}
+    # The cases do exercise both ends of the suite
+    solution = reports[str(cases['solution'])]['summary']
+    assert solution.get('passed') == solution['total']
+    malformed = reports[str(cases['malformed'])]['summary']
+    assert malformed.get('failed', 0) + malformed.get('error', 0) > 0
@@ -0,0 +1,117 @@
+"""Java checks: the index they read and the messages they give."""
+
+import pytest
+
+from conftest import ACTIVITY, LAYOUT
+from java_checks import (check_extends_activity, check_sets_content_view, check_view_ids_resolve, java_section,
+                         suite_checks_java)
+from java_index import JavaIndex, JavaSyntaxError
+from layout_index import LayoutIndex
+from lxml import etree
+from submission_cache import find_source, set_submission_root
+
+
+@pytest.fixture
+def layout():
+    return LayoutIndex(etree.fromstring(LAYOUT.split('\n', 1)[1].encode('utf-8')))
+
+
+@pytest.fixture
+def suite(tmp_path):
+    test_file = tmp_path / 'test_assignment.py'
+    test_file.write_text('CHECK_JAVA = True\n')
+    return test_file
+
+
+def test_index_reads_package_imports_and_classes():
+    java = JavaIndex(ACTIVITY)
+    assert java.package == 'com.example.helloandroid'
+    assert 'androidx.appcompat.app.AppCompatActivity' in java.imports
+    assert java.classes == {'MainActivity': 'AppCompatActivity'}
+    assert 'onCreate' in java.methods
+
+
+def test_qualified_base_class_extends_activity(layout):
+    java = JavaIndex(ACTIVITY.replace('extends AppCompatActivity', 'extends androidx.appcompat.app.AppCompatActivity'))
+    assert java.classes['MainActivity'] == 'androidx.appcompat.app.AppCompatActivity'
+    assert java.extends('Activity') == ['MainActivity']
+    assert check_extends_activity(java, layout) is None
+
+
+def test_class_without_activity_base(layout):
+    java = JavaIndex(ACTIVITY.replace(' extends AppCompatActivity', ''))
+    assert 'extends an Activity' in check_extends_activity(java, layout)
+
+
+def test_comments_and_strings_are_not_code(layout):
+    java = JavaIndex(ACTIVITY.replace('setContentView(R.layout.activity_main);',
+                                      '// setContentView(R.layout.activity_main);\n'
+                                      'String s = "setContentView(R.layout.activity_main)";'))
+    assert check_sets_content_view(java, layout) == "setContentView() is never called"
+
+
+def test_wrong_content_view(layout):
+    java = JavaIndex(ACTIVITY.replace('R.layout.activity_main', 'R.layout.activity_other'))
+    message = check_sets_content_view(java, layout)
+    assert message == "setContentView() should be called with R.layout.activity_main, got R.layout.activity_other"
+
+
+def test_view_ids_resolve(layout):
+    assert check_view_ids_resolve(JavaIndex(ACTIVITY), layout) is None
+
+
+def test_missing_view_id_names_the_line(layout):
+    java = JavaIndex(ACTIVITY.replace('R.id.greeting', 'R.id.title'))
+    assert check_view_ids_resolve(java, layout).endswith('R.id.title (line 11)')
+
+
+def test_framework_ids_are_not_the_apps(layout):
+    java = JavaIndex(ACTIVITY.replace('R.id.greeting', 'android.R.id.content'))
+    assert java.calls_to('findViewById')[0].resources() == []
+    assert check_view_ids_resolve(java, layout) is None
+
+
+def test_unparsed_layout_cannot_resolve_ids():
+    assert 'did not parse' in check_view_ids_resolve(JavaIndex(ACTIVITY), None)
+
+
+def test_unterminated_comment_is_a_syntax_error():
+    with pytest.raises(JavaSyntaxError):
+        JavaIndex(ACTIVITY + '/* never closed')
+
+
+def test_suite_flag_is_read_without_importing(tmp_path, suite):
+    other = tmp_path / 'test_other.py'
+    other.write_text('raise SystemExit("imported")\n')
+    assert suite_checks_java(suite)
+    assert not suite_checks_java(other)
+    assert not suite_checks_java(tmp_path / 'missing.py')
+
+
+def test_section_for_a_nested_android_project(tmp_path, suite):
+    root = tmp_path / 'student'
+    (root / 'app/src/main/res/layout').mkdir(parents=True)
+    (root / 'app/src/main/res/layout/activity_main.xml').write_text(LAYOUT)
+    (root / 'app/src/main/java/com/x').mkdir(parents=True)
+    (root / 'app/src/main/java/com/x/MainActivity.java').write_text(ACTIVITY)
+    # As batch_runner.find_submission_dir() records it: the layout folder, searched for Java from root
+    submission_dir = root / 'app/src/main/res/layout'
+    set_submission_root(submission_dir, root)
+    assert find_source(submission_dir) == root / 'app/src/main/java/com/x/MainActivity.java'
+    section = java_section(str(submission_dir), suite)
+    assert section['path'] == str(root / 'app/src/main/java/com/x/MainActivity.java')
+    assert section['summary'] == {'passed': 3, 'failed': 0, 'total': 3}
+
+
+def test_unreadable_source_fails_every_check(make_submission, suite):
+    submission_dir = make_submission('broken', java=ACTIVITY + '/* never closed')
+    section = java_section(str(submission_dir), suite)
+    assert section['summary'] == {'passed': 0, 'failed': 3, 'total': 3}
+    assert all('could not be read' in test['message'] for test in section['tests'])
+
+
+def test_no_section_without_source_or_flag(make_submission, suite, monkeypatch):
+    assert java_section(str(make_submission('layout_only')), suite) is None
+    with_java = str(make_submission('with_java', java=ACTIVITY))
+    monkeypatch.setenv('JAVA_CHECKS', 'off')
+    assert java_section(with_java, suite) is None
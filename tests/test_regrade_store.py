@@ -0,0 +1,154 @@
+"""Per-test digests: a suite edit invalidates exactly the tests it can change."""
+
+import pytest
+
+from conftest import LAYOUT
+from regrade_store import RegradeStore, open_regrade_store, suite_digests
+
+SUITE = '''import pytest
+
+LIMIT = 24
+
+@pytest.fixture
+def submission():
+    return 'layout'
+
+@pytest.fixture
+def text(submission):
+    return submission.upper()
+
+def test_root(submission):
+    assert submission
+
+def test_text(text):
+    assert text == 'LAYOUT'
+
+class TestSize:
+    minimum = 24
+
+    def test_size(self):
+        assert self.minimum >= 24
+'''
+
+TESTS = ['test_root', 'test_text', 'TestSize::test_size']
+
+
+@pytest.fixture
+def suite(tmp_path):
+    folder = tmp_path / 'suite'
+    folder.mkdir()
+    (folder / 'conftest.py').write_text('')
+    test_file = folder / 'test_suite.py'
+    test_file.write_text(SUITE)
+    return test_file
+
+
+def changed(test_file, old, new, tiered=False):
+    """Names of the tests whose digest changes when old is replaced by new in test_file."""
+    before = suite_digests(test_file)
+    test_file.write_text(test_file.read_text().replace(old, new, 1))
+    after = suite_digests(test_file, tiered)
+    return [name for name in before if before[name] != after[name]]
+
+
+def test_every_test_has_a_digest(suite):
+    assert list(suite_digests(suite)) == TESTS
+
+
+def test_unchanged_suite_keeps_its_digests(suite):
+    assert changed(suite, '', '') == []
+
+
+def test_editing_a_test_invalidates_only_that_test(suite):
+    assert changed(suite, "assert text == 'LAYOUT'", "assert text == 'LAYOUT', 'upper case'") == ['test_text']
+
+
+def test_editing_a_fixture_invalidates_its_dependents(suite):
+    assert changed(suite, 'submission.upper()', 'submission.title()') == ['test_text']
+
+
+def test_editing_a_shared_fixture_invalidates_tests_using_it_indirectly(suite):
+    assert changed(suite, "return 'layout'", "return 'LinearLayout'") == ['test_root', 'test_text']
+
+
+def test_editing_a_class_body_invalidates_its_tests(suite):
+    assert changed(suite, 'minimum = 24', 'minimum = 32') == ['TestSize::test_size']
+
+
+def test_module_level_code_invalidates_every_test(suite):
+    assert changed(suite, 'LIMIT = 24', 'LIMIT = 32') == TESTS
+
+
+def test_conftest_invalidates_every_test(suite):
+    before = suite_digests(suite)
+    (suite.parent / 'conftest.py').write_text('import sys\n')
+    after = suite_digests(suite)
+    assert all(before[name] != after[name] for name in TESTS)
+
+
+def test_tiers_invalidate_every_test(suite):
+    assert changed(suite, '', '', tiered=True) == TESTS
+
+
+def test_intake_limits_invalidate_every_test(suite, monkeypatch):
+    before = suite_digests(suite)
+    monkeypatch.setenv('INTAKE_MAX_DEPTH', '4')
+    after = suite_digests(suite)
+    assert all(before[name] != after[name] for name in TESTS)
+
+
+def entry(name, outcome='passed', stdout=''):
+    return {'nodeid': f"test_suite.py::{name}", 'outcome': outcome, 'call': {'stdout': stdout}}
+
+
+def test_lookup_returns_only_entries_with_a_matching_digest(tmp_path, suite):
+    store = RegradeStore(tmp_path / 'tests.db')
+    digests = suite_digests(suite)
+    store.save('student', digests, [entry(name) for name in TESTS])
+    edited = dict(digests, test_text='edited')
+    assert sorted(store.lookup('student', edited)) == sorted(['test_root', 'TestSize::test_size'])
+    assert store.lookup('someone else', digests) == {}
+    store.close()
+
+
+def test_least_recently_used_submission_is_evicted(tmp_path, suite):
+    store = RegradeStore(tmp_path / 'tests.db', max_submissions=2)
+    digests = suite_digests(suite)
+    for student in ('a', 'b'):
+        store.save(student, digests, [entry(name) for name in TESTS])
+    store.lookup('a', digests)
+    store.save('c', digests, [entry(name) for name in TESTS])
+    assert len(store) == 2
+    assert store.lookup('b', digests) == {}
+    assert len(store.lookup('a', digests)) == len(TESTS)
+    store.close()
+
+
+def test_reused_entries_name_the_submission_that_asked(tmp_path, suite, make_submission):
+    store = RegradeStore(tmp_path / 'tests.db')
+    runs = []
+
+    def grade(submission_dir, select=None):
+        runs.append(select)
+        names = TESTS if select is None else [name for name in TESTS if name in select]
+        return {'summary': {'passed': len(names), 'total': len(names)},
+                'tests': [entry(name, stdout=f"Reading {submission_dir}/activity_main.xml") for name in names]}
+
+    incremental_grade = store.wrap(grade, suite)
+    first, second = make_submission('first', LAYOUT), make_submission('second', LAYOUT)
+    incremental_grade(first)
+    report = incremental_grade(second)
+    assert runs == [None]
+    assert report['incremental'] == {'rerun': [], 'reused': len(TESTS)}
+    assert [test['call']['stdout'] for test in report['tests']] == [f"Reading {second}/activity_main.xml"] * len(TESTS)
+    store.close()
+
+
+def test_store_is_opt_in(tmp_path, monkeypatch):
+    assert open_regrade_store() is None
+    monkeypatch.setenv('REGRADE_STORE', 'on')
+    monkeypatch.setenv('REGRADE_STORE_PATH', str(tmp_path / 'tests.db'))
+    monkeypatch.setenv('REGRADE_STORE_MAX_SUBMISSIONS', '3')
+    store = open_regrade_store()
+    assert (store.path, store.max_submissions) == (str(tmp_path / 'tests.db'), 3)
+    store.close()
@@ -0,0 +1,123 @@
+"""Cache keys: what must share a cached report and what must not."""
+
+import json
+
+import pytest
+
+from conftest import ACTIVITY, LAYOUT
+from result_cache import SUBMISSION_TOKEN, ResultCache, open_result_cache, submission_key
+
+REFORMATTED = '''<?xml version="1.0"?>
+<!-- Formatting, comments and attribute order are not graded -->
+<LinearLayout xmlns:android="http://schemas.android.com/apk/res/android" android:gravity="center"
+        android:orientation="vertical" android:layout_height="match_parent" android:layout_width="match_parent">
+
+    <TextView android:textSize="32sp" android:text="Hi Android"
+        android:layout_height="wrap_content" android:layout_width="wrap_content" android:id="@+id/greeting"/>
+</LinearLayout>
+'''
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResultCache(tmp_path / 'results.db')
+    yield cache
+    cache.close()
+
+
+def report_for(submission_dir):
+    return {
+        'summary': {'passed': 1, 'total': 1},
+        'tests': [{'nodeid': 'test_assignment.py::test_layout', 'outcome': 'passed',
+                   'setup': {'stdout': f"Looking for XML file at: {submission_dir}/activity_main.xml\n"}}],
+        'java': {'path': f"{submission_dir}/MainActivity.java"},
+    }
+
+
+def test_formatting_shares_a_key(make_submission):
+    assert submission_key(make_submission('a'), 'suite') == submission_key(make_submission('b', REFORMATTED), 'suite')
+
+
+def test_changed_text_changes_the_key(make_submission):
+    changed = LAYOUT.replace('Hi Android', 'Hello Android')
+    assert submission_key(make_submission('a'), 'suite') != submission_key(make_submission('b', changed), 'suite')
+
+
+def test_suite_digest_changes_the_key(make_submission):
+    submission = make_submission('a')
+    assert submission_key(submission, 'suite') != submission_key(submission, 'edited suite')
+
+
+def test_intake_limits_change_the_key(make_submission, monkeypatch):
+    submission = make_submission('a')
+    before = submission_key(submission, 'suite')
+    monkeypatch.setenv('INTAKE_MAX_ELEMENTS', '1')
+    assert submission_key(submission, 'suite') != before
+
+
+def test_java_source_changes_the_key(make_submission):
+    layout_only = submission_key(make_submission('a'), 'suite')
+    with_java = submission_key(make_submission('b', java=ACTIVITY), 'suite')
+    other_java = submission_key(make_submission('c', java=ACTIVITY.replace('greeting', 'title')), 'suite')
+    assert len({layout_only, with_java, other_java}) == 3
+
+
+def test_nested_java_source_is_part_of_the_key(make_submission):
+    flat = submission_key(make_submission('a', java=ACTIVITY), 'suite')
+    nested = submission_key(make_submission('b', java=ACTIVITY, java_path='app/src/main/java/MainActivity.java'), 'suite')
+    assert flat == nested != submission_key(make_submission('c'), 'suite')
+
+
+def test_missing_and_oversized_layouts_get_their_own_keys(make_submission, monkeypatch):
+    missing = submission_key(make_submission('a', layout=None), 'suite')
+    monkeypatch.setenv('INTAKE_MAX_BYTES', '64')
+    oversized = submission_key(make_submission('b'), 'suite')
+    assert missing != oversized
+
+
+def test_repeated_submission_is_graded_once(cache, make_submission):
+    graded = []
+    grade = cache.wrap(lambda submission_dir: graded.append(submission_dir) or report_for(submission_dir), 'suite')
+    grade(make_submission('a'))
+    grade(make_submission('b', REFORMATTED))
+    assert len(graded) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+@pytest.mark.parametrize('setting, value', [('JUDGE_ENGINE', 'parity'), ('JUDGE_TIERED', '1')])
+def test_grading_settings_separate_reports(cache, make_submission, monkeypatch, setting, value):
+    graded = []
+    submission = make_submission('a')
+    cache.wrap(lambda submission_dir: graded.append(setting) or report_for(submission_dir), 'suite')(submission)
+    monkeypatch.setenv(setting, value)
+    cache.wrap(lambda submission_dir: graded.append(value) or report_for(submission_dir), 'suite')(submission)
+    assert graded == [setting, value]
+
+
+def test_hit_names_the_submission_that_asked(cache, make_submission):
+    first, second = make_submission('first'), make_submission('second')
+    grade = cache.wrap(report_for, 'suite')
+    assert grade(first) == report_for(first)
+    stored = json.loads(cache.db.execute('SELECT report FROM results').fetchone()[0])
+    assert stored['java']['path'] == f"{SUBMISSION_TOKEN}/MainActivity.java"
+    assert grade(second) == report_for(second)
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    cache = ResultCache(tmp_path / 'results.db', max_entries=2)
+    cache.put('a', {'n': 1})
+    cache.put('b', {'n': 2})
+    cache.get('a')
+    cache.put('c', {'n': 3})
+    assert len(cache) == 2
+    assert cache.get('b') is None and cache.get('a') == {'n': 1}
+    cache.close()
+
+
+def test_cache_is_opt_in(tmp_path, monkeypatch):
+    assert open_result_cache() is None
+    monkeypatch.setenv('RESULT_CACHE', 'on')
+    monkeypatch.setenv('RESULT_CACHE_PATH', str(tmp_path / 'results.db'))
+    cache = open_result_cache()
+    assert isinstance(cache, ResultCache) and cache.path == str(tmp_path / 'results.db')
+    cache.close()
@@ -0,0 +1,111 @@
+"""Intake limits: each one rejects the layout that crosses it, naming the limit."""
+
+import io
+import zipfile
+
+import pytest
+from lxml import etree
+
+from conftest import LAYOUT
+from submission_cache import intake_rejection, load_submission
+from xml_intake import IntakeLimitError, IntakeLimits, check_archive, parse_layout, parse_stream
+
+BILLION_LAUGHS = '''<?xml version="1.0"?>
+<!DOCTYPE lolz [
+  <!ENTITY lol "lol">
+  <!ENTITY lol2 "&lol;&lol;&lol;&lol;&lol;&lol;&lol;&lol;&lol;&lol;">
+]>
+<LinearLayout>&lol2;</LinearLayout>
+'''
+
+
+def write(tmp_path, text):
+    path = tmp_path / 'activity_main.xml'
+    path.write_text(text, encoding='utf-8')
+    return path
+
+
+def nested(depth):
+    return '<LinearLayout>' * depth + '</LinearLayout>' * depth
+
+
+def rejection(path, limits):
+    with pytest.raises(IntakeLimitError) as raised:
+        parse_layout(path, limits)
+    return raised.value
+
+
+def test_layout_within_limits_parses(tmp_path):
+    path = write(tmp_path, LAYOUT)
+    tree, size = parse_layout(path, IntakeLimits())
+    assert tree.getroot().tag == 'LinearLayout'
+    assert size == path.stat().st_size
+
+
+def test_doctype_is_rejected(tmp_path):
+    error = rejection(write(tmp_path, BILLION_LAUGHS), IntakeLimits())
+    assert error.limit == 'doctype'
+    assert error.as_dict()['status'] == 'rejected'
+
+
+def test_too_many_elements(tmp_path):
+    error = rejection(write(tmp_path, '<a>' + '<b/>' * 5 + '</a>'), IntakeLimits(elements=3))
+    assert (error.limit, error.value, error.maximum) == ('elements', 4, 3)
+    assert 'INTAKE_MAX_ELEMENTS' in str(error)
+
+
+def test_too_deep(tmp_path):
+    error = rejection(write(tmp_path, nested(5)), IntakeLimits(depth=4))
+    assert (error.limit, error.value, error.maximum) == ('depth', 5, 4)
+
+
+def test_attribute_too_long(tmp_path):
+    error = rejection(write(tmp_path, f'<TextView text="{"x" * 100}"/>'), IntakeLimits(attribute_length=99))
+    assert (error.limit, error.value) == ('attribute_length', 100)
+    assert 'attribute text' in str(error)
+
+
+def test_file_too_large(tmp_path):
+    path = write(tmp_path, LAYOUT)
+    error = rejection(path, IntakeLimits(bytes=64))
+    assert (error.limit, error.value, error.maximum) == ('bytes', path.stat().st_size, 64)
+
+
+def test_stream_longer_than_its_declared_size(tmp_path):
+    # A zip member can declare a smaller size than it inflates to; the reader stops at the limit
+    with pytest.raises(IntakeLimitError) as raised:
+        parse_stream(io.BytesIO(LAYOUT.encode('utf-8')), 10, IntakeLimits(bytes=64))
+    assert raised.value.limit == 'bytes'
+
+
+def test_malformed_layout_is_a_syntax_error(tmp_path):
+    with pytest.raises(etree.XMLSyntaxError):
+        parse_layout(write(tmp_path, '<LinearLayout><TextView></LinearLayout>'), IntakeLimits())
+
+
+def test_archive_too_large_when_unpacked():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('activity_main.xml', ' ' * 10000)
+    with zipfile.ZipFile(buffer) as archive:
+        check_archive(archive, IntakeLimits())
+        with pytest.raises(IntakeLimitError) as raised:
+            check_archive(archive, IntakeLimits(archive_bytes=9999))
+    assert (raised.value.limit, raised.value.value) == ('archive_bytes', 10000)
+
+
+def test_limits_come_from_the_environment(monkeypatch):
+    monkeypatch.setenv('INTAKE_MAX_DEPTH', '7')
+    monkeypatch.setenv('INTAKE_MAX_ELEMENTS', 'many')
+    limits = IntakeLimits.from_env()
+    assert limits.depth == 7
+    assert limits.elements == IntakeLimits().elements
+
+
+def test_submission_reports_the_rejection(tmp_path, monkeypatch):
+    write(tmp_path, nested(10))
+    monkeypatch.setenv('INTAKE_MAX_DEPTH', '4')
+    document = load_submission(str(tmp_path))
+    assert document.exists and not document.parsed
+    assert isinstance(document.error, IntakeLimitError)
+    assert intake_rejection(document.path)['limit'] == 'depth'